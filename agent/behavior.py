@@ -1,7 +1,14 @@
 
-import random
-from datetime import datetime, timedelta, time as dt_time
-from typing import Tuple
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, time as dt_time
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+MIN_POST_GAP_SECONDS = 120  # Minimum gap between posts (matches the 2 minute rule in get_post_probability)
+SESSION_GAP_SECONDS = 15 * 60  # Planned runs further apart than this start a new active window
+STALE_AFTER_SECONDS = 60  # Planned runs this far in the past are skipped rather than run late
 
 class HumanBehaviorSimulator:
     """Simulates high-volume but natural-looking social media behavior patterns."""
@@ -26,15 +33,28 @@ class HumanBehaviorSimulator:
         'peak5': dt_time(23, 0),   # 11 PM
         'end': dt_time(2, 0)       # 2 AM
     }
+
+    TELEPORT_POLL_SECONDS = 5  # How often teleport events are checked while active
     
-    def __init__(self):
+    def __init__(self, plan_mode: bool = False, seed: Optional[int] = None):
+        """
+        Args:
+            plan_mode (bool): Precompute each day's runs once (see DailyPlan) instead of
+                re-evaluating the probability model on every check
+            seed (Optional[int]): Seed for every random draw (daily targets, bursts, plans,
+                delays), for reproducible schedules
+        """
+        self.plan_mode = plan_mode
+        self.rng = np.random.default_rng(seed)
+        self.plan: Optional[DailyPlan] = None
         self.last_post_time = None
         self.daily_post_count = 0
-        self.max_daily_posts = random.randint(100, 150)  # Target ~150 posts/day
+        self.max_daily_posts = int(self.rng.integers(100, 151))  # Target ~150 posts/day
         self.burst_mode = False
         self.burst_count = 0
-        self.max_burst = random.randint(3, 5)
+        self.max_burst = int(self.rng.integers(3, 6))
         self.last_burst_time = None
+        self.last_reset_date = datetime.now().date()
         
     def is_active_hour(self) -> bool:
         """Determine if current time is within active hours."""
@@ -71,7 +91,7 @@ class HumanBehaviorSimulator:
         # Start new burst randomly
         elif (not self.last_burst_time or 
               (datetime.now() - self.last_burst_time).total_seconds() > 1800):  # 30 min
-            if random.random() < 0.2:  # 20% chance to start burst
+            if self.rng.random() < 0.2:  # 20% chance to start burst
                 self.burst_mode = True
                 self.last_burst_time = datetime.now()
                 prob = 0.9
@@ -106,15 +126,15 @@ class HumanBehaviorSimulator:
     
     def should_post(self) -> bool:
         """Decide whether to post based on various factors."""
-        # Reset daily count if it's a new day
-        if self.last_post_time and self.last_post_time.date() != datetime.now().date():
-            self.daily_post_count = 0
-            self.max_daily_posts = random.randint(45, 60)
-            self.burst_mode = False
-            self.burst_count = 0
+        if self.plan_mode:
+            return self._planned_should_post()
+
+        # Reset daily count if it's a new day (normally done by the scheduled daily reset)
+        if self.last_reset_date != datetime.now().date():
+            self.reset_daily()
         
         prob = self.get_post_probability()
-        should_post = random.random() < prob
+        should_post = self.rng.random() < prob
         
         if should_post:
             self.last_post_time = datetime.now()
@@ -124,20 +144,41 @@ class HumanBehaviorSimulator:
             
         return should_post
     
+    def reset_daily(self) -> None:
+        """Start a new day's posting budget."""
+        self.daily_post_count = 0
+        self.max_daily_posts = int(self.rng.integers(45, 61))
+        self.burst_mode = False
+        self.burst_count = 0
+        self.last_reset_date = datetime.now().date()
+        if self.plan_mode:
+            self.plan = build_daily_plan(self.last_reset_date, self.max_daily_posts, self.rng)
+
+    def get_next_daily_reset(self) -> datetime:
+        """Next midnight, when the daily posting budget resets."""
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return datetime.combine(tomorrow, dt_time(0, 0))
+
+    def get_next_teleport_poll_time(self) -> datetime:
+        return datetime.now() + timedelta(seconds=self.TELEPORT_POLL_SECONDS)
+
     def get_timing_parameters(self) -> Tuple[datetime, timedelta]:
         """Calculate next activation time and duration."""
+        if self.plan_mode:
+            return self._planned_timing_parameters()
+
         if self.burst_mode:
             # Shorter cycles during burst mode
-            delay_minutes = random.uniform(1, 3)
-            duration_minutes = random.uniform(5, 10)
+            delay_minutes = self.rng.uniform(1, 3)
+            duration_minutes = self.rng.uniform(5, 10)
         else:
             # Regular timing
             if not self.is_active_hour():
-                delay_minutes = random.uniform(10, 20)
-                duration_minutes = random.uniform(5, 10)
+                delay_minutes = self.rng.uniform(10, 20)
+                duration_minutes = self.rng.uniform(5, 10)
             else:
-                delay_minutes = random.uniform(3, 8)
-                duration_minutes = random.uniform(8, 15)
+                delay_minutes = self.rng.uniform(3, 8)
+                duration_minutes = self.rng.uniform(8, 15)
         
         activation_time = datetime.now() + timedelta(minutes=delay_minutes)
         active_duration = timedelta(minutes=duration_minutes)
@@ -145,14 +186,177 @@ class HumanBehaviorSimulator:
 
     def get_next_run_time(self) -> datetime:
         """Calculate next run time with variable delays."""
+        if self.plan_mode:
+            return datetime.fromtimestamp(self._current_plan().next_time(time.time()))
+
         if self.burst_mode:
             # Quick checks during bursts
-            delay_seconds = random.uniform(30, 90)
+            delay_seconds = self.rng.uniform(30, 90)
         else:
             # Regular timing
             if self.is_active_hour():
-                delay_seconds = random.uniform(60, 180)  # 1-3 minutes
+                delay_seconds = self.rng.uniform(60, 180)  # 1-3 minutes
             else:
-                delay_seconds = random.uniform(180, 300)  # 3-5 minutes
+                delay_seconds = self.rng.uniform(180, 300)  # 3-5 minutes
                 
-        return datetime.now() + timedelta(seconds=delay_seconds)
\ No newline at end of file
+        return datetime.now() + timedelta(seconds=delay_seconds)
+
+    def _current_plan(self) -> "DailyPlan":
+        """Today's plan, moving on to the next day's once it is used up."""
+        now = time.time()
+        if self.plan is None:
+            self.plan = build_daily_plan(datetime.now().date(), self.max_daily_posts, self.rng)
+        while self.plan.exhausted(now):
+            self.plan = build_daily_plan(self.plan.day + timedelta(days=1), self.max_daily_posts, self.rng)
+        return self.plan
+
+    def _planned_should_post(self) -> bool:
+        decision = self._current_plan().consume()
+        if decision:
+            self.last_post_time = datetime.now()
+            self.daily_post_count += 1
+        return decision
+
+    def _planned_timing_parameters(self) -> Tuple[datetime, timedelta]:
+        """Active window covering the next run of planned checks."""
+        plan = self._current_plan()
+        start = plan.next_time(time.time())
+        end = plan.session_end_time()
+        return datetime.fromtimestamp(start), timedelta(seconds=max(end - start, 0) + 1)
+
+
+@dataclass
+class DailyPlan:
+    """
+    One day of planned pipeline runs.
+
+    times holds every planned check (epoch seconds, sorted) and posts whether that check
+    posts. The cursor only moves forward, so serving the next run is amortized O(1).
+    """
+    day: date
+    times: np.ndarray
+    posts: np.ndarray
+    session_end: np.ndarray  # index of the last check in each check's active window
+    cursor: int = 0
+
+    def exhausted(self, now: float) -> bool:
+        self.skip_past(now)
+        return self.cursor >= len(self.times)
+
+    def skip_past(self, now: float) -> None:
+        """Drop checks whose time has already passed (e.g. the process was down)."""
+        while self.cursor < len(self.times) and self.times[self.cursor] < now - STALE_AFTER_SECONDS:
+            self.cursor += 1
+
+    def next_time(self, now: float) -> float:
+        self.skip_past(now)
+        return max(now, float(self.times[self.cursor])) if self.cursor < len(self.times) else now
+
+    def session_end_time(self) -> float:
+        return float(self.times[self.session_end[self.cursor]])
+
+    def consume(self) -> bool:
+        """Decision for the next planned check."""
+        if self.cursor >= len(self.times):
+            return False
+        decision = bool(self.posts[self.cursor])
+        self.cursor += 1
+        return decision
+
+
+def minute_weights(day: date) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-minute posting weight and check rate (checks per minute) for a day.
+
+    Vectorized version of get_post_probability / get_next_run_time: 0.7 in active
+    hours and 0.2 outside, x1.3 within an hour of a peak.
+    """
+    hours = HumanBehaviorSimulator.WEEKEND_ACTIVE_HOURS if day.weekday() >= 5 else HumanBehaviorSimulator.WEEKDAY_ACTIVE_HOURS
+    minutes = np.arange(MINUTES_PER_DAY)
+    start = hours['start'].hour * 60 + hours['start'].minute
+    end = hours['end'].hour * 60 + hours['end'].minute
+    if end < start:
+        active = (minutes >= start) | (minutes <= end)
+    else:
+        active = (minutes >= start) & (minutes <= end)
+
+    weights = np.where(active, 0.7, 0.2)
+    hour_of_day = minutes // 60
+    peak_hours = np.array([hours[f'peak{i}'].hour for i in range(1, 6)])
+    near_peak = (np.abs(hour_of_day[:, None] - peak_hours[None, :]) <= 1).any(axis=1)
+    weights = np.where(near_peak & active, weights * 1.3, weights)
+
+    # Mean gap between checks: 1-3 minutes active, 3-5 minutes otherwise
+    check_rate = np.where(active, 1 / 2, 1 / 4)
+    return weights, check_rate
+
+
+def build_daily_plan(day: date, max_daily_posts: int, rng: np.random.Generator) -> DailyPlan:
+    """
+    Draw a whole day of runs at once.
+
+    Post times are max_daily_posts minutes sampled in proportion to the activity weights,
+    pushed apart to respect MIN_POST_GAP_SECONDS; skip checks are a Poisson process at the
+    per-minute check rate.
+    """
+    weights, check_rate = minute_weights(day)
+    day_start = datetime.combine(day, dt_time(0, 0)).timestamp()
+    day_end = day_start + MINUTES_PER_DAY * 60
+
+    n_posts = min(max_daily_posts, MINUTES_PER_DAY)
+    post_minutes = np.sort(rng.choice(MINUTES_PER_DAY, size=n_posts, replace=False, p=weights / weights.sum()))
+    post_times = day_start + post_minutes * 60 + rng.uniform(0, 60, size=n_posts)
+    # t'[i] = max(t[i], t'[i-1] + gap) in closed form
+    steps = np.arange(n_posts) * MIN_POST_GAP_SECONDS
+    post_times = np.maximum.accumulate(post_times - steps) + steps
+    post_times = post_times[post_times < day_end]
+
+    checks_per_minute = rng.poisson(check_rate)
+    check_minutes = np.repeat(np.arange(MINUTES_PER_DAY), checks_per_minute)
+    check_times = day_start + check_minutes * 60 + rng.uniform(0, 60, size=len(check_minutes))
+
+    times = np.concatenate([post_times, check_times])
+    posts = np.concatenate([np.ones(len(post_times), dtype=bool), np.zeros(len(check_times), dtype=bool)])
+    order = np.argsort(times, kind="stable")
+    times, posts = times[order], posts[order]
+
+    # Last index of each window of checks separated by less than SESSION_GAP_SECONDS
+    breaks = np.flatnonzero(np.diff(times) > SESSION_GAP_SECONDS)
+    ends = np.append(breaks, len(times) - 1)
+    session_end = ends[np.searchsorted(ends, np.arange(len(times)))]
+
+    return DailyPlan(day=day, times=times, posts=posts, session_end=session_end)
+
+
+def fast_forward(days: int = 7, max_daily_posts: int = 150, seed: Optional[int] = None,
+                 start: Optional[date] = None) -> Dict[str, float]:
+    """
+    Simulate several days of planned behavior without waiting on the clock.
+
+    Args:
+        days (int): Number of days to simulate
+        max_daily_posts (int): Daily post target to evaluate
+        seed (Optional[int]): Seed for reproducible runs
+        start (Optional[date]): First simulated day (defaults to today)
+
+    Returns:
+        Dict[str, float]: Posting volume, spacing and active-window stats
+    """
+    rng = np.random.default_rng(seed)
+    start = start or datetime.now().date()
+    plans = [build_daily_plan(start + timedelta(days=i), max_daily_posts, rng) for i in range(days)]
+
+    posts_per_day = np.array([plan.posts.sum() for plan in plans])
+    post_times = np.concatenate([plan.times[plan.posts] for plan in plans])
+    gaps = np.diff(post_times)
+    sessions = sum(len(np.unique(plan.session_end)) for plan in plans)
+    return {
+        "days": days,
+        "avg_posts_per_day": float(posts_per_day.mean()),
+        "min_posts_per_day": int(posts_per_day.min()),
+        "max_posts_per_day": int(posts_per_day.max()),
+        "checks_per_day": float(np.mean([len(plan.times) for plan in plans])),
+        "min_gap_seconds": float(gaps.min()) if len(gaps) else 0.0,
+        "median_gap_seconds": float(np.median(gaps)) if len(gaps) else 0.0,
+        "active_windows_per_day": sessions / days,
+    }
@@ -0,0 +1,127 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Rate limiter provider -> dependency whose breaker guards it
+PROVIDER_DEPENDENCIES = {
+    "hyperbolic": "llm",
+    "openrouter": "llm",
+    "openai": "embeddings",
+    "x": "x",
+    "getmoni": "getmoni",
+    "rpc": "rpc",
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because its dependency's breaker is open."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Circuit breaker for {name} is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one external dependency.
+
+    After failure_threshold consecutive failures the breaker opens and calls fail fast.
+    Once reset_timeout has passed a single probe call is let through (half-open): if it
+    succeeds the breaker closes again, otherwise it re-opens for another reset_timeout.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        """Whether a call would currently be let through (without claiming the half-open probe)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not self.probe_in_flight
+
+    def allow_request(self) -> bool:
+        """Claim permission for one call, moving an expired open breaker to half-open."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+                print(f"Circuit breaker for {self.name} is half-open, probing")
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"Circuit breaker for {self.name} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"Circuit breaker for {self.name} opened after {self.failures} failure(s)")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Call fn through the breaker.
+
+        Exceptions and 5xx responses count as failures; anything else (including 429s,
+        which the rate limiter deals with) as a success.
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(self.name)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+
+        status_code = getattr(result, "status_code", None)
+        if isinstance(status_code, int) and status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+
+breakers: Dict[str, CircuitBreaker] = {
+    name: CircuitBreaker(name) for name in ("llm", "embeddings", "x", "rpc", "getmoni")
+}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for a dependency ("llm", "embeddings", "x", "rpc", "getmoni")."""
+    if name not in breakers:
+        breakers[name] = CircuitBreaker(name)
+    return breakers[name]
+
+
+def breaker_for_provider(provider: str) -> CircuitBreaker:
+    return get_breaker(PROVIDER_DEPENDENCIES.get(provider, provider))
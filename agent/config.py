@@ -1,15 +1,16 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import json
 import os
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 from twitter.account import Account
 from dotenv import load_dotenv
 from requests_oauthlib import OAuth1
 
-from db.db_setup import create_database, get_db
+from db.db_setup import create_database, get_db, DB_PATH
 from db.db_seed import seed_database
+from engines.prompts.context_budget import DEFAULT_BUDGETS
 
 
 @dataclass
@@ -31,6 +32,36 @@ class Config:
     min_eth_balance: float = 0.3
     bot_username: str = "tee_hee_he"
     bot_email: str = "tee_hee_he@example.com"
+    stream_llm_output: bool = False  # stream completions and hang up once a candidate is complete
+    max_post_chars: int = 220
+    short_term_memory_max_chars: Optional[int] = None  # only streamed calls stop early at this cap
+    min_post_candidates: int = 1
+    max_post_candidates: int = 4  # best-of-N grows towards this as the rejection rate rises
+    post_candidate_window: int = 10  # recent cycles used to compute the rejection rate
+    post_format_mode: str = "llm"  # "local" formats tweets with local rules and only falls back to the LLM
+    durable_notification_queue: bool = False  # keep queued notifications in SQLite across restarts
+    notification_visibility_timeout: int = 600  # seconds before an unacked batch is redelivered
+    notification_batch_size: int = 20  # most notifications handled per cycle
+    notification_token_budget: int = 2000  # prompt tokens the notification batch may use
+    notification_half_life_minutes: float = 60  # queue priority halves every half-life
+    context_budgets: dict = field(default_factory=lambda: dict(DEFAULT_BUDGETS))  # prompt tokens per section
+    behavior_plan_mode: bool = False  # serve run times and post decisions from a precomputed daily plan
+    behavior_seed: Optional[int] = None  # seed for reproducible daily plans
+    user_id_cache_ttl_hours: float = 168  # how long cached X user ids are trusted
+    max_follow_workers: int = 4  # follows issued concurrently (still paced by the X rate limit)
+    max_payout_eth_per_user_per_day: float = 0.05  # ETH one user can receive per UTC day
+    max_payout_eth_per_day: float = 0.5  # ETH the agent sends in total per UTC day
+    teleport_holder_payout_eth: float = 0.0  # paid to teleport holders' addresses without asking the LLM, 0 leaves them to the LLM
+    payout_llm_for_unlisted: bool = True  # ask the LLM about addresses from non-holders, otherwise skip them
+    getmoni_api_key: Optional[str] = None  # GETMONI_API_KEY, for teleport holders' follower scores
+    follower_score_ttl_hours: float = 6  # how long cached follower scores are trusted
+    max_follower_score_workers: int = 8  # follower score lookups issued concurrently
+    follower_score_timeout: float = 10  # seconds per follower score request
+    dm_history_pages_per_sync: int = 5  # older DM pages fetched per sync until each conversation's history is complete
+    dm_messages_per_user: int = 10  # most recent DMs per user given as context for a notification batch
+    dm_context_days: float = 30  # only DMs newer than this are given as context
+    llm_json_mode: bool = True  # ask decision calls for schema-constrained JSON where the provider supports it
+    wallet_state_ttl_seconds: float = 30  # how long a cached wallet balance is served without an RPC call
 
 
 class ConfigMaker:
@@ -41,7 +72,7 @@ class ConfigMaker:
         """Initialize environment and database."""
         load_dotenv()
         
-        db_path = Path("./data/agents.db")
+        db_path = Path(DB_PATH)
         if not db_path.exists():
             print("Creating database...")
             db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -49,7 +80,9 @@ class ConfigMaker:
             print("Seeding database...")
             seed_database()
         else:
-            print("Database already exists. Skipping creation and seeding.")
+            # create_all only adds tables that are missing, existing data is untouched
+            create_database()
+            print("Database already exists. Skipping seeding.")
 
 
     def get_api_keys(self) -> Dict[str, str]:
@@ -58,6 +91,7 @@ class ConfigMaker:
             "llm_api_key": os.getenv("HYPERBOLIC_API_KEY"),
             "openai_api_key": os.getenv("OPENAI_API_KEY"),
             "openrouter_api_key": os.getenv("OPENROUTER_API_KEY"),
+            "getmoni_api_key": os.getenv("GETMONI_API_KEY"),
         }
 
     def get_twitter_config(self) -> Tuple[OAuth1, Account]:
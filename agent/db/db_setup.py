@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from models import Base, User, Post, Comment, Like, LongTermMemory
 
@@ -18,6 +18,28 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def create_database():
     """Create all tables in the database."""
     Base.metadata.create_all(bind=engine)
+    migrate_columns()
+
+def migrate_columns():
+    """
+    Add columns and indexes that were added to models after a database was created.
+
+    create_all only creates missing tables, so existing databases get new (nullable)
+    columns through ALTER TABLE here. Constraints and defaults are not backfilled.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    print(f"Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 def get_db():
     """Dependency to get DB session."""
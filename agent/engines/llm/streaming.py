@@ -0,0 +1,108 @@
+# Streaming LLM helper
+# Objective: Consume server-sent events from the OpenAI-compatible completion endpoints and hang up as soon as
+# enough text has arrived, instead of waiting for (and paying for) the full max_tokens budget.
+
+import json
+from typing import Optional
+import requests
+from rate_limiter import get_scheduler
+from http_pool import get_session
+
+
+def extract_stream_text(chunk: dict) -> str:
+    """
+    Pull the text delta out of a single streamed chunk.
+
+    Handles both the completions format (choices[0].text) and the chat format (choices[0].delta.content).
+    """
+    choices = chunk.get("choices") or []
+    if not choices:
+        return ""
+    choice = choices[0]
+    if "text" in choice:
+        return choice.get("text") or ""
+    return (choice.get("delta") or {}).get("content") or ""
+
+
+def is_complete_candidate(text: str, max_chars: Optional[int], stop_at_paragraph: bool = False, min_chars: int = 40) -> bool:
+    """
+    Decide whether the streamed text already holds a complete candidate.
+
+    Args:
+        text (str): Text accumulated so far
+        max_chars (Optional[int]): Length cap, None for no cap
+        stop_at_paragraph (bool): Treat a blank line after min_chars of content as the end of a candidate
+        min_chars (int): Minimum content length before a paragraph break counts
+
+    Returns:
+        bool: True if the stream can be closed
+    """
+    stripped = text.strip()
+    if max_chars and len(stripped) >= max_chars:
+        return True
+    if stop_at_paragraph and "\n\n" in stripped:
+        first_paragraph = stripped.split("\n\n", 1)[0]
+        return len(first_paragraph.strip()) >= min_chars
+    return False
+
+
+def stream_text(
+    url: str,
+    headers: dict,
+    payload: dict,
+    max_chars: Optional[int] = None,
+    stop_at_paragraph: bool = False,
+    timeout: float = 60,
+    provider: str = "hyperbolic",
+) -> Optional[str]:
+    """
+    Send a streaming request and accumulate text until a complete candidate is available.
+
+    Args:
+        url (str): Completions or chat completions endpoint
+        headers (dict): Request headers (auth, content type)
+        payload (dict): Request body, "stream" is forced to True
+        max_chars (Optional[int]): Close the connection once this many characters have arrived
+        stop_at_paragraph (bool): Also close the connection at the first paragraph break
+        timeout (float): Connect / read timeout in seconds
+        provider (str): Rate limiter bucket the request is scheduled on
+
+    Returns:
+        Optional[str]: Accumulated text, or None if the request failed
+    """
+    payload = dict(payload, stream=True)
+    text = ""
+    chunks = 0
+    early_stop = False
+
+    response = get_scheduler().call(
+        provider, get_session(provider).post, url, headers=headers, json=payload, stream=True, timeout=timeout
+    )
+    try:
+        if response.status_code != 200:
+            print(f"Streaming request failed. Status code: {response.status_code}")
+            print(f"Response: {response.text}")
+            return None
+
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+
+            text += extract_stream_text(chunk)
+            chunks += 1
+            if is_complete_candidate(text, max_chars, stop_at_paragraph):
+                early_stop = True
+                break
+    finally:
+        # Closing the response drops the connection, which tells the server to stop generating
+        response.close()
+
+    print(f"Streamed {chunks} chunks ({len(text)} chars){' - stopped early' if early_stop else ''}")
+    return text
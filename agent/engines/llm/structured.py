@@ -0,0 +1,244 @@
+# Structured LLM output
+# Objective: Get JSON decisions out of a single completion. Ask for schema-constrained output where the provider
+# supports it, and repair fenced, prose-wrapped or slightly malformed JSON locally instead of calling the LLM again.
+
+import ast
+import json
+import re
+import threading
+from typing import Any, Iterator, List, Optional, Set, Type, TypeVar
+from pydantic import BaseModel, ValidationError, field_validator
+from rate_limiter import get_scheduler
+from http_pool import get_session
+
+FENCE_PATTERN = re.compile(r"```[A-Za-z]*\s*(.*?)```", re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([\]}])")
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+JSON_LITERALS = {"true": "True", "false": "False", "null": "None"}
+JSON_MODE_ERROR_MARKERS = ("response_format", "json_schema")  # how a provider names the parameter it rejects
+MAX_OPENERS = 8  # bracket positions tried when looking for JSON inside prose
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class StructuredOutputError(ValueError):
+    """The completion held no JSON that could be parsed or validated."""
+
+
+class FollowDecision(BaseModel):
+    username: str
+    score: float
+
+    @field_validator("username")
+    @classmethod
+    def strip_at(cls, value: str) -> str:
+        return value.strip().lstrip("@")
+
+
+class WalletPayout(BaseModel):
+    address: str
+    amount: float
+
+    @field_validator("address")
+    @classmethod
+    def strip_address(cls, value: str) -> str:
+        return value.strip()
+
+
+def _balanced(text: str, start: int) -> Optional[str]:
+    """The bracketed span opening at text[start], None if it is never closed."""
+    closers = {"[": "]", "{": "}"}
+    stack = []
+    quote = None
+    escaped = False
+    for position in range(start, len(text)):
+        char = text[position]
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char == '"':
+            quote = char
+        elif char in closers:
+            stack.append(closers[char])
+        elif char in "]}":
+            if not stack or stack.pop() != char:
+                return None
+            if not stack:
+                return text[start:position + 1]
+    return None
+
+
+def _candidates(text: str) -> Iterator[str]:
+    """Strings that may hold the JSON, most likely first."""
+    yield text
+    for fenced in FENCE_PATTERN.findall(text):
+        yield fenced.strip()
+    openers = [match.start() for match in re.finditer(r"[\[{]", text)][:MAX_OPENERS]
+    for start in openers:
+        span = _balanced(text, start)
+        if span:
+            yield span
+
+
+def _loads(candidate: str) -> Any:
+    """json.loads, then the usual repairs: smart quotes, trailing commas, Python-style quoting and literals."""
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        pass
+    repaired = TRAILING_COMMA_PATTERN.sub(r"\1", candidate.translate(SMART_QUOTES))
+    try:
+        return json.loads(repaired)
+    except ValueError:
+        pass
+    pythonic = re.sub(r"\b(true|false|null)\b", lambda match: JSON_LITERALS[match.group(1)], repaired)
+    try:
+        return ast.literal_eval(pythonic)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        raise StructuredOutputError(f"Not JSON: {candidate[:80]!r}")
+
+
+def parse_json(text: str) -> Any:
+    """
+    Parse JSON out of an LLM completion.
+
+    Accepts bare JSON, JSON in a ``` fence, JSON surrounded by prose, and small defects
+    (trailing commas, single quotes, Python literals).
+
+    Raises:
+        StructuredOutputError: No parseable JSON in the text
+    """
+    if text is None:
+        raise StructuredOutputError("Empty completion")
+    text = text.strip()
+    for candidate in _candidates(text):
+        try:
+            return _loads(candidate)
+        except StructuredOutputError:
+            continue
+    raise StructuredOutputError(f"No JSON found in completion: {text[:80]!r}")
+
+
+def parse_items(text: str, item_model: Type[T], key: Optional[str] = None) -> List[T]:
+    """
+    Parse a JSON list of item_model out of an LLM completion.
+
+    The list may also come wrapped in an object (as JSON mode requires), under key or as
+    the object's only list; an empty object means an empty list and a lone item object
+    is a one item list. Items that fail validation are dropped, the rest are kept.
+
+    Args:
+        text (str): The completion text
+        item_model (Type[BaseModel]): Model of one item
+        key (Optional[str]): Key of the list when it is wrapped in an object
+
+    Returns:
+        List[BaseModel]: The valid items
+
+    Raises:
+        StructuredOutputError: The text held no JSON list
+    """
+    data = parse_json(text)
+    if isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        if key is not None and isinstance(data.get(key), list):
+            data = data[key]
+        elif not data:
+            data = []
+        elif len(lists) == 1:
+            data = lists[0]
+        else:
+            data = [data]
+    if not isinstance(data, (list, tuple)):
+        raise StructuredOutputError(f"Expected a list, got {type(data).__name__}")
+
+    items = []
+    for item in data:
+        try:
+            items.append(item_model.model_validate(item))
+        except ValidationError as e:
+            print(f"Dropping invalid {item_model.__name__} {item!r}: {e.errors()[0]['msg']}")
+    return items
+
+
+def list_response_format(item_model: Type[BaseModel], key: str) -> dict:
+    """OpenAI style json_schema response_format for an object holding a list of item_model under key."""
+    # strict schemas need every property required and no extra ones
+    item_schema = {**item_model.model_json_schema(), "additionalProperties": False}
+    item_schema["required"] = list(item_schema.get("properties", {}))
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": key,
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {key: {"type": "array", "items": item_schema}},
+                "required": [key],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+class JSONModeSupport:
+    """Providers that rejected response_format, they are asked in plain text (and parsed locally) from then on."""
+
+    def __init__(self):
+        self._unsupported: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def supported(self, provider: str) -> bool:
+        with self._lock:
+            return provider not in self._unsupported
+
+    def reject(self, provider: str) -> None:
+        with self._lock:
+            self._unsupported.add(provider)
+
+
+json_mode_support = JSONModeSupport()
+
+
+def rejects_json_mode(response) -> bool:
+    """Whether a response is the provider refusing response_format (not a context, auth or other error)."""
+    if response.status_code != 400:
+        return False
+    body = (response.text or "").lower()
+    return any(marker in body for marker in JSON_MODE_ERROR_MARKERS)
+
+
+def post_structured(provider: str, url: str, headers: dict, payload: dict,
+                    item_model: Type[BaseModel], key: str, json_mode: bool = True):
+    """
+    POST a chat completion, constrained to a JSON list of item_model when the provider allows it.
+
+    A 400 answer that names response_format is taken as "not supported": the request is
+    sent once more without it and the provider is not asked for JSON mode again. Other
+    errors are returned as they are.
+
+    Args:
+        provider (str): Rate limiter / session provider name
+        url (str): Completion endpoint
+        headers (dict): Request headers
+        payload (dict): Chat completion payload, without response_format
+        item_model (Type[BaseModel]): Model of one item of the expected list
+        key (str): Key of the list in the constrained object
+        json_mode (bool): Ask for schema-constrained output at all
+
+    Returns:
+        requests.Response: The completion response
+    """
+    post = get_session(provider).post
+    if json_mode and json_mode_support.supported(provider):
+        constrained = {**payload, "response_format": list_response_format(item_model, key)}
+        response = get_scheduler().call(provider, post, url=url, headers=headers, json=constrained)
+        if not rejects_json_mode(response):
+            return response
+        print(f"{provider} rejected JSON mode, parsing plain completions from now on: {response.text[:200]}")
+        json_mode_support.reject(provider)
+    return get_scheduler().call(provider, post, url=url, headers=headers, json=payload)
@@ -15,6 +15,8 @@ from sqlalchemy import Column, Integer, String, Float, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from openai import OpenAI
+from rate_limiter import get_scheduler
+from http_pool import get_openai_client
 
 Base = declarative_base()
 
@@ -42,8 +44,10 @@ class LongTermMemoryManager:
         Returns:
             List[float]: Embedding vector
         """
-        client = OpenAI(api_key=openai_api_key)
-        response = client.embeddings.create(
+        client = get_openai_client(openai_api_key)
+        response = get_scheduler().call(
+            "openai",
+            client.embeddings.create,
             input=text,
             model="text-embedding-3-small"
         )
@@ -10,15 +10,20 @@
 
 import json
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional
 import requests
 from sqlalchemy.orm import class_mapper
 from engines.prompts.prompts import get_short_term_memory_prompt
+from engines.llm.streaming import stream_text
+from rate_limiter import get_scheduler
+from http_pool import get_session, endpoint
+from circuit_breaker import CircuitOpenError
 
 
 class ShortTermMemoryManager:
-    def __init__(self):
-        pass
+    def __init__(self, stream: bool = False, max_chars: Optional[int] = None):
+        self.stream = stream
+        self.max_chars = max_chars
     # Can modify the type depending on the format that twitter api returns for posts
     # external_context in case you want to include information from other sources 
     def generate_short_term_memory(self, posts: List[Dict], external_context: List[str], llm_api_key: str) -> str:
@@ -40,7 +45,7 @@ class ShortTermMemoryManager:
         max_tries = 3
         while tries < max_tries:
             try:
-                url = "https://api.hyperbolic.xyz/v1/chat/completions"
+                url = endpoint("hyperbolic", "chat/completions")
 
                 headers = {
                     "Content-Type": "application/json",
@@ -66,7 +71,18 @@ class ShortTermMemoryManager:
                     "stream": False,
                 }
 
-                response = requests.post(url, headers=headers, json=data)
+                # Early stop only makes sense when there is a length cap to stop at
+                if self.stream and self.max_chars:
+                    content = stream_text(url, headers, data, max_chars=self.max_chars)
+                    if content and content.strip():
+                        content = content.strip()[:self.max_chars]
+                        print(f"Short-term memory streamed with response: {content}")
+                        return content
+                    tries += 1
+                    time.sleep(5)
+                    continue
+
+                response = get_scheduler().call("hyperbolic", get_session("hyperbolic").post, url, headers=headers, json=data)
 
                 if response.status_code == 200:
                     content = response.json()['choices'][0]['message']['content']
@@ -76,8 +92,12 @@ class ShortTermMemoryManager:
 
                 print(f"Attempt {tries + 1} failed for short-term memory generation. Status code: {response.status_code}")
                 print(f"Response: {response.text}")
+                tries += 1
                 time.sleep(5)
 
+            except CircuitOpenError as e:
+                print(f"Skipping short-term memory generation: {e}")
+                return None
             except Exception as e:
                 print(f"Error on attempt {tries + 1}: {str(e)}")
                 tries += 1
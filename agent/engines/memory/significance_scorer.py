@@ -1,6 +1,9 @@
 import requests
 import time
 from engines.prompts.prompts import get_significance_score_prompt, get_reply_worthiness_score_prompt
+from rate_limiter import get_scheduler
+from http_pool import get_session, endpoint
+from circuit_breaker import CircuitOpenError
 
 
 class SignificanceScorer:
@@ -25,8 +28,10 @@ class SignificanceScorer:
         max_tries = 5
         while tries < max_tries:
             try:
-                response = requests.post(
-                    url="https://api.hyperbolic.xyz/v1/chat/completions",
+                response = get_scheduler().call(
+                    "hyperbolic",
+                    get_session("hyperbolic").post,
+                    url=endpoint("hyperbolic", "chat/completions"),
                     headers={
                         "Content-Type": "application/json",
                         "Authorization": f"Bearer {llm_api_key}",
@@ -79,6 +84,9 @@ class SignificanceScorer:
                     print(f"Response: {response.text}")
                     tries += 1
 
+            except CircuitOpenError as e:
+                print(f"Skipping scoring: {e}")
+                return None
             except Exception as e:
                 print(f"Error on attempt {tries + 1}: {str(e)}")
                 tries += 1 
@@ -104,8 +112,10 @@ class SignificanceScorer:
         max_tries = 5
         while tries < max_tries:
             try:
-                response = requests.post(
-                    url="https://api.hyperbolic.xyz/v1/chat/completions",
+                response = get_scheduler().call(
+                    "hyperbolic",
+                    get_session("hyperbolic").post,
+                    url=endpoint("hyperbolic", "chat/completions"),
                     headers={
                         "Content-Type": "application/json",
                         "Authorization": f"Bearer {llm_api_key}",
@@ -158,6 +168,9 @@ class SignificanceScorer:
                     print(f"Response: {response.text}")
                     tries += 1
 
+            except CircuitOpenError as e:
+                print(f"Skipping scoring: {e}")
+                return None
             except Exception as e:
                 print(f"Error on attempt {tries + 1}: {str(e)}")
                 tries += 1 
@@ -0,0 +1,130 @@
+# Context Budget
+# Objective: Keep prompts a predictable size. Each prompt section (notifications, memories, recent posts, examples)
+# gets a token budget; items are kept in priority order until the budget runs out, the overflowing item is truncated
+# and the rest are dropped, with a record of what was left out.
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional, fall back to the regex approximation
+    _ENCODING = None
+
+# Roughly one BPE token per short word chunk, number group or punctuation mark
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]{1,6}|\d{1,3}|[^\sA-Za-z\d]")
+
+DEFAULT_BUDGETS = {
+    "notifications": 2000,
+    "memories": 600,
+    "recent_posts": 600,
+    "examples": 800,
+}
+MIN_TRUNCATED_TOKENS = 32  # don't bother keeping a truncated item smaller than this
+CHARS_PER_TOKEN = 4  # typical for English text, for both cl100k_base and _TOKEN_PATTERN
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally, with tiktoken if it is installed and a regex approximation otherwise."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def tokens_for_chars(max_chars: int, margin: float = 2.0) -> int:
+    """Completion token limit that leaves room for max_chars characters of text (margin covers emoji and odd spelling)."""
+    return max(1, math.ceil(max_chars / CHARS_PER_TOKEN * margin))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _ENCODING is not None:
+        return _ENCODING.decode(_ENCODING.encode(text)[:max_tokens]) + "..."
+    matches = list(_TOKEN_PATTERN.finditer(text))
+    return text[:matches[max_tokens - 1].end()] + "..." if max_tokens > 0 else ""
+
+
+@dataclass
+class SectionReport:
+    kept: int = 0
+    truncated: int = 0
+    dropped: int = 0
+    tokens: int = 0
+    dropped_tokens: int = 0
+
+
+@dataclass
+class ContextAssembler:
+    """Fits prompt sections into per-section token budgets and records what was dropped."""
+    budgets: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_BUDGETS))
+    report: Dict[str, SectionReport] = field(default_factory=dict)
+
+    def fit(self, section: str, items: List[str]) -> List[str]:
+        """
+        Keep items (assumed to be in priority order) until the section budget runs out.
+
+        Args:
+            section (str): Budget name, e.g. "notifications"
+            items (List[str]): Section items, most important first
+
+        Returns:
+            List[str]: Items that fit, the last one possibly truncated
+        """
+        budget = self.budgets.get(section)
+        report = SectionReport()
+        self.report[section] = report
+        if budget is None:
+            report.kept = len(items)
+            report.tokens = sum(count_tokens(str(item)) for item in items)
+            return list(items)
+
+        kept = []
+        for item in items:
+            item = str(item)
+            tokens = count_tokens(item)
+            remaining = budget - report.tokens
+            if tokens <= remaining:
+                kept.append(item)
+                report.kept += 1
+                report.tokens += tokens
+            elif remaining >= MIN_TRUNCATED_TOKENS:
+                kept.append(truncate_to_tokens(item, remaining))
+                report.truncated += 1
+                report.tokens = budget
+                report.dropped_tokens += tokens - remaining
+            else:
+                report.dropped += 1
+                report.dropped_tokens += tokens
+
+        if report.dropped:
+            kept.append(f"(+{report.dropped} more {section.replace('_', ' ')} omitted)")
+        return kept
+
+    def fit_text(self, section: str, text: str, keep_header: bool = False) -> str:
+        """
+        Fit a newline separated block (one item per line) into the section budget.
+
+        Args:
+            keep_header (bool): Always keep the first line (e.g. "Relevant past memories and thoughts:")
+        """
+        if not text:
+            return text
+        lines = text.split("\n")
+        header = [lines.pop(0)] if keep_header and lines else []
+        return "\n".join(header + self.fit(section, lines))
+
+    def summary(self) -> str:
+        """One line per section that lost content."""
+        parts = [
+            f"{section}: dropped {r.dropped}, truncated {r.truncated} (~{r.dropped_tokens} tokens)"
+            for section, r in self.report.items()
+            if r.dropped or r.truncated
+        ]
+        return "; ".join(parts) if parts else "nothing dropped"
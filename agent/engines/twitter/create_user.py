@@ -1,10 +1,52 @@
+import threading
+from typing import Dict, List, Set
 from models import User
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+MAX_KNOWN_USERNAMES = 100_000  # the cache is dropped and rebuilt lazily past this size
+
+# database URL -> usernames known to have a User row
+_known_usernames: Dict[str, Set[str]] = {}
+_known_lock = threading.Lock()
+
 
 class UserManager:
     def __init__(self):
         pass
 
+    def ensure_usernames(self, db: Session, usernames: List[str]) -> List[str]:
+        """
+        Make sure every username has a User row.
+
+        Usernames already seen by this process are skipped without touching the database,
+        the rest go in one INSERT ... ON CONFLICT DO NOTHING, which is also safe against
+        another writer inserting the same username concurrently.
+
+        Returns:
+            List[str]: Usernames that were inserted by this call (new to the database)
+        """
+        key = str(db.get_bind().url)
+        with _known_lock:
+            known = _known_usernames.setdefault(key, set())
+            unknown = [username for username in dict.fromkeys(usernames) if username and username not in known]
+        if not unknown:
+            return []
+
+        inserted = db.execute(
+            sqlite_insert(User)
+            .values([{"username": username} for username in unknown])
+            .on_conflict_do_nothing(index_elements=["username"])
+            .returning(User.username)
+        ).scalars().all()
+        db.commit()
+
+        with _known_lock:
+            if len(known) + len(unknown) > MAX_KNOWN_USERNAMES:
+                known.clear()
+            known.update(unknown)
+        return list(inserted)
+
     def _get_or_create_ai_user(self, db: Session, bot_username: str, bot_email: str) -> User:
         """Get or create the AI user in the database."""
         ai_user = (db.query(User)
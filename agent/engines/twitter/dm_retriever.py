@@ -1,76 +1,120 @@
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 from twitter.account import Account
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from models import Message
 import requests
-from engines.twitter.utils import user_id_by_usernames
+from engines.twitter.dm_sync import DMSynchronizer, HISTORY_PAGES_PER_SYNC, message_row, self_user_id
+from rate_limiter import get_scheduler
+from http_pool import get_session, endpoint
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta
 
 load_dotenv()
 
+MESSAGES_PER_USER = 10
+DM_CONTEXT_DAYS = 30
+
 class DMRetreiver:
-    def __init__(self):
-        pass
+    def __init__(self, history_pages_per_sync: int = HISTORY_PAGES_PER_SYNC, messages_per_user: int = MESSAGES_PER_USER,
+                 context_days: float = DM_CONTEXT_DAYS):
+        self.synchronizer = DMSynchronizer(history_pages_per_sync)
+        self.messages_per_user = messages_per_user
+        self.context_window = timedelta(days=context_days)
 
     def retrieve_last_parsed_time(self, db: Session) -> int:
         """Fetch the last parsed time for the user from DB"""
         last_parsed_time = db.query(Message).order_by(Message.created_at.desc()).first()
         return last_parsed_time.created_at if last_parsed_time else 0
 
-    def fetch_latest_dms(self, db: Session, account: Account) -> List[Dict]:
-        """Fetch DMs for the user after latest message"""
-        return self.fetch_dms_from(account, self.retrieve_last_parsed_time(db))
+    def fetch_latest_dms(self, db: Session, account: Account) -> List[Message]:
+        """
+        Sync DMs received since the last sync (and a few pages of older history) into the DB.
+
+        Returns:
+            List[Message]: The messages that were new to the DB
+        """
+        rows = self.synchronizer.sync(db, account, os.getenv("X_USERNAME"))
+        return [Message(**row) for row in rows]
 
-    def fetch_dms_from(self, account: Account, from_ms: int) -> List[Dict]:
-        """Get latest DMs"""
+    def fetch_dms_from(self, account: Account, from_ms: int) -> List[Message]:
+        """Get the inbox DMs sent after from_ms, without paging or storing them"""
         inbox = account.dm_inbox()
 
         messages = []
         if inbox['inbox_initial_state'] and inbox['inbox_initial_state']['entries']:
-            messages = self.parse_dm_data(inbox['inbox_initial_state']['entries'], from_ms, user_id_by_usernames(account, [os.getenv("X_USERNAME")]))
+            messages = self.parse_dm_data(inbox['inbox_initial_state']['entries'], from_ms, self_user_id(account, os.getenv("X_USERNAME")))
         return messages
 
-    def parse_dm_data(self, inbox_entries, from_ms: int, account_id):
-        # TODO: Implement pagination, can't find any info on how to do this in the Twitter API repo
+    def parse_dm_data(self, inbox_entries, from_ms: int, account_id) -> List[Message]:
         """Parse DM data"""
         messages = []
-        print (inbox_entries, account_id)
-
         for dm in inbox_entries:
-            if 'message' in dm and 'message_data' in dm['message'] and 'time' in dm['message']['message_data'] and int(dm['message']['message_data']['time']) > from_ms:
-                user = dm['message']['message_data']['sender_id']
-                if user == account_id:
-                    user = dm['message']['message_data']['recipient_id']
-                msg = dm['message']
-                msg_data = msg['message_data']
-                message = Message(
-                    id=msg_data['id'],
-                    conversation_id=msg['conversation_id'],
-                    user_id=user,
-                    text=msg_data['text'],
-                    # python datetime is in seconds, twitter is in ms
-                    created_at=datetime.fromtimestamp(
-                        int(msg_data['time']) / 1000
-                    ).strftime('%Y-%m-%d %H:%M:%S')
-                )
-                messages.append(message)
+            row = message_row(dm, account_id)
+            if row and row["created_at"].timestamp() * 1000 > from_ms:
+                messages.append(Message(**row))
         return messages
 
-    def store_processed_messages(self, db: Session, messages: List[Dict]):
-        """Store the processed messages in DB"""
+    def store_processed_messages(self, db: Session, messages: List[Message]):
+        """Store the processed messages in DB, skipping the ones already stored"""
         try:
-            db.add_all(messages)
+            self.synchronizer.store_messages(db, [{
+                "id": int(message.id),
+                "conversation_id": message.conversation_id,
+                "user_id": message.user_id,
+                "text": message.text,
+                "created_at": message.created_at
+            } for message in messages])
             db.commit()
         except Exception as e:
             db.rollback()
             print(f"Error storing messages: {e}")
 
-    def retrieve_messages_by_users(self, db: Session, user_ids: List) -> Dict:
-        """Retrieve DM messages for the users from DB"""
-        messages = db.query(Message).filter(Message.user_id.in_(user_ids)).all()
-        return {user_id: [self.message_to_dict(message) for message in messages] for user_id in user_ids}
+    def retrieve_messages_by_users(self, db: Session, user_ids: List, limit: Optional[int] = None,
+                                   since: Optional[datetime] = None) -> Dict:
+        """
+        Retrieve the recent DM messages of each user from DB in one query.
+
+        Reads the (user_id, created_at) index: each user's messages are ranked newest first
+        and only the first `limit` newer than `since` are returned.
+
+        Args:
+            db (Session): Database session
+            user_ids (List): X ids of the users
+            limit (Optional[int]): Most messages returned per user, defaults to messages_per_user
+            since (Optional[datetime]): Ignore messages older than this, defaults to context_window ago
+
+        Returns:
+            Dict: user_id -> that user's messages, oldest first (an empty list for users without any)
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        grouped = {user_id: [] for user_id in user_ids}
+        if not user_ids:
+            return grouped
+        if limit is None:
+            limit = self.messages_per_user
+        if since is None:
+            since = datetime.utcnow() - self.context_window
+
+        rank = func.row_number().over(
+            partition_by=Message.user_id, order_by=Message.created_at.desc()
+        ).label("rank")
+        recent = (
+            select(Message.id, rank)
+            .where(Message.user_id.in_(user_ids), Message.created_at >= since)
+            .subquery()
+        )
+        messages = (
+            db.query(Message)
+            .join(recent, Message.id == recent.c.id)
+            .filter(recent.c.rank <= limit)
+            .order_by(Message.user_id, Message.created_at)
+        )
+        keys = {str(user_id): user_id for user_id in user_ids}
+        for message in messages:
+            grouped[keys.get(str(message.user_id), message.user_id)].append(self.message_to_dict(message))
+        return grouped
 
     def retrieve_messages_by_user(self, db: Session, user_id: int) -> List[Dict]:
         """Retrieve DM messages for the user from DB"""
@@ -130,8 +174,10 @@ class DMRetreiver:
 
         prompt = self.create_teleport_check_prompt(messages)
 
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
+        response = get_scheduler().call(
+            "openrouter",
+            get_session("openrouter").post,
+            url=endpoint("openrouter", "chat/completions"),
             headers={
                 "Authorization": f"Bearer {openrouter_api_key}",
             },
@@ -0,0 +1,188 @@
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from twitter.account import Account
+from twitter.constants import dm_params
+from twitter.util import get_headers
+from models import DMConversation, DMSyncCursor, Message
+from engines.twitter.user_ids import get_user_id_resolver
+from rate_limiter import get_scheduler
+
+HISTORY_PAGES_PER_SYNC = 5
+
+_self_ids: Dict[str, str] = {}
+_self_ids_lock = threading.Lock()
+
+
+def self_user_id(account: Account, username: Optional[str] = None, db: Optional[Session] = None) -> Optional[str]:
+    """
+    X id of the logged in account, cached per process.
+
+    Read from the twid cookie ("u=<id>") when present, otherwise resolved by username
+    through the cached UserIdResolver.
+    """
+    cookies = account.session.cookies
+    key = username or "__cookie__"
+    with _self_ids_lock:
+        if key in _self_ids:
+            return _self_ids[key]
+
+    user_id = None
+    twid = unquote(str(cookies.get("twid") or ""))
+    if twid.startswith("u="):
+        user_id = twid[2:]
+    elif username:
+        resolver = get_user_id_resolver()
+        if db is not None:
+            user_id = resolver.resolve(db, cookies, [username]).get(username)
+        else:
+            user_id = resolver.lookup(cookies, [username]).get(username.lower())
+
+    if user_id:
+        with _self_ids_lock:
+            _self_ids[key] = user_id
+    return user_id
+
+
+def message_row(entry: dict, account_id: Optional[str]) -> Optional[dict]:
+    """Message table row for a DM entry, None for non-message entries (joins, reactions, ...)."""
+    message = entry.get("message") if "message" in entry else entry
+    data = (message or {}).get("message_data")
+    if not data or "time" not in data:
+        return None
+    user = data.get("sender_id")
+    if account_id is not None and str(user) == str(account_id):
+        user = data.get("recipient_id")
+    return {
+        "id": int(data["id"]),
+        "conversation_id": message["conversation_id"],
+        # the other participant's X id, like the existing DM rows
+        "user_id": int(user) if user else None,
+        "text": data.get("text"),
+        # python datetime is in seconds, twitter is in ms
+        "created_at": datetime.utcfromtimestamp(int(data["time"]) / 1000),
+    }
+
+
+class DMSynchronizer:
+    """
+    Incremental DM sync.
+
+    The first sync reads the inbox initial state and keeps its cursor; later syncs only
+    ask dm/user_updates for what changed since that cursor. Older messages are paged in
+    per conversation (a few pages per sync) until each conversation's history is
+    complete. Everything is stored with one INSERT ... ON CONFLICT(id) DO NOTHING per page.
+    """
+
+    def __init__(self, history_pages_per_sync: int = HISTORY_PAGES_PER_SYNC):
+        self.history_pages_per_sync = history_pages_per_sync
+
+    def _get(self, account: Account, path: str, params: Optional[dict] = None) -> dict:
+        def request():
+            return account.session.get(
+                f"{account.v1_api}/{path}",
+                headers=get_headers(account.session),
+                params={**dm_params, **(params or {})}
+            ).json()
+        return get_scheduler().call("x", request)
+
+    def store_messages(self, db: Session, rows: List[Optional[dict]]) -> List[dict]:
+        """Bulk insert message rows, skipping ids that are already stored. Returns the inserted rows."""
+        rows = {row["id"]: row for row in rows if row}
+        if not rows:
+            return []
+        inserted = db.execute(
+            sqlite_insert(Message)
+            .values(list(rows.values()))
+            .on_conflict_do_nothing(index_elements=["id"])
+            .returning(Message.id)
+        ).scalars().all()
+        return [rows[message_id] for message_id in inserted]
+
+    def update_conversations(self, db: Session, conversations: dict, from_initial_state: bool) -> None:
+        """Upsert per-conversation cursors from an inbox response's conversations."""
+        now = datetime.utcnow()
+        for conversation_id, info in (conversations or {}).items():
+            conversation = db.get(DMConversation, conversation_id)
+            if conversation is None:
+                conversation = DMConversation(conversation_id=conversation_id, history_complete=False)
+                db.add(conversation)
+                if from_initial_state or "min_entry_id" in info:
+                    # Older pages start below what this response already contained
+                    conversation.oldest_entry_id = info.get("min_entry_id")
+                    conversation.history_complete = info.get("status") == "AT_END"
+            if info.get("max_entry_id"):
+                conversation.newest_entry_id = info["max_entry_id"]
+            conversation.updated_at = now
+
+    def sync(self, db: Session, account: Account, username: Optional[str] = None) -> List[dict]:
+        """
+        Fetch new (and some older) DMs into the Message table.
+
+        Args:
+            db (Session): Database session
+            account (Account): Logged in X account
+            username (Optional[str]): Its username, used when the session has no twid cookie
+
+        Returns:
+            List[dict]: Message rows stored by this call
+        """
+        account_id = self_user_id(account, username, db)
+        state = db.get(DMSyncCursor, str(account_id))
+
+        updates = None
+        if state is not None and state.cursor:
+            updates = self._get(account, "dm/user_updates.json", {"cursor": state.cursor}).get("user_events")
+            if updates is None:
+                print("DM cursor was not accepted, resyncing from the inbox initial state")
+
+        if updates is None:
+            updates = get_scheduler().call("x", account.dm_inbox).get("inbox_initial_state") or {}
+            from_initial_state = True
+        else:
+            from_initial_state = False
+
+        stored = self.store_messages(db, [message_row(entry, account_id) for entry in updates.get("entries") or []])
+        self.update_conversations(db, updates.get("conversations"), from_initial_state)
+        if state is None:
+            state = DMSyncCursor(account_id=str(account_id))
+            db.add(state)
+        if updates.get("cursor"):
+            state.cursor = updates["cursor"]
+        state.updated_at = datetime.utcnow()
+        db.commit()
+
+        stored.extend(self.page_history(db, account, account_id))
+        print(f"DM sync: {len(stored)} new messages")
+        return stored
+
+    def page_history(self, db: Session, account: Account, account_id: Optional[str]) -> List[dict]:
+        """Fetch up to history_pages_per_sync older pages of conversations whose history is incomplete."""
+        stored = []
+        pages = 0
+        pending = (
+            db.query(DMConversation)
+            .filter(DMConversation.history_complete == False)
+            .order_by(DMConversation.updated_at.desc())
+            .all()
+        )
+        for conversation in pending:
+            while not conversation.history_complete and pages < self.history_pages_per_sync:
+                params = {"max_id": conversation.oldest_entry_id} if conversation.oldest_entry_id else {}
+                timeline = self._get(
+                    account, f"dm/conversation/{conversation.conversation_id}.json", params
+                ).get("conversation_timeline") or {}
+                pages += 1
+                stored.extend(self.store_messages(db, [message_row(entry, account_id) for entry in timeline.get("entries") or []]))
+                next_entry_id = timeline.get("min_entry_id")
+                if timeline.get("status") == "AT_END" or not next_entry_id or next_entry_id == conversation.oldest_entry_id:
+                    conversation.history_complete = True
+                conversation.oldest_entry_id = next_entry_id or conversation.oldest_entry_id
+                conversation.updated_at = datetime.utcnow()
+                db.commit()
+            if pages >= self.history_pages_per_sync:
+                break
+        return stored
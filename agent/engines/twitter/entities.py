@@ -0,0 +1,102 @@
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional
+
+MENTION_PATTERN = re.compile(r"@([A-Za-z0-9_]{1,15})")
+# Same pattern the wallet prompt always used, addresses inside links and "@name.eth" included
+WALLET_PATTERN = re.compile(r"\b0x[a-fA-F0-9]{40}\b|\b\S+\.eth\b")
+ADDRESS_PATTERN = re.compile(r"0x[a-fA-F0-9]{40}")
+URL_PATTERN = re.compile(r"https?://\S+")
+# "N. @user [Replying to ...]:" lines of format_conversation_for_llm; tweet text is indented
+# on every line, so a header can't be forged from inside a tweet
+TWEET_HEADER_PATTERN = re.compile(r"^\d+\. @([A-Za-z0-9_]{1,15}) \[[^\]\n]*\]:$", re.MULTILINE)
+STATUS_ID_PATTERN = re.compile(r"/status(?:es)?/(\d+)")
+
+
+class NotificationEntities:
+    """Entities found in one notification, extracted once and shared by every consumer."""
+
+    __slots__ = ("text", "tweet_id", "author", "mentions", "eth_addresses", "ens_names", "wallet_matches",
+                 "wallet_posters", "urls", "tweet_ids")
+
+    def __init__(self, text: str, tweet_id: Optional[str] = None):
+        self.text = text
+        self.tweet_id = tweet_id
+        self.author: Optional[str] = None
+        self.mentions: List[str] = []
+        self.eth_addresses: List[str] = []
+        self.ens_names: List[str] = []
+        self.wallet_matches: List[str] = []
+        self.wallet_posters: Dict[str, Optional[str]] = {}  # candidate -> author of the tweet it was posted in
+        self.urls: List[str] = []
+        self.tweet_ids: List[str] = [tweet_id] if tweet_id else []
+
+    @property
+    def wallet_candidates(self) -> List[str]:
+        """Addresses and ENS names in the order they appear, as the wallet prompt used to list them."""
+        return list(self.wallet_matches)
+
+    def __repr__(self) -> str:
+        return (f"NotificationEntities(tweet_id={self.tweet_id!r}, author={self.author!r}, "
+                f"mentions={self.mentions!r}, eth_addresses={self.eth_addresses!r}, ens_names={self.ens_names!r})")
+
+
+def extract_entities(notification) -> NotificationEntities:
+    """
+    Parse a notification into its entities, once per notification.
+
+    Args:
+        notification: Notification text, or a (content, tweet_id) tuple from the queue
+
+    Returns:
+        NotificationEntities: The author is the first handle in the text (conversation
+        lines start with "1. @user"), mentions keep their order and duplicates, and each
+        wallet candidate is attributed to the author of the tweet that contains it
+    """
+    if isinstance(notification, NotificationEntities):
+        return notification
+    if isinstance(notification, tuple):
+        content, tweet_id = notification[0], notification[1] if len(notification) > 1 else None
+        entities = NotificationEntities(content if isinstance(content, str) else str(content),
+                                        str(tweet_id) if tweet_id is not None else None)
+    else:
+        entities = NotificationEntities(notification if isinstance(notification, str) else str(notification))
+
+    text = entities.text
+    entities.mentions = MENTION_PATTERN.findall(text)
+    headers = [(match.start(), match.group(1)) for match in TWEET_HEADER_PATTERN.finditer(text)]
+    header_starts = [start for start, _ in headers]
+    for match in WALLET_PATTERN.finditer(text):
+        value = match.group(0)
+        entities.wallet_matches.append(value)
+        # The tweet a candidate belongs to is the last header before it, None outside a conversation
+        header = bisect_right(header_starts, match.start()) - 1
+        entities.wallet_posters.setdefault(value, headers[header][1] if header >= 0 else None)
+        if ADDRESS_PATTERN.fullmatch(value):
+            entities.eth_addresses.append(value)
+        else:
+            entities.ens_names.append(value)
+    for url in URL_PATTERN.findall(text):
+        entities.urls.append(url)
+        status = STATUS_ID_PATTERN.search(url)
+        if status and status.group(1) not in entities.tweet_ids:
+            entities.tweet_ids.append(status.group(1))
+
+    if entities.mentions:
+        entities.author = entities.mentions[0]
+    return entities
+
+
+def extract_batch(notifications: Iterable) -> List[NotificationEntities]:
+    """Extract entities for every notification of a batch (already extracted ones pass through)."""
+    return [extract_entities(notification) for notification in notifications]
+
+
+def unique_mentions(batch: Iterable[NotificationEntities]) -> List[str]:
+    """All mentioned handles of a batch, first occurrence order, without duplicates."""
+    return list(dict.fromkeys(mention for entities in batch for mention in entities.mentions))
+
+
+def authors(batch: Iterable[NotificationEntities]) -> List[str]:
+    """The author of each notification that has one."""
+    return [entities.author for entities in batch if entities.author]
@@ -1,83 +1,101 @@
-import json
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import List, Optional
 import requests
-import re
 from twitter.account import Account
-from twitter.scraper import Scraper
+from engines.twitter.user_ids import get_user_id_resolver
+from engines.twitter.create_user import UserManager
+from engines.twitter.entities import NotificationEntities, extract_batch, unique_mentions
 from models import User
+from rate_limiter import get_scheduler, PRIORITY_FOLLOW
+from http_pool import endpoint
+from engines.llm.structured import FollowDecision, StructuredOutputError, parse_items, post_structured
+
+FOLLOWS_KEY = "follows"
 
 
 class FollowManager:
     def __init__(self, config):
         self.config = config
-        pass
-    def _handle_follows(self, notif_context: List[str]) -> None: 
+        self.user_id_resolver = get_user_id_resolver(timedelta(hours=config.user_id_cache_ttl_hours))
+        self.user_manager = UserManager()
+    def _handle_follows(self, notif_context: List[str], entities: Optional[List[NotificationEntities]] = None) -> None:
         """Process and execute follow decisions."""
-        for _ in range(2):  # Max 2 attempts
-            try:
-                decision_data = self.decide_to_follow_users(
-                    self.config.db,
-                    notif_context,
-                    self.config.openrouter_api_key
-                )
-                decisions = json.loads(decision_data)
-
-                if not decisions:
-                    print("No users to follow.")
-                    break   
-
-                for decision in decisions:
-                    username = decision["username"]
-                    score = decision["score"]
-
-                    if score > self.config.min_follow_score:
-                        self.follow_by_username(self.config.account, username)
-                        print(f"user {username} has a high rizz of {score}, now following.")
-                    else:
-                        print(f"Score {score} for user {username} is too low. Not following.")
-                break
-            except Exception as e:
-                print(f"Error processing follow decisions: {e}")
-                continue    
-
-
-    def decide_to_follow_users(self, db, posts, openrouter_api_key: str):
+        if entities is None:
+            entities = extract_batch(notif_context)
+        try:
+            decision_data = self.decide_to_follow_users(
+                self.config.db,
+                notif_context,
+                self.config.openrouter_api_key,
+                entities,
+                self.config.llm_json_mode
+            )
+            # One completion, repaired and validated locally rather than asked for again
+            decisions = parse_items(decision_data, FollowDecision, FOLLOWS_KEY)
+        except StructuredOutputError as e:
+            print(f"Error processing follow decisions: {e}")
+            return
+
+        if not decisions:
+            print("No users to follow.")
+            return
+
+        to_follow = []
+        for decision in decisions:
+            if decision.score > self.config.min_follow_score:
+                to_follow.append(decision.username)
+                print(f"user {decision.username} has a high rizz of {decision.score}, following.")
+            else:
+                print(f"Score {decision.score} for user {decision.username} is too low. Not following.")
+
+        self.follow_usernames(self.config.account, to_follow)
+
+    def follow_usernames(self, account: Account, usernames: List[str]) -> None:
+        """Resolve all usernames in one lookup, then follow them through a bounded worker pool."""
+        if not usernames:
+            return
+        user_ids = self.user_id_resolver.resolve(
+            self.config.db, account.session.cookies, usernames, priority=PRIORITY_FOLLOW
+        )
+        for username in usernames:
+            if username not in user_ids:
+                print(f"Could not resolve user id for {username}")
+
+        workers = max(1, min(self.config.max_follow_workers, len(user_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.follow_user, account, user_id): username
+                for username, user_id in user_ids.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    print(f"Now following {futures[future]}")
+                except Exception as e:
+                    print(f"Error following {futures[future]}: {e}")
+
+
+    def decide_to_follow_users(self, db, posts, openrouter_api_key: str,
+                               entities: Optional[List[NotificationEntities]] = None, json_mode: bool = True):
         """
         Detects Twitter usernames from a list of posts and decides whether to follow them, assigning a score.   
 
         Parameters:
         - posts (List): List of posts of any type
         - openrouter_api_key (str): API key for OpenRouter  
+        - entities (List[NotificationEntities]): Entities already extracted from posts, extracted here when missing
+        - json_mode (bool): Ask for schema-constrained JSON when the provider supports it
 
         Returns:
         - str: JSON-formatted string with a list of decisions
         """
-        # Convert everything to strings first
-        str_posts = [str(post) for post in posts]   
-
-        # Extract Twitter usernames
-        twitter_pattern = re.compile(r"@([A-Za-z0-9_]{1,15})")
-        twitter_usernames = []  
-
-        for post in str_posts:
-            found_usernames = twitter_pattern.findall(post)
-            twitter_usernames.extend(found_usernames)   
-
-        # Remove duplicates
-        twitter_usernames = list(set(twitter_usernames))    
+        if entities is None:
+            entities = extract_batch(posts)
+        twitter_usernames = unique_mentions(entities)
 
-        # Query existing usernames from the database
-        existing_usernames = db.query(User.username).filter(User.username.in_(twitter_usernames)).all()
-        existing_usernames = [username[0] for username in existing_usernames]  # Convert list of tuples to list of strings  
-
-        # Remove usernames that already exist in the database
-        twitter_usernames = [username for username in twitter_usernames if username not in existing_usernames]  
-
-        # Add new usernames to the database
-        for username in twitter_usernames:
-            new_user = User(username=username)
-            db.add(new_user)
-        db.commit() 
+        # Add new usernames to the database, keeping only the ones we haven't seen before
+        twitter_usernames = self.user_manager.ensure_usernames(db, twitter_usernames)
 
         # Prepare the prompt
         prompt = f"""
@@ -114,17 +132,21 @@ class FollowManager:
         """ 
 
         # Send the prompt to the AI model
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
+        response = post_structured(
+            "openrouter",
+            endpoint("openrouter", "chat/completions"),
+            {
                 "Authorization": f"Bearer {openrouter_api_key}",
             },
-            json={
+            {
                 "model": "meta-llama/llama-3.1-70b-instruct",
                 "messages": [{"role": "user", "content": prompt}],
                 "temperature": 0.7,
             },
-        )   
+            FollowDecision,
+            FOLLOWS_KEY,
+            json_mode
+        )
 
         if response.status_code == 200:
             return response.json()["choices"][0]["message"]["content"]
@@ -133,16 +155,14 @@ class FollowManager:
 
 
     def get_user_id(self, account: Account, username):
-        scraper = Scraper(account.session.cookies)
-        users = scraper.users([username])
-        if users:
-            return users[0].id
-        else:
-            return None 
+        user_ids = self.user_id_resolver.resolve(
+            self.config.db, account.session.cookies, [username], priority=PRIORITY_FOLLOW
+        )
+        return user_ids.get(username)
 
 
     def follow_user(self, account: Account, user_id):
-        return account.follow(user_id)  
+        return get_scheduler().call("x", account.follow, user_id, priority=PRIORITY_FOLLOW)
 
 
     def follow_by_username(self, account: Account, username): 
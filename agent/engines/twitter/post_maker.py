@@ -14,14 +14,59 @@
 
 import time
 import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional
 from engines.prompts.prompts import get_tweet_prompt
 from engines.memory.significance_scorer import SignificanceScorer
 from engines.memory.long_term_mem import LongTermMemoryManager
+from engines.llm.streaming import stream_text
+from engines.prompts.context_budget import tokens_for_chars
+from engines.twitter.tweet_formatter import format_tweet, FormatterStats
+from rate_limiter import get_scheduler
+from http_pool import get_session, endpoint
+from circuit_breaker import CircuitOpenError
+
+class CandidateBudget:
+    """Sizes best-of-N post generation from how often recent posts were rejected."""
+
+    def __init__(self, min_candidates: int = 1, max_candidates: int = 4, window: int = 10):
+        self.min_candidates = max(1, min_candidates)
+        self.max_candidates = max(self.min_candidates, max_candidates)
+        self.outcomes = deque(maxlen=window)
+
+    def record(self, accepted: bool) -> None:
+        """Record whether the best candidate of a cycle cleared the posting threshold."""
+        self.outcomes.append(accepted)
+
+    def rejection_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def next_count(self) -> int:
+        """More rejections -> more candidates per cycle, up to max_candidates."""
+        spread = self.max_candidates - self.min_candidates
+        return self.min_candidates + round(self.rejection_rate() * spread)
+
 
 class PostMaker:
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        stream: bool = False,
+        max_post_chars: int = 220,
+        min_candidates: int = 1,
+        max_candidates: int = 1,
+        candidate_window: int = 10,
+        format_mode: str = "llm"
+    ):
+        self.stream = stream
+        self.max_post_chars = max_post_chars
+        self.candidate_budget = CandidateBudget(min_candidates, max_candidates, candidate_window)
+        self.format_mode = format_mode  # "llm": always use the chat formatter, "local": rules first, LLM as fallback
+        self.formatter_stats = FormatterStats()
+        self.significance_scorer = SignificanceScorer()
+        self.long_term_mem = LongTermMemoryManager()
 
     def generate_post(self, short_term_memory: str, long_term_memories: List[Dict], recent_posts: List[Dict], external_context, llm_api_key: str, query: str) -> str:
         """
@@ -52,8 +97,37 @@ class PostMaker:
         base_model_output = ""
         while tries < max_tries:
             try:
-                response = requests.post(
-                    url="https://api.hyperbolic.xyz/v1/completions",
+                if self.stream:
+                    # Stop reading as soon as a tweet-length candidate has streamed in
+                    content = stream_text(
+                        url=endpoint("hyperbolic", "completions"),
+                        headers={
+                            "Content-Type": "application/json",
+                            "Authorization": f"Bearer {llm_api_key}",
+                        },
+                        payload={
+                        "prompt": prompt,
+                        "model": "meta-llama/Meta-Llama-3.1-405B",
+                        "max_tokens": min(512, tokens_for_chars(self.max_post_chars)),
+                        "temperature": 1,
+                        "top_p": 0.95,
+                        "top_k": 40,
+                        "stop":["<|im_end|>", "<"]
+                        },
+                        max_chars=self.max_post_chars,
+                        stop_at_paragraph=True
+                    )
+                    if content and content.strip():
+                        print(f"Base model streamed response: {content}")
+                        base_model_output = content
+                        break
+                    tries += 1
+                    continue
+
+                response = get_scheduler().call(
+                    "hyperbolic",
+                    get_session("hyperbolic").post,
+                    url=endpoint("hyperbolic", "completions"),
                     headers={
                         "Content-Type": "application/json",
                         "Authorization": f"Bearer {llm_api_key}",
@@ -77,20 +151,36 @@ class PostMaker:
                         break
                 # print(f"Attempt {tries + 1} failed. Status code: {response.status_code}")
                 # print(f"Response: {response.text}")
+                tries += 1
+            except CircuitOpenError as e:
+                print(f"Skipping post generation: {e}")
+                return ""
             except Exception as e:
                 print(f"Error on attempt {tries + 1}: {str(e)}")
                 tries += 1
                 time.sleep(1)  # Add a small delay between retries
 
-        time.sleep(5)
+        if not base_model_output:
+            return ""
+
+        if self.format_mode == "local":
+            # Clean up locally, only pay for the chat formatter when the rules can't produce a tweet
+            formatted = format_tweet(base_model_output, self.max_post_chars)
+            self.formatter_stats.record(fell_back=formatted is None)
+            print(self.formatter_stats)
+            if formatted:
+                print(f"Formatted locally: {formatted}")
+                return formatted
 
         # TAKES BASE MODEL OUTPUT AND CLEANS IT UP AND EXTRACT THE TWEET 
         tries = 0
         max_tries = 3
         while tries < max_tries:
             try:
-                response = requests.post(
-                    url="https://api.hyperbolic.xyz/v1/chat/completions",
+                response = get_scheduler().call(
+                    "hyperbolic",
+                    get_session("hyperbolic").post,
+                    url=endpoint("hyperbolic", "chat/completions"),
                     headers={
                         "Content-Type": "application/json",
                         "Authorization": f"Bearer {llm_api_key}",
@@ -138,12 +228,73 @@ class PostMaker:
                     if content and content.strip():
                         print(f"Response: {content}")
                         return content
+                tries += 1
+            except CircuitOpenError as e:
+                print(f"Skipping tweet formatting: {e}")
+                return ""
             except Exception as e:
                 print(f"Error on attempt {tries + 1}: {str(e)}")
                 tries += 1
                 time.sleep(1)  # Add a small delay between retries
 
     
+    def _prepare_and_score(self, raw_post: Optional[str], llm_api_key: str) -> tuple[str, float]:
+        """Clean up a generated post and score its significance. Runs inside a candidate worker."""
+        if not raw_post:
+            return "", 0
+        post_content = raw_post.strip('"')
+        if len(post_content) > self.max_post_chars:
+            post_content = post_content[:self.max_post_chars]
+
+        post_content += "\nShare tweets on tee-fb.vercel.app for extra testnet tokens"
+
+        significance_score = self.significance_scorer.score_significance(
+            post_content,
+            llm_api_key
+        ) or 0
+        print(f"Candidate: {post_content} (significance: {significance_score})")
+        return post_content, significance_score
+
+    def generate_candidates(
+       self,
+       num_candidates: int,
+       short_term_memory: str,
+       long_term_memories: list,
+       formatted_posts: list,
+       notif_context: list,
+       llm_api_key: str,
+       query: str
+    ) -> List[tuple[str, float]]:
+       """
+       Generate, format and score several post candidates concurrently.
+
+       Returns:
+           List[tuple]: (post_content, significance_score) for every candidate that produced text
+       """
+       def make_candidate(_):
+           raw_post = self.generate_post(
+               short_term_memory,
+               long_term_memories,
+               formatted_posts,
+               notif_context,
+               llm_api_key,
+               query=query
+           )
+           return self._prepare_and_score(raw_post, llm_api_key)
+
+       candidates = []
+       with ThreadPoolExecutor(max_workers=num_candidates) as executor:
+           futures = [executor.submit(make_candidate, i) for i in range(num_candidates)]
+           for future in as_completed(futures):
+               try:
+                   post_content, significance_score = future.result()
+               except Exception as e:
+                   print(f"Error generating candidate: {e}")
+                   continue
+               if post_content:
+                   candidates.append((post_content, significance_score))
+       return candidates
+
     def generate_and_evaluate_post(
        self,
        short_term_memory: str,
@@ -154,10 +305,11 @@ class PostMaker:
        openai_api_key: str,
        db,
        min_storing_memory_significance: float,
-       query: str = "what is your post based on the TL\n<tweet>"
+       query: str = "what is your post based on the TL\n<tweet>",
+       min_posting_significance_score: Optional[float] = None
     ) -> tuple[str, float]:
        """
-       Generate a new post, evaluate its significance, and store in memory if significant.
+       Generate post candidates in parallel, keep the most significant one and store it in memory if significant.
     
        Args:
            short_term_memory: Current short-term memory state
@@ -169,44 +321,51 @@ class PostMaker:
            db: Database session
            min_storing_memory_significance: Minimum score to store memory
            query: Prompt for post generation
+           min_posting_significance_score: Posting threshold, used to track the rejection rate that sizes N
            
        Returns:
            tuple: (new_post_content, significance_score)
-               - new_post_content: The generated post content
-               - significance_score: Evaluated significance score of the post
+               - new_post_content: The best generated post content
+               - significance_score: Evaluated significance score of that post
        """
-       new_post_content = self.generate_post(
+       num_candidates = self.candidate_budget.next_count()
+       print(f"Generating {num_candidates} post candidate(s) "
+             f"(recent rejection rate: {self.candidate_budget.rejection_rate():.0%})")
+
+       candidates = self.generate_candidates(
+           num_candidates,
            short_term_memory,
            long_term_memories,
            formatted_posts,
            notif_context,
            llm_api_key,
-           query=query
-       ).strip('"')
-       if len(new_post_content) > 220:
-            new_post_content = new_post_content[:220]
-
-       new_post_content.append("\nShare tweets on tee-fb.vercel.app for extra testnet tokens")
+           query
+       )
+       if not candidates:
+           print("No post candidates were generated")
+           return "", 0
 
+       new_post_content, significance_score = max(candidates, key=lambda c: c[1])
        print(f"New post content: {new_post_content}")
-    
-       significance_score = self.SignificanceScorer.score_significance(
-           new_post_content,
-           llm_api_key
-       )
-       print(f"Significance score: {significance_score}")
+       print(f"Significance score: {significance_score} (best of {len(candidates)})")
+
+       if min_posting_significance_score is not None:
+           self.candidate_budget.record(significance_score >= min_posting_significance_score)
     
        # Store significant memories
        if significance_score >= min_storing_memory_significance:
-           new_post_embedding = LongTermMemoryManager.create_embedding(
-               new_post_content,
-               openai_api_key
-           )
-           LongTermMemoryManager.store_memory(
-               db,
-               new_post_content,
-               new_post_embedding,
-               significance_score
-           )
+           try:
+               new_post_embedding = self.long_term_mem.create_embedding(
+                   new_post_content,
+                   openai_api_key
+               )
+               self.long_term_mem.store_memory(
+                   db,
+                   new_post_content,
+                   new_post_embedding,
+                   significance_score
+               )
+           except CircuitOpenError as e:
+               print(f"Not storing post in long-term memory: {e}")
     
-       return new_post_content, significance_score
\ No newline at end of file
+       return new_post_content, significance_score
@@ -5,10 +5,12 @@ from sqlalchemy.orm import Session
 from models import Post, TweetPost
 from sqlalchemy.orm import class_mapper
 from twitter.account import Account
+from rate_limiter import get_scheduler
 
 class PostRetriever:
     def __init__(self):
-        pass
+        # tweet id -> {"is_reply", "author", "followers"} for the last fetched notifications
+        self.notification_metadata = {}
 
     def sqlalchemy_obj_to_dict(self, obj):
         """Convert a SQLAlchemy object to a dictionary."""
@@ -247,7 +249,9 @@ class PostRetriever:
                             if tweet['reply_to'] else "[Original tweet]")
 
             output.append(f"{i}. {tweet['username']} {reply_context}:")
-            output.append(f"   \"{tweet['text']}\"")
+            # Indent every line of the text so it can't pass for a tweet header
+            text = tweet['text'].replace("\n", "\n   ")
+            output.append(f"   \"{text}\"")
             output.append("")
 
         return "\n".join(output)
@@ -257,6 +261,7 @@ class PostRetriever:
         if 'globalObjects' not in data or 'tweets' not in data['globalObjects']:
             return "no new replies or mentions"
         tweets = data['globalObjects']['tweets']
+        users = data['globalObjects'].get('users', {})
         processed_roots = set()
         conversations = []
 
@@ -274,6 +279,13 @@ class PostRetriever:
                 conversation = self.format_conversation_for_llm(data, tweet_id)
                 if conversation != "No conversation found.":
                     conversations.append((conversation, tweet_id))
+                    tweet = tweets[tweet_id]
+                    author = users.get(str(tweet.get('user_id')), {})
+                    self.notification_metadata[tweet_id] = {
+                        "is_reply": bool(tweet.get('in_reply_to_status_id_str')),
+                        "author": author.get('screen_name'),
+                        "followers": author.get('followers_count', 0),
+                    }
 
         if not conversations:
             return "No conversations found."
@@ -401,6 +413,7 @@ class PostRetriever:
     def fetch_notification_context(self, account: Account) -> str:
         """Fetch notification context using the new Account-based approach."""
         context = []
+        self.notification_metadata = {}
 
         # Get timeline posts
         # print("getting timeline")
@@ -409,7 +422,7 @@ class PostRetriever:
         # context.extend(timeline)
 
         print("getting notifications")
-        notifications = account.notifications()
+        notifications = get_scheduler().call("x", account.notifications)
         print(notifications)
 
         print(f"getting reply trees")
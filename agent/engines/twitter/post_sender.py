@@ -1,6 +1,8 @@
 from typing import Dict, Optional
 import requests
 from models import TweetPost
+from rate_limiter import get_scheduler, PRIORITY_REPLY, PRIORITY_POST
+from http_pool import get_session
 from twitter.account import Account
 
 class PostSender:
@@ -8,7 +10,7 @@ class PostSender:
         pass
 
     def reply_post(self, account: Account, content: str, tweet_id) -> str:
-        res = account.reply(content, tweet_id=tweet_id)
+        res = get_scheduler().call("x", account.reply, content, tweet_id=tweet_id, priority=PRIORITY_REPLY)
         return res
 
     def send_post_API(self, auth, content: str) -> str:
@@ -24,7 +26,7 @@ class PostSender:
             'text': content
         }
         try:
-            response = requests.post(url, json=payload, auth=auth)
+            response = get_scheduler().call("x", get_session("x").post, url, json=payload, auth=auth, priority=PRIORITY_POST)
 
             if response.status_code == 201:  # Twitter API returns 201 for successful tweet creation
                 tweet_data = response.json()
@@ -44,7 +46,7 @@ class PostSender:
         - content: The message to tweet.
         """
 
-        res = account.tweet(content)
+        res = get_scheduler().call("x", account.tweet, content, priority=PRIORITY_POST)
         return res
 
 
@@ -84,14 +86,14 @@ class PostSender:
 
 
 
-    def _post_content(self, content: str) -> Optional[str]:
+    def _post_content(self, content: str, auth, account: Account) -> Optional[str]:
         """Attempt to post content using available methods."""
         # Try API method first
-        tweet_id = self.send_post_API(self.config.auth, content)
+        tweet_id = self.send_post_API(auth, content)
         if tweet_id:
             return tweet_id
         # Fallback to account method
-        response = self.send_post(self.config.account, content)
+        response = self.send_post(account, content)
         return (response.get('data', {})
                 .get('create_tweet', {})
                 .get('tweet_results', {})
@@ -2,9 +2,10 @@ import json
 import random
 import re
 import time
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from engines.memory.significance_scorer import SignificanceScorer
+from engines.twitter.entities import NotificationEntities, extract_batch
 from engines.twitter.post_maker import PostMaker
 from engines.twitter.post_sender import PostSender
 from models import Post
@@ -41,16 +42,18 @@ class ReplyManager:
             else:
                 return False
 
-    def _handle_replies(self, external_context: List[Tuple[str, str]]) -> None:
+    def _handle_replies(self, external_context: List[Tuple[str, str]],
+                        entities: Optional[List[NotificationEntities]] = None) -> None:
         """Handle replies to mentions and interactions."""
-        for content, tweet_id in external_context:
-            user_match = re.search(r'@(\w+)', content)
-            if not user_match:
+        if entities is None:
+            entities = extract_batch(external_context)
+        for notification in entities:
+            content, tweet_id, user_id = notification.text, notification.tweet_id, notification.author
+            if not user_id:
                 continue
             # dont reply to yourself
-            if user_match.group(1) == self.config.bot_username:  # Changed comparison
+            if user_id == self.config.bot_username:  # Changed comparison
                 continue
-            user_id = user_match.group(1)
             
             if self._should_reply(content, user_id) == False:
                 continue
@@ -66,7 +69,7 @@ class ReplyManager:
                 )
                 reply_content += "\nShare tweets on https://tee-fb.vercel.app for extra testnet tokens"
                 print(f"Generated reply: {reply_content}")
-                response = self.config.account.reply(reply_content, tweet_id=tweet_id)
+                response = self.post_sender.reply_post(self.config.account, reply_content, tweet_id)
                 # Verify the post was successful
                 if self.post_sender.verify_post_success(response):
                     print(f"VERIFIED Replied to {user_id} with: {reply_content}")
@@ -89,8 +92,6 @@ class ReplyManager:
             except Exception as e:
                 print(f"Error handling reply: {e}")
 
-            time.sleep(30)
-
     def is_spam(self, content: str) -> bool:
         """Check if content appears to be spam."""
         import re
@@ -0,0 +1,131 @@
+# Tweet Formatter
+# Objective: Deterministic, local version of the "tweet formatter" LLM pass. Takes the raw base model output and
+# extracts a single clean tweet from it, so the chat model is only needed when these rules give up.
+
+# Inputs:
+# Raw base model output
+
+# Outputs:
+# A single tweet, or None when the rules can't produce a valid one
+
+import re
+import threading
+from typing import List, Optional
+
+PREFIX_PATTERN = re.compile(
+    r"^\s*(?:(?:here(?:'s| is) (?:a|my|the) )?(?:tweet|post|reply|response)\s*\d*\s*[:\-]|\d+[.)])\s*",
+    re.IGNORECASE,
+)
+HASHTAG_PATTERN = re.compile(r"(?<!\w)#\w+")
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F000-\U0001FAFF"  # pictographs, emoticons, transport, symbols & pictographs extended
+    "\U00002600-\U000027BF"  # misc symbols, dingbats
+    "\U00002B00-\U00002BFF"  # arrows, stars
+    "\U0000FE0F\U0000200D"   # variation selector, zero width joiner
+    "\U000E0020-\U000E007F"  # tag characters (flag sequences)
+    "]+"
+)
+SENTENCE_END_PATTERN = re.compile(r"[.!?…~)\"']+(?=\s|$)")
+MULTI_TWEET_SPLIT = re.compile(r"\n\s*\n|\n(?=\s*(?:\d+[.)]|tweet\s*\d*\s*:))", re.IGNORECASE)
+# Leftovers from the prompt or meta commentary the LLM formatter would have removed
+REJECT_PATTERN = re.compile(
+    r"<\s*/?\s*tweet|external context|analy[sz]ing (?:a|the|this) post|as an ai|no tweet found",
+    re.IGNORECASE,
+)
+MIN_TWEET_CHARS = 10
+
+
+def clean_candidate(text: str) -> str:
+    """Strip prefixes, wrapping quotes, hashtags, emojis and extra whitespace from one candidate."""
+    text = PREFIX_PATTERN.sub("", text.strip())
+    text = text.strip().strip('"').strip("“”").strip()
+    text = HASHTAG_PATTERN.sub("", text)
+    text = EMOJI_PATTERN.sub("", text)
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" +([.,!?])", r"\1", text)
+    text = re.sub(r" *\n *", "\n", text)
+    return text.strip()
+
+
+def truncate_at_sentence(text: str, max_chars: int) -> str:
+    """
+    Cut text to fit max_chars, ending on a sentence boundary.
+
+    A trailing sentence that was cut off by the base model (no closing punctuation) is dropped as well,
+    unless it is the only sentence.
+    """
+    ends = [m.end() for m in SENTENCE_END_PATTERN.finditer(text)]
+    if len(text) <= max_chars and (not ends or ends[-1] == len(text)):
+        return text
+
+    fitting = [end for end in ends if end <= max_chars]
+    if fitting:
+        return text[:fitting[-1]].strip()
+    if len(text) <= max_chars:
+        return text
+    return ""
+
+
+def split_candidates(text: str) -> List[str]:
+    """Split output that looks like multiple tweets into separate candidates."""
+    return [part for part in MULTI_TWEET_SPLIT.split(text) if part and part.strip()]
+
+
+def format_tweet(raw_output: str, max_chars: int = 220) -> Optional[str]:
+    """
+    Extract a single tweet from raw base model output using local rules only.
+
+    Args:
+        raw_output (str): Base model output
+        max_chars (int): Maximum tweet length
+
+    Returns:
+        Optional[str]: The formatted tweet, or None if the LLM formatter should handle it
+    """
+    if not raw_output or not raw_output.strip():
+        return None
+
+    valid = []
+    for candidate in split_candidates(raw_output):
+        if REJECT_PATTERN.search(candidate):
+            continue
+        # All caps tweets are kept exactly as they are, minus any "Tweet:" style prefix
+        stripped = PREFIX_PATTERN.sub("", candidate.strip())
+        if stripped.isupper() and len(stripped) <= max_chars:
+            valid.append(stripped)
+            continue
+        tweet = truncate_at_sentence(clean_candidate(candidate), max_chars)
+        if len(tweet) >= MIN_TWEET_CHARS:
+            valid.append(tweet)
+
+    if not valid:
+        return None
+    # Without a model to judge which one is funniest, prefer the most complete (longest) candidate
+    return max(valid, key=len)
+
+
+class FormatterStats:
+    """Counts how often the local formatter had to fall back to the LLM formatter."""
+
+    def __init__(self):
+        self.local = 0
+        self.fallback = 0
+        self._lock = threading.Lock()
+
+    def record(self, fell_back: bool) -> None:
+        with self._lock:
+            if fell_back:
+                self.fallback += 1
+            else:
+                self.local += 1
+
+    @property
+    def total(self) -> int:
+        return self.local + self.fallback
+
+    def fallback_rate(self) -> float:
+        return self.fallback / self.total if self.total else 0.0
+
+    def __str__(self) -> str:
+        return f"LLM formatter fallback: {self.fallback}/{self.total} ({self.fallback_rate():.0%})"
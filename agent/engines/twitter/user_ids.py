@@ -0,0 +1,121 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+from twitter.scraper import Scraper
+from models import User
+from engines.twitter.create_user import UserManager
+from rate_limiter import get_scheduler, PRIORITY_DEFAULT
+
+USER_ID_TTL = timedelta(days=7)
+
+_scrapers: Dict[str, Scraper] = {}
+_lock = threading.Lock()
+
+
+def get_scraper(cookies) -> Scraper:
+    """
+    Shared Scraper per set of cookies.
+
+    Building a Scraper sets up a new HTTP client (and session checks), so lookups reuse one.
+    """
+    cookies = dict(cookies)
+    key = json.dumps(cookies, sort_keys=True)
+    with _lock:
+        scraper = _scrapers.get(key)
+        if scraper is None:
+            scraper = Scraper(cookies=cookies)
+            _scrapers[key] = scraper
+        return scraper
+
+
+def parse_user_results(responses) -> Dict[str, str]:
+    """
+    Map lowercase screen names to rest_ids from Scraper.users() responses.
+
+    Users that could not be found (suspended, renamed) are left out.
+    """
+    found = {}
+    for response in responses or []:
+        try:
+            result = response["data"]["user"]["result"]
+            found[result["legacy"]["screen_name"].lower()] = result["rest_id"]
+        except (KeyError, TypeError):
+            continue
+    return found
+
+
+class UserIdResolver:
+    """Resolves X usernames to rest_ids, cached on the User table for ttl."""
+
+    def __init__(self, ttl: timedelta = USER_ID_TTL):
+        self.ttl = ttl
+
+    def lookup(self, cookies, usernames: List[str], priority: int = PRIORITY_DEFAULT) -> Dict[str, str]:
+        """One batched scraper.users() call for all usernames, keyed by lowercase screen name."""
+        if not usernames:
+            return {}
+        responses = get_scheduler().call("x", get_scraper(cookies).users, usernames, priority=priority)
+        return parse_user_results(responses)
+
+    def resolve(self, db: Session, cookies, usernames: List[str], priority: int = PRIORITY_DEFAULT) -> Dict[str, str]:
+        """
+        Resolve usernames to rest_ids, only looking up the ones without a fresh cached id.
+
+        Args:
+            db (Session): Database session
+            cookies: X auth cookies for the shared Scraper
+            usernames (List[str]): Usernames, without "@"
+            priority (int): Rate limiter priority of the lookup
+
+        Returns:
+            Dict[str, str]: username -> rest_id for every username that could be resolved
+        """
+        usernames = list(dict.fromkeys(usernames))
+        if not usernames:
+            return {}
+
+        cutoff = datetime.utcnow() - self.ttl
+        cached = {
+            username: x_id for username, x_id in
+            db.query(User.username, User.x_id).filter(
+                User.username.in_(usernames),
+                User.x_id.isnot(None),
+                User.x_id_resolved_at >= cutoff
+            )
+        }
+        missing = [username for username in usernames if username not in cached]
+        if not missing:
+            return cached
+
+        found = self.lookup(cookies, missing, priority)
+        resolved = {username: found[username.lower()] for username in missing if username.lower() in found}
+        if resolved:
+            self.store(db, resolved)
+        print(f"Resolved {len(cached)} user ids from cache, {len(resolved)}/{len(missing)} from X")
+        return {**cached, **resolved}
+
+    def store(self, db: Session, resolved: Dict[str, str]) -> None:
+        now = datetime.utcnow()
+        UserManager().ensure_usernames(db, list(resolved))
+        users = User.__table__
+        # Core executemany (one prepared UPDATE for all rows) rather than an ORM bulk update by primary key
+        db.connection().execute(
+            update(users)
+            .where(users.c.username == bindparam("name"))
+            .values(x_id=bindparam("resolved_id"), x_id_resolved_at=now),
+            [{"name": username, "resolved_id": x_id} for username, x_id in resolved.items()]
+        )
+        db.commit()
+
+
+resolver = UserIdResolver()
+
+
+def get_user_id_resolver(ttl: Optional[timedelta] = None) -> UserIdResolver:
+    """Process-wide resolver; passing ttl updates the cache TTL."""
+    if ttl is not None:
+        resolver.ttl = ttl
+    return resolver
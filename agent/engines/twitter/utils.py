@@ -1,10 +1,11 @@
 import os
 import json
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import re
-from twitter.scraper import Scraper
 from dotenv import load_dotenv
+from engines.twitter.user_ids import get_user_id_resolver
+from engines.twitter.entities import extract_batch, unique_mentions
 
 load_dotenv()
 
@@ -164,26 +165,25 @@ def is_spam(self, content: str) -> bool:
         ]
     return any(re.search(p, clean) for p in patterns)
 
-def user_id_by_usernames(account, usernames:list) -> list:
-    """Get the ID of a user by their username"""
-    # TODO: get access tokens from account input var instead
-    auth_tokens = json.loads(os.getenv("X_AUTH_TOKENS"))
-    scraper = Scraper(cookies=auth_tokens)
-    users = scraper.users(usernames)
-    return [user['data']['user']['result']['rest_id'] for user in users]
-
-def extract_usernames_from_notif_context(account, notif_context):
-    # Convert everything to strings first
-    str_notifs = [str(notif) for notif in notif_context]
-
-    # Extract Twitter usernames
-    twitter_pattern = re.compile(r"@([A-Za-z0-9_]{1,15})")
-    twitter_usernames = []  
+def user_id_by_usernames(account, usernames:list, db=None) -> Dict[str, Optional[str]]:
+    """
+    Get the IDs of users by their usernames (cached on the User table when db is given)
 
-    for notif in str_notifs:
-        found_usernames = twitter_pattern.findall(notif)
-        twitter_usernames.extend(found_usernames)
+    Returns:
+        Dict[str, Optional[str]]: username -> rest_id for every input username, None when it could not be resolved
+    """
+    cookies = account.session.cookies if account is not None else json.loads(os.getenv("X_AUTH_TOKENS"))
+    resolver = get_user_id_resolver()
+    if db is not None:
+        user_ids = resolver.resolve(db, cookies, usernames)
+    else:
+        found = resolver.lookup(cookies, usernames)
+        user_ids = {username: found[username.lower()] for username in usernames if username.lower() in found}
+    return {username: user_ids.get(username) for username in usernames}
 
-    # Remove duplicates
-    twitter_usernames = list(set(twitter_usernames))
-    return user_id_by_usernames(account, twitter_usernames)
\ No newline at end of file
+def extract_usernames_from_notif_context(account, notif_context, entities=None):
+    """Resolve the X user ids of every handle mentioned in the notifications"""
+    if entities is None:
+        entities = extract_batch(notif_context)
+    user_ids = user_id_by_usernames(account, unique_mentions(entities))
+    return [user_id for user_id in user_ids.values() if user_id is not None]
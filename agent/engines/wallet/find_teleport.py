@@ -1,22 +1,44 @@
+import os
+from datetime import datetime
+from typing import List, Optional
 from web3 import Web3
 import requests
 import json
+import base64
+from sqlalchemy import bindparam, update
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import TeleportHolder, User
+from engines.twitter.create_user import UserManager
+from engines.wallet.teleport_events import NewTokenData, MAX_BLOCK_RANGE, block_ranges, logs_filter, filter_and_decode
 from engines.twitter.post_sender import PostSender
 from twitter.account import Account
+from rate_limiter import get_scheduler
+from http_pool import get_session, get_web3, endpoint
+from circuit_breaker import get_breaker
+
+# Only needed for tokenURI calls, so it is parsed on first use
+TELEPORT_ABI = '[{"inputs":[{"internalType":"string","name":"_name","type":"string"},{"internalType":"string","name":"_symbol","type":"string"},{"internalType":"address","name":"initialOwner","type":"address"}],"stateMutability":"nonpayable","type":"constructor"},{"inputs":[{"internalType":"address","name":"sender","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"},{"internalType":"address","name":"owner","type":"address"}],"name":"ERC721IncorrectOwner","type":"error"},{"inputs":[{"internalType":"address","name":"operator","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"ERC721InsufficientApproval","type":"error"},{"inputs":[{"internalType":"address","name":"approver","type":"address"}],"name":"ERC721InvalidApprover","type":"error"},{"inputs":[{"internalType":"address","name":"operator","type":"address"}],"name":"ERC721InvalidOperator","type":"error"},{"inputs":[{"internalType":"address","name":"owner","type":"address"}],"name":"ERC721InvalidOwner","type":"error"},{"inputs":[{"internalType":"address","name":"receiver","type":"address"}],"name":"ERC721InvalidReceiver","type":"error"},{"inputs":[{"internalType":"address","name":"sender","type":"address"}],"name":"ERC721InvalidSender","type":"error"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"ERC721NonexistentToken","type":"error"},{"inputs":[],"name":"NonExistentTokenURI","type":"error"},{"inputs":[{"internalType":"address","name":"owner","type":"address"}],"name":"OwnableInvalidOwner","type":"error"},{"inputs":[{"internalType":"address","name":"account","type":"address"}],"name":"OwnableUnauthorizedAccount","type":"error"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"owner","type":"address"},{"indexed":true,"internalType":"address","name":"approved","type":"address"},{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"Approval","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"owner","type":"address"},{"indexed":true,"internalType":"address","name":"operator","type":"address"},{"indexed":false,"internalType":"bool","name":"approved","type":"bool"}],"name":"ApprovalForAll","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"},{"indexed":true,"internalType":"uint256","name":"x_id","type":"uint256"},{"indexed":false,"internalType":"address","name":"to","type":"address"},{"indexed":false,"internalType":"string","name":"policy","type":"string"},{"indexed":false,"internalType":"string","name":"name","type":"string"},{"indexed":false,"internalType":"string","name":"username","type":"string"},{"indexed":false,"internalType":"string","name":"pfp","type":"string"}],"name":"NewTokenData","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"previousOwner","type":"address"},{"indexed":true,"internalType":"address","name":"newOwner","type":"address"}],"name":"OwnershipTransferred","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"},{"indexed":true,"internalType":"uint256","name":"x_id","type":"uint256"},{"indexed":false,"internalType":"string","name":"policy","type":"string"},{"indexed":false,"internalType":"string","name":"tweetId","type":"string"}],"name":"RedeemLike","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"},{"indexed":true,"internalType":"uint256","name":"x_id","type":"uint256"},{"indexed":false,"internalType":"address","name":"addr","type":"address"},{"indexed":false,"internalType":"string","name":"policy","type":"string"},{"indexed":false,"internalType":"string","name":"content","type":"string"}],"name":"RedeemTweet","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"minter","type":"address"}],"name":"RemoveMinter","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"from","type":"address"},{"indexed":true,"internalType":"address","name":"to","type":"address"},{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"Transfer","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"minter","type":"address"}],"name":"WhitelistMinter","type":"event"},{"inputs":[{"internalType":"address","name":"to","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"approve","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"owner","type":"address"}],"name":"balanceOf","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"currentTokenId","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"getApproved","outputs":[{"internalType":"address","name":"","type":"address"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"address","name":"owner","type":"address"},{"internalType":"address","name":"operator","type":"address"}],"name":"isApprovedForAll","outputs":[{"internalType":"bool","name":"","type":"bool"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"address","name":"","type":"address"}],"name":"isWhitelisted","outputs":[{"internalType":"bool","name":"","type":"bool"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"address","name":"recipient","type":"address"},{"internalType":"uint256","name":"x_id","type":"uint256"},{"internalType":"string","name":"policy","type":"string"},{"internalType":"string","name":"name","type":"string"},{"internalType":"string","name":"username","type":"string"},{"internalType":"string","name":"pfp","type":"string"},{"internalType":"bytes32","name":"nftIdHash","type":"bytes32"}],"name":"mintTo","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"stateMutability":"nonpayable","type":"function"},{"inputs":[],"name":"name","outputs":[{"internalType":"string","name":"","type":"string"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"bytes32","name":"","type":"bytes32"}],"name":"nftIdMap","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"owner","outputs":[{"internalType":"address","name":"","type":"address"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"ownerOf","outputs":[{"internalType":"address","name":"","type":"address"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"},{"internalType":"string","name":"content","type":"string"},{"internalType":"enum NFT.TokenType","name":"tokenType","type":"uint8"}],"name":"redeem","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"minter","type":"address"}],"name":"removeMinter","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[],"name":"renounceOwnership","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"from","type":"address"},{"internalType":"address","name":"to","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"safeTransferFrom","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"from","type":"address"},{"internalType":"address","name":"to","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"},{"internalType":"bytes","name":"data","type":"bytes"}],"name":"safeTransferFrom","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"operator","type":"address"},{"internalType":"bool","name":"approved","type":"bool"}],"name":"setApprovalForAll","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"bytes4","name":"interfaceId","type":"bytes4"}],"name":"supportsInterface","outputs":[{"internalType":"bool","name":"","type":"bool"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"symbol","outputs":[{"internalType":"string","name":"","type":"string"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"tokenURI","outputs":[{"internalType":"string","name":"","type":"string"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"address","name":"from","type":"address"},{"internalType":"address","name":"to","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"transferFrom","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"newOwner","type":"address"}],"name":"transferOwnership","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"minter","type":"address"}],"name":"whitelistMinter","outputs":[],"stateMutability":"nonpayable","type":"function"}]'
+
 
 class TeleportManager:
-    def __init__(self, teleport_address, rpc_url):
-        self.teleport_address = teleport_address
-        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
-        self.teleport_abi = '[{"inputs":[{"internalType":"string","name":"_name","type":"string"},{"internalType":"string","name":"_symbol","type":"string"},{"internalType":"address","name":"initialOwner","type":"address"}],"stateMutability":"nonpayable","type":"constructor"},{"inputs":[{"internalType":"address","name":"sender","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"},{"internalType":"address","name":"owner","type":"address"}],"name":"ERC721IncorrectOwner","type":"error"},{"inputs":[{"internalType":"address","name":"operator","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"ERC721InsufficientApproval","type":"error"},{"inputs":[{"internalType":"address","name":"approver","type":"address"}],"name":"ERC721InvalidApprover","type":"error"},{"inputs":[{"internalType":"address","name":"operator","type":"address"}],"name":"ERC721InvalidOperator","type":"error"},{"inputs":[{"internalType":"address","name":"owner","type":"address"}],"name":"ERC721InvalidOwner","type":"error"},{"inputs":[{"internalType":"address","name":"receiver","type":"address"}],"name":"ERC721InvalidReceiver","type":"error"},{"inputs":[{"internalType":"address","name":"sender","type":"address"}],"name":"ERC721InvalidSender","type":"error"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"ERC721NonexistentToken","type":"error"},{"inputs":[],"name":"NonExistentTokenURI","type":"error"},{"inputs":[{"internalType":"address","name":"owner","type":"address"}],"name":"OwnableInvalidOwner","type":"error"},{"inputs":[{"internalType":"address","name":"account","type":"address"}],"name":"OwnableUnauthorizedAccount","type":"error"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"owner","type":"address"},{"indexed":true,"internalType":"address","name":"approved","type":"address"},{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"Approval","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"owner","type":"address"},{"indexed":true,"internalType":"address","name":"operator","type":"address"},{"indexed":false,"internalType":"bool","name":"approved","type":"bool"}],"name":"ApprovalForAll","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"},{"indexed":true,"internalType":"uint256","name":"x_id","type":"uint256"},{"indexed":false,"internalType":"address","name":"to","type":"address"},{"indexed":false,"internalType":"string","name":"policy","type":"string"},{"indexed":false,"internalType":"string","name":"name","type":"string"},{"indexed":false,"internalType":"string","name":"username","type":"string"},{"indexed":false,"internalType":"string","name":"pfp","type":"string"}],"name":"NewTokenData","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"previousOwner","type":"address"},{"indexed":true,"internalType":"address","name":"newOwner","type":"address"}],"name":"OwnershipTransferred","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"},{"indexed":true,"internalType":"uint256","name":"x_id","type":"uint256"},{"indexed":false,"internalType":"string","name":"policy","type":"string"},{"indexed":false,"internalType":"string","name":"tweetId","type":"string"}],"name":"RedeemLike","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"},{"indexed":true,"internalType":"uint256","name":"x_id","type":"uint256"},{"indexed":false,"internalType":"address","name":"addr","type":"address"},{"indexed":false,"internalType":"string","name":"policy","type":"string"},{"indexed":false,"internalType":"string","name":"content","type":"string"}],"name":"RedeemTweet","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"minter","type":"address"}],"name":"RemoveMinter","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"from","type":"address"},{"indexed":true,"internalType":"address","name":"to","type":"address"},{"indexed":true,"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"Transfer","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"minter","type":"address"}],"name":"WhitelistMinter","type":"event"},{"inputs":[{"internalType":"address","name":"to","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"approve","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"owner","type":"address"}],"name":"balanceOf","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"currentTokenId","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"getApproved","outputs":[{"internalType":"address","name":"","type":"address"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"address","name":"owner","type":"address"},{"internalType":"address","name":"operator","type":"address"}],"name":"isApprovedForAll","outputs":[{"internalType":"bool","name":"","type":"bool"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"address","name":"","type":"address"}],"name":"isWhitelisted","outputs":[{"internalType":"bool","name":"","type":"bool"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"address","name":"recipient","type":"address"},{"internalType":"uint256","name":"x_id","type":"uint256"},{"internalType":"string","name":"policy","type":"string"},{"internalType":"string","name":"name","type":"string"},{"internalType":"string","name":"username","type":"string"},{"internalType":"string","name":"pfp","type":"string"},{"internalType":"bytes32","name":"nftIdHash","type":"bytes32"}],"name":"mintTo","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"stateMutability":"nonpayable","type":"function"},{"inputs":[],"name":"name","outputs":[{"internalType":"string","name":"","type":"string"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"bytes32","name":"","type":"bytes32"}],"name":"nftIdMap","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"owner","outputs":[{"internalType":"address","name":"","type":"address"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"ownerOf","outputs":[{"internalType":"address","name":"","type":"address"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"},{"internalType":"string","name":"content","type":"string"},{"internalType":"enum NFT.TokenType","name":"tokenType","type":"uint8"}],"name":"redeem","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"minter","type":"address"}],"name":"removeMinter","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[],"name":"renounceOwnership","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"from","type":"address"},{"internalType":"address","name":"to","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"safeTransferFrom","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"from","type":"address"},{"internalType":"address","name":"to","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"},{"internalType":"bytes","name":"data","type":"bytes"}],"name":"safeTransferFrom","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"operator","type":"address"},{"internalType":"bool","name":"approved","type":"bool"}],"name":"setApprovalForAll","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"bytes4","name":"interfaceId","type":"bytes4"}],"name":"supportsInterface","outputs":[{"internalType":"bool","name":"","type":"bool"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"symbol","outputs":[{"internalType":"string","name":"","type":"string"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"tokenURI","outputs":[{"internalType":"string","name":"","type":"string"}],"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"address","name":"from","type":"address"},{"internalType":"address","name":"to","type":"address"},{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"transferFrom","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"newOwner","type":"address"}],"name":"transferOwnership","outputs":[],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"internalType":"address","name":"minter","type":"address"}],"name":"whitelistMinter","outputs":[],"stateMutability":"nonpayable","type":"function"}]'
-        self.contract_instance = self.w3.eth.contract(address=self.teleport_address, abi=self.teleport_abi)
+    def __init__(self, teleport_address, rpc_url, max_block_range: int = MAX_BLOCK_RANGE):
+        self.teleport_address = Web3.to_checksum_address(teleport_address) if teleport_address else teleport_address
+        self.w3 = get_web3(rpc_url)
+        self.max_block_range = max_block_range
+        self._contract_instance = None
+
+    @property
+    def contract_instance(self):
+        if self._contract_instance is None:
+            self._contract_instance = self.w3.eth.contract(address=self.teleport_address, abi=TELEPORT_ABI)
+        return self._contract_instance
 
     def find_teleport_user(self, teleport_id) -> str:
         """Find the user who minted the teleport"""
 
         try:
-            token_uri = self.contract_instance.functions.tokenURI(teleport_id).call()
+            token_uri = get_breaker("rpc").call(self.contract_instance.functions.tokenURI(teleport_id).call)
             metadata = self.parse_token_metadata(token_uri)
             
             for attribute in metadata['attributes']:
@@ -36,34 +58,42 @@ class TeleportManager:
         else:
             token_uri = token_uri[len(prefix):]
 
-        # Parse JSON
+        # Parse JSON (base64 as the data URI says, plain JSON is accepted too)
+        if not token_uri.lstrip().startswith("{"):
+            token_uri = base64.b64decode(token_uri).decode("utf-8")
         data = json.loads(token_uri)
 
         return data
     
-    def get_follower_score(self, username: str, api_key: str = "0c6a2742-8b82-4497-b28e-35764c9b356f") -> int:
+    @staticmethod
+    def get_follower_score(username: str, api_key: Optional[str] = None, timeout: float = 10.0) -> int:
         """
         Fetch the follower score for a given Twitter username.
         
         Args:
             username (str): Twitter username to lookup
-            api_key (str): API key for authentication
+            api_key (Optional[str]): API key for authentication, GETMONI_API_KEY when missing
+            timeout (float): Request timeout in seconds
             
         Returns:
             int: The follower score
             
         Raises:
             requests.RequestException: If the API request fails
-            ValueError: If the follower score cannot be extracted from the response
+            ValueError: If no API key is configured or the follower score cannot be extracted from the response
         """
+        api_key = api_key or os.getenv("GETMONI_API_KEY")
+        if not api_key:
+            raise ValueError("GETMONI_API_KEY is not set")
+
         headers = {
             "accept": "application/json",
             "Api-Key": api_key
         }
         
-        url = f"https://api.discover.getmoni.io/api/v1/twitters/{username}/info/"
+        url = endpoint("getmoni", f"twitters/{username}/info/")
         
-        response = requests.get(url, headers=headers)
+        response = get_scheduler().call("getmoni", get_session("getmoni").get, url, headers=headers, timeout=timeout)
         
         if not response.ok:
             raise requests.RequestException(f"API request failed with status: {response.status_code}")
@@ -76,34 +106,126 @@ class TeleportManager:
             
         return int(follower_score)
     
+    def get_new_token_logs(self, from_block: int, to_block: int) -> list:
+        """
+        Raw NewTokenData logs of the teleport contract, one eth_getLogs per block chunk.
+
+        Only the event topic is filtered on by the node (`to` is not indexed); results skip
+        web3's response formatting and are decoded by teleport_events.
+        """
+        logs = []
+        for start, end in block_ranges(from_block, to_block, self.max_block_range):
+            response = get_breaker("rpc").call(
+                self.w3.provider.make_request, "eth_getLogs", [logs_filter(self.teleport_address, start, end)]
+            )
+            if "error" in response:
+                raise ValueError(f"eth_getLogs failed: {response['error']}")
+            logs.extend(response.get("result") or [])
+        return logs
+
+    def fetch_events(self, from_block: int, to_block: int, agent_address=None) -> List[NewTokenData]:
+        """Decoded NewTokenData events minted to agent_address in from_block..to_block."""
+        return filter_and_decode(self.get_new_token_logs(from_block, to_block), agent_address)
+
+    def store_holders(self, db: Session, events: List[NewTokenData]) -> None:
+        """
+        Upsert the minted tokens into teleport_holders and flag their users, in one transaction.
+
+        Both writes are idempotent, so re-scanning a block range is safe.
+        """
+        holders = {
+            event.token_id: {
+                "token_id": event.token_id,
+                "x_id": str(event.x_id),
+                # X handles are case-insensitive, the payout policy looks holders up lower-cased
+                "username": event.username.lower() if event.username else event.username,
+                "address": event.to,
+                "block_number": event.block_number,
+                "updated_at": datetime.utcnow(),
+            }
+            for event in events
+        }
+        if not holders:
+            return
+        insert = sqlite_insert(TeleportHolder).values(list(holders.values()))
+        db.execute(insert.on_conflict_do_update(
+            index_elements=["token_id"],
+            set_={column: insert.excluded[column] for column in ("x_id", "username", "address", "block_number", "updated_at")}
+        ))
+
+        # User.teleport mirrors teleport_holders for code that only has the users table
+        users_to_flag = {event.username: str(event.x_id) for event in events if event.username}
+        if users_to_flag:
+            UserManager().ensure_usernames(db, list(users_to_flag))
+            users = User.__table__
+            db.connection().execute(
+                update(users)
+                .where(users.c.username == bindparam("name"))
+                .values(teleport=True, x_id=bindparam("holder_x_id"), x_id_resolved_at=datetime.utcnow()),
+                [{"name": username, "holder_x_id": x_id} for username, x_id in users_to_flag.items()]
+            )
+        db.commit()
+
+    def process_events(self, db: Session, account: Account, events: List[NewTokenData]) -> List[NewTokenData]:
+        """
+        Store and announce new teleport mints.
+
+        Tokens already in teleport_holders (a backfill overlapping the live subscription,
+        or a re-scan after a restart) are skipped.
+
+        Returns:
+            List[NewTokenData]: The events that were new
+        """
+        events = list({event.token_id: event for event in events}.values())
+        if not events:
+            return []
+        known = {
+            token_id for (token_id,) in
+            db.query(TeleportHolder.token_id).filter(TeleportHolder.token_id.in_([event.token_id for event in events]))
+        }
+        new_events = [event for event in events if event.token_id not in known]
+
+        for event in new_events:
+            if not event.username:
+                # Older mints may not carry the username in the event, fall back to the token metadata
+                event.username = self.find_teleport_user(event.token_id)
+            print(f"Found teleport user: {event.username}")
+
+        self.store_holders(db, new_events)
+
+        post_sender = PostSender()
+        for event in new_events:
+            if event.username:
+                post_sender.send_post(
+                    account,
+                    f"""
+Teleport NFT minted by user @{event.username} has been found.
+                    """
+                )
+        return new_events
+
+    def handle_logs(self, db: Session, account: Account, logs: List[dict], agent_address) -> Optional[int]:
+        """
+        Process raw logs pushed by a TeleportSubscription.
+
+        Returns:
+            Optional[int]: The block after the newest log, None if there were no logs
+        """
+        self.process_events(db, account, filter_and_decode(logs, agent_address))
+        blocks = [int(log["blockNumber"], 16) if isinstance(log["blockNumber"], str) else log["blockNumber"] for log in logs]
+        return max(blocks) + 1 if blocks else None
+
     def query_events(self, db: Session, account: Account, from_block: int, agent_address) -> int:
         to_block = self.get_last_block()
         
         if from_block >= to_block:
             return from_block
 
-        events = self.contract_instance.events.NewTokenData().get_logs(
-            argument_filters={"to": agent_address},
-            from_block=from_block,
-            to_block=to_block
-        )
-
-        for event in events:
-            teleport_id = event["args"]["tokenId"]
-            user = self.find_teleport_user(teleport_id)
-            print(f"Found teleport user: {user}")
-            # set teleport flag on address to true if it already exists otherwise create and set to true
-            db.execute(f"INSERT INTO teleport (username, teleport) VALUES ({user}, true) ON CONFLICT (address) DO UPDATE SET teleport = true")
-            PostSender.send_post(
-                account, 
-                """
-Teleport NFT minted by user @{user} has been found.
-                """
-            )
-
-        db.commit()
+        # Stored chunk by chunk, a failure part way keeps the chunks already written
+        for start, end in block_ranges(from_block, to_block, self.max_block_range):
+            self.process_events(db, account, self.fetch_events(start, end, agent_address))
         
         return to_block+1
 
     def get_last_block(self):
-        return self.w3.eth.get_block("latest").number
\ No newline at end of file
+        return get_breaker("rpc").call(lambda: self.w3.eth.block_number)
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+from models import User
+from engines.twitter.create_user import UserManager
+from engines.wallet.find_teleport import TeleportManager
+
+FOLLOWER_SCORE_TTL = timedelta(hours=6)
+MAX_WORKERS = 8
+REQUEST_TIMEOUT = 10.0
+
+
+class FollowerScoreCache:
+    """getmoni follower scores, cached on the User table for ttl and fetched concurrently when stale."""
+
+    def __init__(self, ttl: timedelta = FOLLOWER_SCORE_TTL, max_workers: int = MAX_WORKERS, timeout: float = REQUEST_TIMEOUT):
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def fetch(self, usernames: List[str], api_key: Optional[str]) -> Dict[str, int]:
+        """
+        One parallel round of getmoni lookups (still paced by the getmoni rate limit).
+
+        Users whose lookup fails are left out, they are retried on the next call.
+        """
+        if not usernames:
+            return {}
+
+        def fetch_one(username):
+            try:
+                return username, TeleportManager.get_follower_score(username, api_key, timeout=self.timeout)
+            except Exception as e:
+                print(f"Could not fetch follower score for {username}: {e}")
+                return username, None
+
+        workers = max(1, min(self.max_workers, len(usernames)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(fetch_one, usernames)
+            return {username: score for username, score in results if score is not None}
+
+    def scores(self, db: Session, usernames: List[str], api_key: Optional[str] = None) -> Dict[str, int]:
+        """
+        Follower scores for usernames, only fetching the ones without a fresh cached score.
+
+        Args:
+            db (Session): Database session
+            usernames (List[str]): Usernames, without "@"
+            api_key (Optional[str]): getmoni API key, GETMONI_API_KEY when missing
+
+        Returns:
+            Dict[str, int]: username -> follower score for every username that could be scored
+        """
+        usernames = list(dict.fromkeys(usernames))
+        if not usernames:
+            return {}
+
+        cutoff = datetime.utcnow() - self.ttl
+        cached = {
+            username: score for username, score in
+            db.query(User.username, User.follower_score).filter(
+                User.username.in_(usernames),
+                User.follower_score.isnot(None),
+                User.follower_score_at >= cutoff
+            )
+        }
+        missing = [username for username in usernames if username not in cached]
+        if not missing:
+            return cached
+
+        fetched = self.fetch(missing, api_key)
+        if fetched:
+            self.store(db, fetched)
+        print(f"Follower scores: {len(cached)} cached, {len(fetched)}/{len(missing)} fetched")
+        return {**cached, **fetched}
+
+    def store(self, db: Session, scores: Dict[str, int]) -> None:
+        now = datetime.utcnow()
+        UserManager().ensure_usernames(db, list(scores))
+        users = User.__table__
+        db.connection().execute(
+            update(users)
+            .where(users.c.username == bindparam("name"))
+            .values(follower_score=bindparam("score"), follower_score_at=now),
+            [{"name": username, "score": score} for username, score in scores.items()]
+        )
+        db.commit()
+
+
+follower_score_cache = FollowerScoreCache()
+
+
+def get_follower_score_cache(ttl: Optional[timedelta] = None, max_workers: Optional[int] = None,
+                             timeout: Optional[float] = None) -> FollowerScoreCache:
+    """Process-wide follower score cache; passed settings replace the current ones."""
+    if ttl is not None:
+        follower_score_cache.ttl = ttl
+    if max_workers is not None:
+        follower_score_cache.max_workers = max_workers
+    if timeout is not None:
+        follower_score_cache.timeout = timeout
+    return follower_score_cache
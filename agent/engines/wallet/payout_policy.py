@@ -0,0 +1,205 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from engines.twitter.entities import NotificationEntities
+from models import Payout, TeleportHolder
+
+TX_HASH_PATTERN = re.compile(r"(0x)?[0-9a-fA-F]{64}")
+
+
+@dataclass
+class PayoutCandidate:
+    """An address or ENS name found in a notification, with the (lower-cased) author of the tweet that contains it."""
+    address: str
+    username: Optional[str] = None
+    teleport: bool = False
+
+
+@dataclass
+class PayoutPlan:
+    """
+    What the policy decided for a batch.
+
+    approved are paid without asking the LLM (only when teleport_holder_payout_eth is set),
+    ambiguous go to the LLM with teleport holders first, and the remaining budgets bound
+    whatever gets paid in the end.
+    """
+    approved: List[tuple] = field(default_factory=list)  # (PayoutCandidate, amount)
+    ambiguous: List[PayoutCandidate] = field(default_factory=list)
+    user_budget: Dict[Optional[str], float] = field(default_factory=dict)  # username (None: unattributed) -> ETH left today
+    day_budget: float = 0.0
+    reason: str = ""
+
+    @property
+    def actionable(self) -> bool:
+        return bool(self.approved or self.ambiguous)
+
+
+class PayoutPolicy:
+    """
+    Rule-based gate in front of the wallet decision LLM.
+
+    A batch without addresses or ENS names is settled without a database query, an RPC
+    call or a model call. Otherwise per-user and per-day caps come from the payouts
+    table and the LLM decides about the candidates still under their caps, teleport
+    holders' addresses first. Holders are only paid a fixed amount without the LLM when
+    teleport_holder_payout_eth is set.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    def find_candidates(self, entities: List[NotificationEntities]) -> List[PayoutCandidate]:
+        """
+        Addresses and ENS names of a batch, first occurrence only, skipping the ones the bot posted.
+
+        A candidate's username is whoever posted the tweet it appears in, not the thread's
+        author, so replies in someone else's thread are never attributed to them. X handles
+        are case-insensitive, usernames are lower-cased so caps and holder lookups agree.
+        """
+        bot_username = (self.config.bot_username or "").lower()
+        candidates = {}
+        for notification in entities:
+            for address in notification.wallet_candidates:
+                poster = (notification.wallet_posters.get(address) or "").lower() or None
+                if poster and poster == bot_username:
+                    continue
+                candidates.setdefault(address.lower(), PayoutCandidate(address, poster))
+        return list(candidates.values())
+
+    def paid_today(self, db: Session, usernames: List[str]) -> tuple:
+        """
+        Returns:
+            tuple: (ETH sent today in total, Dict of username -> ETH sent to them today,
+                with None for payouts to unattributed addresses)
+        """
+        start_of_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        total = db.query(func.coalesce(func.sum(Payout.amount), 0.0)).filter(Payout.created_at >= start_of_day).scalar()
+        per_user = dict(
+            db.query(Payout.username, func.sum(Payout.amount))
+            .filter(or_(Payout.username.in_(usernames), Payout.username.is_(None)), Payout.created_at >= start_of_day)
+            .group_by(Payout.username)
+        )
+        return float(total or 0.0), per_user
+
+    def teleport_holders(self, db: Session, usernames: List[str]) -> set:
+        """Lower-cased usernames among usernames that hold a teleport NFT (one query on the indexed teleport_holders.username)."""
+        if not usernames:
+            return set()
+        lowered = {username.lower() for username in usernames}
+        return {
+            username for (username,) in
+            db.query(TeleportHolder.username).filter(TeleportHolder.username.in_(lowered)).distinct()
+        }
+
+    def plan(self, db: Session, candidates: List[PayoutCandidate]) -> PayoutPlan:
+        """
+        Apply the caps and the teleport holder allowlist to a batch's candidates.
+
+        Args:
+            db (Session): Database session
+            candidates (List[PayoutCandidate]): From find_candidates
+
+        Returns:
+            PayoutPlan: Nothing actionable when there are no candidates or today's budget is spent
+        """
+        if not candidates:
+            return PayoutPlan(reason="no addresses or ENS names")
+
+        usernames = list({c.username for c in candidates if c.username})
+        total_today, per_user = self.paid_today(db, usernames)
+        plan = PayoutPlan(day_budget=max(0.0, self.config.max_payout_eth_per_day - total_today))
+        if plan.day_budget <= 0:
+            plan.reason = "daily payout cap reached"
+            return plan
+
+        holders = self.teleport_holders(db, usernames)
+        preferred = []
+        for candidate in candidates:
+            # Unattributed candidates share one per-user budget under the None key
+            budget = plan.user_budget.setdefault(
+                candidate.username,
+                max(0.0, self.config.max_payout_eth_per_user_per_day - float(per_user.get(candidate.username) or 0.0))
+            )
+            if budget <= 0:
+                continue
+            candidate.teleport = candidate.username in holders
+            if candidate.teleport and self.config.teleport_holder_payout_eth > 0:
+                amount = min(self.config.teleport_holder_payout_eth, budget)
+                plan.user_budget[candidate.username] = budget - amount
+                plan.approved.append((candidate, amount))
+            elif candidate.teleport:
+                preferred.append(candidate)
+            elif self.config.payout_llm_for_unlisted:
+                plan.ambiguous.append(candidate)
+        plan.ambiguous = preferred + plan.ambiguous
+
+        if not plan.actionable:
+            plan.reason = "every candidate is over its cap or not allowlisted"
+        return plan
+
+    def accept_llm_decisions(self, plan: PayoutPlan, wallets: List[dict]) -> List[tuple]:
+        """
+        Keep the LLM's payouts that go to an ambiguous candidate of this batch.
+
+        Addresses the LLM made up, or that the policy already settled, are dropped.
+
+        Returns:
+            List[tuple]: (PayoutCandidate, amount) pairs, before caps (see fit_budget)
+        """
+        ambiguous = {candidate.address.lower(): candidate for candidate in plan.ambiguous}
+        accepted = []
+        for wallet in wallets:
+            candidate = ambiguous.pop(str(wallet["address"]).lower(), None)
+            if candidate is None:
+                print(f"Ignoring payout to {wallet['address']}: not an open candidate of this batch")
+                continue
+            amount = float(wallet["amount"])
+            if amount > 0:
+                accepted.append((candidate, amount))
+        return accepted
+
+    def fit_budget(self, plan: PayoutPlan, payouts: List[tuple], spendable: float) -> List[tuple]:
+        """
+        Cut payouts down to the per-user caps, the daily cap and the spendable balance, in order.
+
+        Approved payouts already have their per-user share taken out of plan.user_budget,
+        unattributed candidates all draw from the None entry.
+        """
+        remaining = min(plan.day_budget, spendable)
+        approved = {id(candidate) for candidate, _ in plan.approved}
+        fitted = []
+        for candidate, amount in payouts:
+            if id(candidate) not in approved:
+                amount = min(amount, plan.user_budget.get(candidate.username, 0.0))
+                plan.user_budget[candidate.username] = plan.user_budget.get(candidate.username, 0.0) - amount
+            amount = min(amount, remaining)
+            if amount <= 0:
+                continue
+            remaining -= amount
+            fitted.append((candidate, amount))
+        return fitted
+
+    def record(self, db: Session, candidate: PayoutCandidate, amount: float, tx: str) -> bool:
+        """
+        Store a payout if transfer_eth returned a transaction hash (it returns an error message otherwise).
+
+        Returns:
+            bool: Whether the transfer went through
+        """
+        if not isinstance(tx, str) or not TX_HASH_PATTERN.fullmatch(tx):
+            return False
+        db.add(Payout(
+            username=candidate.username,
+            address=candidate.address,
+            amount=amount,
+            tx_hash=tx,
+            created_at=datetime.utcnow()
+        ))
+        db.commit()
+        return True
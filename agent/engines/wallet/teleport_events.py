@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from eth_utils import keccak
+
+NEW_TOKEN_DATA_SIGNATURE = "NewTokenData(uint256,uint256,address,string,string,string,string)"
+NEW_TOKEN_DATA_TOPIC = "0x" + keccak(text=NEW_TOKEN_DATA_SIGNATURE).hex()
+MAX_BLOCK_RANGE = 2000  # blocks per eth_getLogs request, public RPCs reject much larger ranges
+
+WORD = 32
+
+
+@dataclass
+class NewTokenData:
+    """A decoded NewTokenData event (a teleport NFT mint)."""
+    token_id: int
+    x_id: int
+    to: str  # lowercase 0x address
+    policy: str
+    name: str
+    username: str
+    pfp: str
+    block_number: int
+    transaction_hash: str
+    log_index: int
+
+
+def _bytes(value) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    value = str(value)
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+def _int(value) -> int:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return int.from_bytes(value, "big")
+    return int(value, 16)
+
+
+def _hex(value) -> str:
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    value = str(value)
+    return value if value.startswith("0x") else "0x" + value
+
+
+def _string_at(data: bytes, offset: int) -> str:
+    length = int.from_bytes(data[offset:offset + WORD], "big")
+    return data[offset + WORD:offset + WORD + length].decode("utf-8", errors="replace")
+
+
+def recipient(log) -> str:
+    """The non-indexed `to` of a NewTokenData log, read without decoding the strings."""
+    data = _bytes(log["data"])
+    return "0x" + data[12:WORD].hex()
+
+
+def decode_new_token_data(log) -> NewTokenData:
+    """
+    Decode a raw NewTokenData log.
+
+    topics are [event topic, tokenId, x_id]; data is the ABI head (to, then an offset
+    per string) followed by the four length-prefixed strings.
+    """
+    topics = log["topics"]
+    data = _bytes(log["data"])
+    offsets = [int.from_bytes(data[WORD * i:WORD * (i + 1)], "big") for i in range(1, 5)]
+    policy, name, username, pfp = (_string_at(data, offset) for offset in offsets)
+    return NewTokenData(
+        token_id=_int(topics[1]),
+        x_id=_int(topics[2]),
+        to="0x" + data[12:WORD].hex(),
+        policy=policy,
+        name=name,
+        username=username,
+        pfp=pfp,
+        block_number=_int(log["blockNumber"]),
+        transaction_hash=_hex(log["transactionHash"]),
+        log_index=_int(log["logIndex"]),
+    )
+
+
+def block_ranges(from_block: int, to_block: int, size: int = MAX_BLOCK_RANGE) -> Iterator[Tuple[int, int]]:
+    """Inclusive (start, end) chunks covering from_block..to_block."""
+    start = from_block
+    while start <= to_block:
+        end = min(to_block, start + size - 1)
+        yield start, end
+        start = end + 1
+
+
+def logs_filter(contract_address: str, from_block: int, to_block: int) -> dict:
+    """eth_getLogs parameters: only NewTokenData logs of the teleport contract."""
+    return {
+        "address": contract_address,
+        "topics": [NEW_TOKEN_DATA_TOPIC],
+        "fromBlock": hex(from_block),
+        "toBlock": hex(to_block),
+    }
+
+
+def filter_and_decode(logs, recipient_address: Optional[str] = None) -> List[NewTokenData]:
+    """Decode the logs minted to recipient_address (all logs when it is None), skipping removed (reorged) ones."""
+    wanted = recipient_address.lower() if recipient_address else None
+    events = []
+    for log in logs:
+        if log.get("removed"):
+            continue
+        if wanted and recipient(log) != wanted:
+            continue
+        events.append(decode_new_token_data(log))
+    return events
@@ -0,0 +1,137 @@
+import itertools
+import json
+import threading
+from typing import Callable, List, Optional
+
+from engines.wallet.teleport_events import NEW_TOKEN_DATA_TOPIC
+
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 60.0
+OPEN_TIMEOUT = 10.0
+RECV_TIMEOUT = 1.0  # how often the reader checks for stop()
+
+
+class TeleportSubscription:
+    """
+    Live NewTokenData logs over a WebSocket eth_subscribe("logs").
+
+    Runs on its own thread and hands raw logs to on_logs. on_status is called with True
+    once a subscription is active and with False when the connection drops; the caller
+    backfills the gap (see TeleportManager.query_events) on True and polls while False.
+    Reconnects with exponential backoff until stop() is called.
+    """
+
+    def __init__(
+        self,
+        ws_url: str,
+        teleport_address: str,
+        on_logs: Callable[[List[dict]], None],
+        on_status: Optional[Callable[[bool], None]] = None,
+        reconnect_delay: float = RECONNECT_DELAY,
+        max_reconnect_delay: float = MAX_RECONNECT_DELAY,
+    ):
+        self.ws_url = ws_url
+        self.teleport_address = teleport_address
+        self.on_logs = on_logs
+        self.on_status = on_status
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = False
+        self.reconnects = 0
+        self._ids = itertools.count(1)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="teleport-subscription", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _set_connected(self, connected: bool) -> None:
+        if self.connected == connected:
+            return
+        self.connected = connected
+        if self.on_status is not None:
+            try:
+                self.on_status(connected)
+            except Exception as e:
+                print(f"Error in teleport subscription status handler: {e}")
+
+    def _run(self) -> None:
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                self._session()
+            except Exception as e:
+                print(f"Teleport subscription error: {e}")
+            if self.connected:
+                # Was subscribed before the connection ended, start the backoff over
+                delay = self.reconnect_delay
+            # The caller polls (and backfills on the next subscribe) while we are disconnected
+            self._set_connected(False)
+            if self._stop.wait(delay):
+                break
+            self.reconnects += 1
+            delay = min(self.max_reconnect_delay, delay * 2)
+
+    def _request(self, ws, method: str, params: list) -> int:
+        request_id = next(self._ids)
+        ws.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+        return request_id
+
+    def _session(self) -> None:
+        """One connection: subscribe, then read notifications until stop() or a disconnect."""
+        # websockets comes with web3
+        from websockets.sync.client import connect
+
+        with connect(self.ws_url, open_timeout=OPEN_TIMEOUT) as ws:
+            request_id = self._request(ws, "eth_subscribe", [
+                "logs", {"address": self.teleport_address, "topics": [NEW_TOKEN_DATA_TOPIC]}
+            ])
+            subscription_id = None
+            buffered = []
+            while subscription_id is None:
+                message = json.loads(ws.recv(timeout=OPEN_TIMEOUT))
+                if message.get("id") == request_id:
+                    if "error" in message:
+                        raise ConnectionError(f"eth_subscribe failed: {message['error']}")
+                    subscription_id = message["result"]
+                elif message.get("method") == "eth_subscription":
+                    buffered.append(message)
+
+            self._set_connected(True)
+            for message in buffered:
+                self._handle(message, subscription_id)
+
+            while not self._stop.is_set():
+                try:
+                    raw = ws.recv(timeout=RECV_TIMEOUT)
+                except TimeoutError:
+                    continue
+                self._handle(json.loads(raw), subscription_id)
+
+            try:
+                self._request(ws, "eth_unsubscribe", [subscription_id])
+            except Exception:
+                pass
+
+    def _handle(self, message: dict, subscription_id: str) -> None:
+        if message.get("method") != "eth_subscription":
+            return
+        params = message.get("params") or {}
+        if params.get("subscription") != subscription_id:
+            return
+        log = params.get("result")
+        if log:
+            try:
+                self.on_logs([log])
+            except Exception as e:
+                print(f"Error handling teleport log: {e}")
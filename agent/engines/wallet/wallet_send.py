@@ -2,9 +2,11 @@
 import os
 import re
 import json
-from typing import List, Tuple, Dict
+from datetime import timedelta
+from typing import List, Optional, Tuple, Dict
 import requests
 from web3 import Web3
+from web3.exceptions import TimeExhausted
 from ens import ENS
 from eth_keys import keys
 import secrets
@@ -13,6 +15,15 @@ from engines.prompts.prompts import get_wallet_decision_prompt
 from sqlalchemy.orm import Session
 from models import User
 from engines.wallet.find_teleport import TeleportManager
+from engines.twitter.entities import NotificationEntities, extract_batch, authors
+from engines.wallet.payout_policy import PayoutPolicy
+from engines.wallet.wallet_state import address_for_key, get_wallet_state
+from engines.wallet.follower_scores import get_follower_score_cache
+from http_pool import get_web3, endpoint
+from circuit_breaker import get_breaker
+from engines.llm.structured import WalletPayout, StructuredOutputError, parse_items, post_structured
+
+PAYOUTS_KEY = "payouts"
 
 class WalletManager:
 
@@ -29,11 +40,11 @@ class WalletManager:
         pass
 
     def get_wallet_balance(self, private_key, eth_mainnet_rpc_url):
-        w3 = Web3(Web3.HTTPProvider(eth_mainnet_rpc_url))
-        public_address = w3.eth.account.from_key(private_key).address
+        """Balance of the agent wallet in Ether, served from the wallet state cache while fresh."""
+        w3 = get_web3(eth_mainnet_rpc_url)
+        public_address = address_for_key(private_key)
 
-        # Retrieve and print the balance of the account in Ether
-        balance_wei = w3.eth.get_balance(public_address)
+        balance_wei = get_wallet_state().get_balance(w3, eth_mainnet_rpc_url, public_address)
         balance_ether = w3.from_wei(balance_wei, 'ether')
 
         return balance_ether
@@ -50,10 +61,11 @@ class WalletManager:
 
         Returns:
         - str: The transaction hash as a hex string if the transaction was successful.
+        - str: The transaction hash as well when no receipt arrived in time (it may still be mined).
         - str: "Transaction failed" or an error message if the transaction was not successful or an error occurred.
         """
         try:
-            w3 = Web3(Web3.HTTPProvider(eth_mainnet_rpc_url))
+            w3 = get_web3(eth_mainnet_rpc_url)
             print("starting tx")
             # Check if connected to blockchain
             if not w3.is_connected():
@@ -75,17 +87,21 @@ class WalletManager:
             #     if resolved_address is None:
             #         return f"Could not resolve ENS name: {to_address}"
 
+            # Addresses copied from posts are often lowercase, signing requires the checksum form
+            if Web3.is_address(to_address):
+                to_address = Web3.to_checksum_address(to_address)
+
             print(f"Transferring to {to_address}")
 
             # Convert the amount in Ether to Wei
             amount_in_wei = w3.to_wei(amount_in_ether, 'ether')
 
             # Get the public address from the private key
-            account = w3.eth.account.from_key(private_key)
-            public_address = account.address
+            public_address = address_for_key(private_key)
 
-            # Get the nonce for the transaction
-            nonce = w3.eth.get_transaction_count(public_address)
+            # Get the nonce for the transaction, tracked locally after the first lookup
+            state = get_wallet_state()
+            nonce = state.next_nonce(w3, eth_mainnet_rpc_url, public_address)
 
             # Build the transaction
             transaction = {
@@ -101,10 +117,27 @@ class WalletManager:
             signed_txn = w3.eth.account.sign_transaction(transaction, private_key=private_key)
 
             # Send the transaction
-            tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            try:
+                tx_hash = get_breaker("rpc").call(w3.eth.send_raw_transaction, signed_txn.raw_transaction)
+            except Exception:
+                # The nonce may or may not have been used, read it (and the balance) again next time
+                state.invalidate(eth_mainnet_rpc_url, public_address)
+                raise
+            state.record_broadcast(
+                eth_mainnet_rpc_url, public_address, tx_hash.hex(), nonce,
+                amount_in_wei, transaction['gas'] * transaction['gasPrice']
+            )
 
             # Wait for the transaction receipt
-            tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+            try:
+                tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+            except TimeExhausted:
+                # Still pending or dropped: re-read nonce and balance from the chain next time.
+                # The hash is returned so the payout still counts against the caps.
+                state.invalidate(eth_mainnet_rpc_url, public_address)
+                print(f"No receipt yet for {tx_hash.hex()}, treating it as sent")
+                return tx_hash.hex()
+            state.reconcile(eth_mainnet_rpc_url, public_address, tx_hash.hex(), tx_receipt)
 
             # Check the status of the transaction
             if tx_receipt['status'] == 1:
@@ -115,39 +148,39 @@ class WalletManager:
             print(f"An error occurred: {e}")
             return f"An error occurred: {e}"
 
-    def wallet_address_in_post(self, posts, teleport_users_string, private_key, eth_mainnet_rpc_url: str,llm_api_key: str):
+    def wallet_address_in_post(self, posts, teleport_users_string, private_key, eth_mainnet_rpc_url: str, llm_api_key: str,
+                               entities: Optional[List[NotificationEntities]] = None,
+                               matches: Optional[List[str]] = None, wallet_balance=None, json_mode: bool = True):
         """
         Detects wallet addresses or ENS domains from a list of posts.
-        Converts all items to strings first, then checks for matches.
 
         Parameters:
         - posts (List): List of posts of any type
+        - entities (List[NotificationEntities]): Entities already extracted from posts, extracted here when missing
+        - matches (List[str]): Addresses and ENS names to ask about, all of the posts' ones when missing
+        - wallet_balance: Balance already fetched this cycle, fetched here when missing
+        - json_mode (bool): Ask for schema-constrained JSON when the provider supports it
 
         Returns:
-        - List[Dict]: List of dicts with 'address' and 'amount' keys
+        - str: JSON-formatted list of dicts with 'address' and 'amount' keys (see parse_items)
         """
+        if matches is None:
+            if entities is None:
+                entities = extract_batch(posts)
+            matches = [candidate for post in entities for candidate in post.wallet_candidates]
 
-        # Convert everything to strings first
-        str_posts = [str(post) for post in posts]
-
-        # Then look for matches in all the strings
-        eth_pattern = re.compile(r'\b0x[a-fA-F0-9]{40}\b|\b\S+\.eth\b')
-        matches = []
-
-        for post in str_posts:
-            found_matches = eth_pattern.findall(post)
-            matches.extend(found_matches)
-
-        wallet_balance = self.get_wallet_balance(private_key, eth_mainnet_rpc_url)
+        if wallet_balance is None:
+            wallet_balance = self.get_wallet_balance(private_key, eth_mainnet_rpc_url)
         prompt = get_wallet_decision_prompt(posts, teleport_users_string, matches, wallet_balance)
 
-        response = requests.post(
-            url="https://api.hyperbolic.xyz/v1/chat/completions",
-            headers={
+        response = post_structured(
+            "hyperbolic",
+            endpoint("hyperbolic", "chat/completions"),
+            {
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {llm_api_key}",
             },
-            json={
+            {
                 "messages": [
                     {
                         "role": "system",
@@ -163,7 +196,10 @@ class WalletManager:
                 "temperature": 1,
                 "top_p": 0.95,
                 "top_k": 40,
-            }
+            },
+            WalletPayout,
+            PAYOUTS_KEY,
+            json_mode
         )
 
         if response.status_code == 200:
@@ -172,22 +208,29 @@ class WalletManager:
         else:
             raise Exception(f"Error generating short-term memory: {response.text}")
 
-    def find_user_list(self, notif_context: List[str]) -> List[str]:
-        """Find the list of users from the notification context."""
-        user_names = []
-        for context in notif_context:
-            user_match = re.search(r'@(\w+)', context)
-            if user_match:
-                user_names.append(user_match.group(1))
-        return user_names
-
-    def _handle_wallet_transactions(self, db: Session, notif_context: List[str], config) -> None:
-        """Process and execute wallet transactions if conditions are met."""
-        user_names = self.find_user_list(notif_context)
-        # for each user in user_names, filter users with teleport=True
-        teleport_users_raw = db.query(User).filter(User.username.in_(user_names), User.teleport == False).all()
-        # create dictionary with username and teleport status
-        teleport_user_scores = {user.username: TeleportManager.get_follower_score(user.username, "0c6a2742-8b82-4497-b28e-35764c9b356f") for user in teleport_users_raw}
+    def find_user_list(self, notif_context: List[str], entities: Optional[List[NotificationEntities]] = None) -> List[str]:
+        """Find the list of users (the author of each notification) from the notification context."""
+        if entities is None:
+            entities = extract_batch(notif_context)
+        return authors(entities)
+
+    def _handle_wallet_transactions(self, db: Session, notif_context: List[str], config,
+                                    entities: Optional[List[NotificationEntities]] = None) -> None:
+        """
+        Process and execute wallet transactions if conditions are met.
+
+        The payout policy settles the batch first: without addresses or ENS names nothing
+        else happens (no balance RPC, no LLM call), and the LLM decides about the candidates
+        under their caps with teleport holders as preferred users. Caps apply to every payout.
+        """
+        if entities is None:
+            entities = extract_batch(notif_context)
+        get_wallet_state(config.wallet_state_ttl_seconds)
+        policy = PayoutPolicy(config)
+        plan = policy.plan(db, policy.find_candidates(entities))
+        if not plan.actionable:
+            print(f"No wallet transactions to consider: {plan.reason}.")
+            return
 
         balance_ether = self.get_wallet_balance(
             config.private_key_hex,
@@ -196,35 +239,61 @@ class WalletManager:
         print(f"Agent wallet balance is {balance_ether} ETH now.\n")
         if balance_ether <= config.min_eth_balance:
             return
-        for _ in range(2):  # Max 2 attempts
+
+        payouts = list(plan.approved)
+        if plan.ambiguous:
+            # Preferred users for the prompt are the teleport holders who posted a candidate,
+            # under their handles as posted (the users table is not case-folded)
+            holders = {candidate.username for candidate in plan.ambiguous if candidate.teleport}
+            teleport_usernames = {
+                poster for notification in entities for poster in notification.wallet_posters.values()
+                if poster and poster.lower() in holders
+            }
+            teleport_user_scores = get_follower_score_cache(
+                timedelta(hours=config.follower_score_ttl_hours),
+                config.max_follower_score_workers,
+                config.follower_score_timeout
+            ).scores(db, sorted(teleport_usernames), config.getmoni_api_key)
             try:
                 wallet_data = self.wallet_address_in_post(
                     notif_context,
                     json.dumps(teleport_user_scores),
                     config.private_key_hex,
                     config.eth_mainnet_rpc_url,
-                    config.llm_api_key
+                    config.llm_api_key,
+                    entities,
+                    matches=[candidate.address for candidate in plan.ambiguous],
+                    wallet_balance=balance_ether,
+                    json_mode=config.llm_json_mode
                 )
                 print(wallet_data)
-                wallets = json.loads(wallet_data)
+                # One completion, repaired and validated locally rather than asked for again
+                wallets = [wallet.model_dump() for wallet in parse_items(wallet_data, WalletPayout, PAYOUTS_KEY)]
                 print(wallets)
-                if not wallets:
-                    print("No wallet addresses or amounts to send ETH to.")
-                    break
-                for wallet in wallets:
-                    print(f"Sent {wallet['amount']} ETH to {wallet['address']}")
-                    tx = self.transfer_eth(
-                        config.private_key_hex,
-                        config.eth_mainnet_rpc_url,
-                        wallet["address"],
-                        wallet["amount"]
-                    )
-                    print(f"Sent {wallet['amount']} ETH to {wallet['address']}")
-                break
-            except (json.JSONDecodeError, KeyError) as e:
+                payouts.extend(policy.accept_llm_decisions(plan, wallets))
+            except StructuredOutputError as e:
                 print(f"Error processing wallet data: {e}")
-                continue
-    
+            except Exception as e:
+                # Request failures (HTTP errors, open circuit, malformed response) only lose the
+                # LLM's picks, the approved holder payouts below still go out
+                print(f"Error getting wallet decisions: {e}")
+
+        payouts = policy.fit_budget(plan, payouts, float(balance_ether) - config.min_eth_balance)
+        if not payouts:
+            print("No wallet addresses or amounts to send ETH to.")
+            return
+        for candidate, amount in payouts:
+            tx = self.transfer_eth(
+                config.private_key_hex,
+                config.eth_mainnet_rpc_url,
+                candidate.address,
+                amount
+            )
+            if policy.record(db, candidate, amount, tx):
+                print(f"Sent {amount} ETH to {candidate.address}")
+            else:
+                print(f"Transfer of {amount} ETH to {candidate.address} failed: {tx}")
+
     def generate_eth_account(self) -> Tuple[str, str]:
         """Generate a new Ethereum account with private key and address."""
         random_seed = secrets.token_bytes(32)
@@ -0,0 +1,136 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from eth_account import Account
+
+from circuit_breaker import get_breaker
+
+DEFAULT_TTL_SECONDS = 30.0
+TRANSFER_GAS = 21000
+
+
+@lru_cache(maxsize=16)
+def address_for_key(private_key: str) -> str:
+    """Checksum address of a private key (key derivation is too slow to redo on every balance check)."""
+    return Account.from_key(private_key).address
+
+
+@dataclass
+class PendingTransfer:
+    nonce: int
+    value_wei: int
+    max_fee_wei: int  # gas * gasPrice reserved when broadcasting, refined from the receipt
+
+
+@dataclass
+class WalletState:
+    """Balance and next nonce of one address on one chain, as far as this process knows."""
+    balance_wei: Optional[int] = None
+    balance_at: float = 0.0
+    nonce: Optional[int] = None
+    pending: Dict[str, PendingTransfer] = field(default_factory=dict)  # tx hash -> transfer
+
+
+class WalletStateCache:
+    """
+    Balance and nonce cache per (RPC URL, address).
+
+    Balances are served from memory for ttl seconds. Broadcasting a transfer takes its
+    value and maximum gas cost off the cached balance and advances the nonce right away,
+    and the receipt settles the actual gas used (or refunds a failed transfer), so the
+    cache stays usable across transfers without re-reading the chain. Transfers whose
+    receipt never arrived are dropped once their nonce shows up as mined.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS):
+        self.ttl = ttl
+        self._states: Dict[Tuple[str, str], WalletState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, rpc_url: str, address: str) -> WalletState:
+        return self._states.setdefault((rpc_url, address), WalletState())
+
+    def get_balance(self, w3, rpc_url: str, address: str) -> int:
+        """Balance in wei, from memory while fresh, otherwise from the RPC."""
+        with self._lock:
+            state = self._state(rpc_url, address)
+            if state.balance_wei is not None and time.monotonic() - state.balance_at < self.ttl:
+                return state.balance_wei
+
+        balance_wei = get_breaker("rpc").call(w3.eth.get_balance, address)
+        with self._lock:
+            has_pending = bool(self._state(rpc_url, address).pending)
+        # Pending transfers whose nonce is already mined are in the balance we just read
+        mined_nonce = get_breaker("rpc").call(w3.eth.get_transaction_count, address, "latest") if has_pending else None
+        with self._lock:
+            state = self._state(rpc_url, address)
+            if mined_nonce is not None:
+                state.pending = {tx: p for tx, p in state.pending.items() if p.nonce >= mined_nonce}
+            # Transfers still waiting to be mined are not in the "latest" balance yet
+            state.balance_wei = balance_wei - sum(p.value_wei + p.max_fee_wei for p in state.pending.values())
+            state.balance_at = time.monotonic()
+            return state.balance_wei
+
+    def next_nonce(self, w3, rpc_url: str, address: str) -> int:
+        """Nonce for the next transaction; only asks the RPC the first time or after invalidate()."""
+        with self._lock:
+            state = self._state(rpc_url, address)
+            if state.nonce is not None:
+                return state.nonce
+
+        nonce = get_breaker("rpc").call(w3.eth.get_transaction_count, address, "pending")
+        with self._lock:
+            state = self._state(rpc_url, address)
+            if state.nonce is None:
+                state.nonce = nonce
+            return state.nonce
+
+    def record_broadcast(self, rpc_url: str, address: str, tx_hash: str, nonce: int, value_wei: int, max_fee_wei: int) -> None:
+        """Apply a broadcast transfer optimistically: spend value and max fee, advance the nonce."""
+        with self._lock:
+            state = self._state(rpc_url, address)
+            state.pending[tx_hash] = PendingTransfer(nonce, value_wei, max_fee_wei)
+            state.nonce = max(state.nonce or 0, nonce + 1)
+            if state.balance_wei is not None:
+                state.balance_wei -= value_wei + max_fee_wei
+
+    def reconcile(self, rpc_url: str, address: str, tx_hash: str, receipt) -> None:
+        """
+        Settle a broadcast transfer from its receipt.
+
+        The reserved gas is replaced by gasUsed * effectiveGasPrice, and a reverted
+        transfer gets its value back (it still paid for gas).
+        """
+        with self._lock:
+            state = self._state(rpc_url, address)
+            pending = state.pending.pop(tx_hash, None)
+            if pending is None or state.balance_wei is None:
+                return
+            gas_used = receipt.get("gasUsed") or TRANSFER_GAS
+            gas_price = receipt.get("effectiveGasPrice")
+            if gas_price is None:
+                # No fee details in the receipt, read the balance again next time
+                state.balance_at = 0.0
+                return
+            refund = pending.max_fee_wei - gas_used * gas_price
+            if receipt.get("status") != 1:
+                refund += pending.value_wei
+            state.balance_wei += refund
+
+    def invalidate(self, rpc_url: str, address: str) -> None:
+        """Forget everything about an address, e.g. after a failed broadcast left the nonce unknown."""
+        with self._lock:
+            self._states.pop((rpc_url, address), None)
+
+
+wallet_state = WalletStateCache()
+
+
+def get_wallet_state(ttl: Optional[float] = None) -> WalletStateCache:
+    """Process-wide wallet state cache; passing ttl updates the balance TTL."""
+    if ttl is not None:
+        wallet_state.ttl = ttl
+    return wallet_state
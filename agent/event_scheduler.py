@@ -0,0 +1,134 @@
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass(order=True)
+class ScheduledEvent:
+    when: float  # epoch seconds
+    seq: int
+    name: str = field(compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+class EventScheduler:
+    """
+    Heap-based timer loop for the agent's recurring work.
+
+    Handlers are registered by name and each name has at most one pending event, so
+    scheduling a name again moves it. run() sleeps until the earliest event is due
+    and wakes immediately when an event is scheduled earlier or triggered from another
+    thread, so the process stays idle between events instead of polling the clock.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, Callable[[], None]] = {}
+        self.pending: Dict[str, ScheduledEvent] = {}
+        self._heap: List[ScheduledEvent] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+
+    def register(self, name: str, handler: Callable[[], None]) -> None:
+        """Register the handler run when an event called name is due."""
+        self.handlers[name] = handler
+
+    def schedule(self, name: str, when: datetime) -> ScheduledEvent:
+        """Schedule (or move) the event called name to run at when."""
+        return self._push(name, when.timestamp())
+
+    def schedule_in(self, name: str, seconds: float) -> ScheduledEvent:
+        return self._push(name, time.time() + seconds)
+
+    def trigger(self, name: str) -> None:
+        """Run the event called name as soon as possible (safe to call from any thread)."""
+        self._push(name, time.time())
+
+    def cancel(self, name: str) -> None:
+        with self._cond:
+            event = self.pending.pop(name, None)
+            if event is not None:
+                event.cancelled = True
+
+    def next_event(self) -> Optional[ScheduledEvent]:
+        """Earliest pending event, if any."""
+        with self._cond:
+            self._discard_cancelled()
+            return self._heap[0] if self._heap else None
+
+    def _push(self, name: str, when: float) -> ScheduledEvent:
+        if name not in self.handlers:
+            raise KeyError(f"No handler registered for event {name}")
+        with self._cond:
+            previous = self.pending.get(name)
+            if previous is not None:
+                previous.cancelled = True
+            event = ScheduledEvent(when=when, seq=next(self._counter), name=name)
+            self.pending[name] = event
+            heapq.heappush(self._heap, event)
+            self._cond.notify_all()
+            return event
+
+    def _discard_cancelled(self) -> None:
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+
+    def _pop_due(self, now: float) -> Optional[ScheduledEvent]:
+        self._discard_cancelled()
+        if self._heap and self._heap[0].when <= now:
+            event = heapq.heappop(self._heap)
+            if self.pending.get(event.name) is event:
+                del self.pending[event.name]
+            return event
+        return None
+
+    def _dispatch(self, event: ScheduledEvent) -> None:
+        try:
+            self.handlers[event.name]()
+        except Exception as e:
+            print(f"Error in scheduled event {event.name}: {e}")
+
+    def run_pending(self, now: Optional[float] = None) -> int:
+        """
+        Run every event that is due without sleeping.
+
+        Returns:
+            int: Number of events run
+        """
+        now = time.time() if now is None else now
+        ran = 0
+        while True:
+            with self._cond:
+                event = self._pop_due(now)
+            if event is None:
+                return ran
+            self._dispatch(event)
+            ran += 1
+
+    def run(self) -> None:
+        """Run events as they come due until stop() is called or nothing is left to run."""
+        self._running = True
+        while self._running:
+            with self._cond:
+                while self._running:
+                    self._discard_cancelled()
+                    if not self._heap:
+                        self._running = False
+                        break
+                    delay = self._heap[0].when - time.time()
+                    if delay <= 0:
+                        break
+                    # Sleeps until the event is due; schedule()/trigger() notify to wake us earlier
+                    self._cond.wait(timeout=delay)
+                event = self._pop_due(time.time()) if self._running else None
+            if event is not None:
+                self._dispatch(event)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
@@ -0,0 +1,105 @@
+import os
+import threading
+from typing import Dict
+import requests
+from requests.adapters import HTTPAdapter
+
+# Keep-alive connections per host; several engines (and candidate workers) hit the same provider at once
+POOL_MAXSIZE = 16
+
+# Overridable with <PROVIDER>_BASE_URL, e.g. HYPERBOLIC_BASE_URL=http://127.0.0.1:8089/v1 for the replay server
+DEFAULT_BASE_URLS = {
+    "hyperbolic": "https://api.hyperbolic.xyz/v1",
+    "openrouter": "https://openrouter.ai/api/v1",
+    "openai": "https://api.openai.com/v1",
+    "getmoni": "https://api.discover.getmoni.io/api/v1",
+}
+
+_sessions: Dict[str, requests.Session] = {}
+_openai_clients: Dict[str, object] = {}
+_web3_clients: Dict[str, object] = {}
+_web3_providers: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def base_url(provider: str) -> str:
+    """API base URL for a provider, from <PROVIDER>_BASE_URL if set."""
+    return os.getenv(f"{provider.upper()}_BASE_URL", DEFAULT_BASE_URLS[provider]).rstrip("/")
+
+
+def endpoint(provider: str, path: str) -> str:
+    """Full URL of an API path, e.g. endpoint("hyperbolic", "chat/completions")."""
+    return f"{base_url(provider)}/{path.lstrip('/')}"
+
+
+def get_session(provider: str) -> requests.Session:
+    """
+    Shared requests session (connection pool) for a provider.
+
+    Sessions are per process: sockets can't be shared safely across worker processes,
+    but every engine and thread inside one process reuses the same pool.
+    """
+    with _lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[provider] = session
+        return session
+
+
+def get_openai_client(api_key: str):
+    """Shared OpenAI client per API key, so embeddings reuse one HTTP connection pool."""
+    from openai import OpenAI
+
+    with _lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url("openai"))
+            _openai_clients[api_key] = client
+        return client
+
+
+def mount(provider: str, adapter) -> None:
+    """Route every request of a provider's session through adapter (used by the replay harness)."""
+    session = get_session(provider)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def set_openai_client(api_key: str, client) -> None:
+    """Use client for api_key instead of a real OpenAI client (used by the replay harness)."""
+    with _lock:
+        _openai_clients[api_key] = client
+
+
+def get_web3(rpc_url: str):
+    """Shared Web3 instance per RPC URL, so RPC calls reuse one HTTP connection pool."""
+    from web3 import Web3
+
+    with _lock:
+        w3 = _web3_clients.get(rpc_url)
+        if w3 is None:
+            provider = _web3_providers.get(rpc_url) or Web3.HTTPProvider(rpc_url)
+            w3 = Web3(provider)
+            _web3_clients[rpc_url] = w3
+        return w3
+
+
+def set_web3_provider(rpc_url: str, provider) -> None:
+    """Serve rpc_url from provider (e.g. an in-memory chain) instead of HTTP."""
+    with _lock:
+        _web3_providers[rpc_url] = provider
+        _web3_clients.pop(rpc_url, None)
+
+
+def close_all() -> None:
+    """Close every pooled session (used when a worker shuts down)."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _openai_clients.clear()
+        _web3_clients.clear()
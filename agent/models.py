@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
@@ -15,6 +15,10 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     teleport = Column(Boolean, default=False)
+    x_id = Column(String, index=True)  # X rest_id, cached by UserIdResolver
+    x_id_resolved_at = Column(DateTime)  # when x_id was last looked up, for the cache TTL
+    follower_score = Column(Integer)  # getmoni followersScore, cached by FollowerScoreCache
+    follower_score_at = Column(DateTime)  # when follower_score was fetched, for the cache TTL
 
     posts = relationship("Post", back_populates="user")
     comments = relationship("Comment", back_populates="user")
@@ -66,6 +70,26 @@ class Message(Base):
 
     user = relationship("User", back_populates="messages")
 
+    __table_args__ = (
+        Index("ix_messages_user_created", "user_id", "created_at"),
+    )
+
+class DMConversation(Base):
+    __tablename__ = "dm_conversations"
+
+    conversation_id = Column(String, primary_key=True)
+    oldest_entry_id = Column(String)  # max_id of the next (older) history page
+    newest_entry_id = Column(String)
+    history_complete = Column(Boolean, default=False)  # every older page has been fetched
+    updated_at = Column(DateTime)
+
+class DMSyncCursor(Base):
+    __tablename__ = "dm_sync_cursors"
+
+    account_id = Column(String, primary_key=True)  # X id of the synced account
+    cursor = Column(String)  # dm/user_updates cursor, deltas are fetched from here
+    updated_at = Column(DateTime)
+
 
 class Like(Base):
     __tablename__ = "likes"
@@ -102,4 +126,46 @@ class TweetPost(Base):
     __tablename__ = "tweet_posts"
 
     id = Column(Integer, primary_key=True, index=True)
-    tweet_id = Column(String, nullable=False)
\ No newline at end of file
+    tweet_id = Column(String, nullable=False)
+
+class QueuedNotification(Base):
+    __tablename__ = "notification_queue"
+
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String, unique=True, nullable=False)  # tweet id, re-adding it is a no-op
+    content = Column(Text, nullable=False)
+    priority = Column(Float, default=0)
+    status = Column(String, nullable=False, default="pending")  # pending, leased, done, dead
+    attempts = Column(Integer, default=0)
+    visible_at = Column(DateTime, nullable=False)  # leased items become visible again after this
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_notification_queue_status_visible", "status", "visible_at"),
+        Index("ix_notification_queue_priority", "priority"),
+    )
+
+class TeleportHolder(Base):
+    __tablename__ = "teleport_holders"
+
+    token_id = Column(Integer, primary_key=True)  # teleport NFT id, upserts are keyed on it
+    x_id = Column(String, index=True)
+    username = Column(String, index=True)  # lower-cased, X handles are case-insensitive
+    address = Column(String, index=True)  # owner the token was minted to
+    block_number = Column(Integer, nullable=False)  # block of the NewTokenData event
+    updated_at = Column(DateTime, nullable=False)
+
+class Payout(Base):
+    __tablename__ = "payouts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String)  # lower-cased author of the tweet the address came from, NULL ones share a cap
+    address = Column(String, nullable=False)  # address or ENS name as sent to transfer_eth
+    amount = Column(Float, nullable=False)  # ETH
+    tx_hash = Column(String)
+    created_at = Column(DateTime, nullable=False)  # UTC, compared against the per-day caps
+
+    __table_args__ = (
+        Index("ix_payouts_username_created", "username", "created_at"),
+        Index("ix_payouts_created", "created_at"),
+    )
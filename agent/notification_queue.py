@@ -1,41 +1,142 @@
-from collections import deque
-from typing import List, Tuple
+import heapq
+import itertools
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from models import QueuedNotification
+from engines.prompts.context_budget import count_tokens, truncate_to_tokens
+
+
+# Relative value of notification kinds, used by default_priority
+PRIORITY_WEIGHTS = {
+    "mention": 2.0,
+    "reply": 1.0,
+    "teleport_bonus": 2.0,
+}
+
+
+def default_priority(content: str, metadata: dict) -> float:
+    """
+    Base value of a notification before age decay.
+
+    Mentions outrank replies, authors with more followers rank higher (log scale)
+    and teleport holders get a flat bonus.
+    """
+    kind = "reply" if metadata.get("is_reply") else "mention"
+    score = PRIORITY_WEIGHTS[kind]
+    score += math.log10(1 + (metadata.get("followers") or 0))
+    if metadata.get("teleport"):
+        score += PRIORITY_WEIGHTS["teleport_bonus"]
+    return max(score, 1e-6)
+
+
+def decayed_priority_key(score: float, enqueued_at: float, half_life_minutes: float) -> float:
+    """
+    Ordering key for score * 0.5 ** (age / half_life).
+
+    In log space the decay factor splits into a constant per item (enqueued_at / tau) and a
+    term shared by every item (-now / tau), so ordering by this key never changes over time
+    and a plain heap (or SQL ORDER BY) stays valid without re-scoring.
+    """
+    tau = half_life_minutes * 60 / math.log(2)
+    return math.log(score) + enqueued_at / tau
 
 
 @dataclass
 class NotificationQueue:
-    """Queue to store filtered notifications and timeline posts."""
+    """Queue to store filtered notifications and timeline posts, most valuable first."""
     min_queue_size: int = 1
-    items: deque = field(default_factory=lambda: deque(maxlen=100))  # Store up to 50 items
+    max_items: int = 1000
+    batch_size: int = 20
+    token_budget: int = 2000
+    half_life_minutes: float = 60
+    priority_fn: Callable[[str, dict], float] = default_priority
+    items: list = field(default_factory=list)  # heap of (-priority_key, seq, content, tweet_id)
     processed_ids: set = field(default_factory=set)
+    in_flight: list = field(default_factory=list)
+    delayed: list = field(default_factory=list)  # heap of (visible_at, entry) for nacked entries with a delay
+    counter: itertools.count = field(default_factory=itertools.count)
     
-    def add(self, filtered_notifications: list) -> None:
+    def add(self, filtered_notifications: list, metadata: Optional[Dict[str, dict]] = None) -> None:
         """
         Add filtered notifications to the queue and log additions.
 
         Args:
             filtered_notifications: List of tuples containing (notification_content, tweet_id)
+            metadata: Optional per tweet id details (is_reply, author, followers, teleport) for priority scoring
         """
+        metadata = metadata or {}
+        now = time.time()
         for notif, tweet_id in filtered_notifications:
             if tweet_id not in self.processed_ids:
-                self.items.append((notif, tweet_id))
+                score = self.priority_fn(notif, metadata.get(tweet_id, {}))
+                key = decayed_priority_key(score, now, self.half_life_minutes)
+                heapq.heappush(self.items, (-key, next(self.counter), notif, tweet_id))
                 self.processed_ids.add(tweet_id)
-                print(f"Added to queue: {notif[:100]}... (Tweet ID: {tweet_id})")
+                print(f"Added to queue: {notif[:100]}... (Tweet ID: {tweet_id}, priority: {score:.2f})")
+
+        # Over capacity: drop the least valuable items instead of the newest ones
+        if len(self.items) > self.max_items:
+            dropped = heapq.nlargest(len(self.items) - self.max_items, self.items)
+            self.items = heapq.nsmallest(self.max_items, self.items)
+            heapq.heapify(self.items)
+            for _, _, _, tweet_id in dropped:
+                self.processed_ids.discard(tweet_id)
+            print(f"Queue full, dropped {len(dropped)} lowest priority notifications")
     
+    def _release_delayed(self) -> None:
+        """Move nacked entries whose delay has passed back onto the heap."""
+        now = time.time()
+        while self.delayed and self.delayed[0][0] <= now:
+            heapq.heappush(self.items, heapq.heappop(self.delayed)[1])
+
     def is_ready(self) -> bool:
         """Check if queue has enough items to start processing."""
-        return len(self.items) >= self.min_queue_size
+        return len(self) >= self.min_queue_size
     
     def get_all(self) -> List[Tuple[str, str]]:
-        """Get all items from the queue and clear it."""
-        items = list(self.items)
-        return items
-    
+        """Get all visible items from the queue, highest priority first, without removing them."""
+        self._release_delayed()
+        return [(notif, tweet_id) for _, _, notif, tweet_id in sorted(self.items)]
+
+    def pop_batch(self, k: int, token_budget: int) -> List[Tuple[str, str]]:
+        """
+        Pop up to k of the highest priority items whose combined size fits in token_budget.
+
+        Items that don't fit the remaining budget are skipped (and stay queued) so smaller,
+        slightly less valuable ones can still fill the batch. An item larger than the whole
+        budget would never fit, so it is taken truncated when it comes first.
+
+        Returns:
+            List of (content, tweet_id) tuples, highest priority first
+        """
+        self._release_delayed()
+        batch, skipped, used = [], [], 0
+        while self.items and len(batch) < k:
+            entry = heapq.heappop(self.items)
+            tokens = count_tokens(entry[2])
+            if tokens > token_budget and not batch:
+                entry = (entry[0], entry[1], truncate_to_tokens(entry[2], token_budget), entry[3])
+                tokens = token_budget
+            elif used + tokens > token_budget:
+                skipped.append(entry)
+                continue
+            used += tokens
+            batch.append(entry)
+        for entry in skipped:
+            heapq.heappush(self.items, entry)
+
+        self.in_flight = batch
+        print(f"Popped {len(batch)} notifications (~{used} tokens), {len(self.items)} left in queue")
+        return [(notif, tweet_id) for _, _, notif, tweet_id in batch]
 
     def process_queue(self) -> tuple[List[Tuple[str, str]], List[str]]:
         """
-        Process all items from the queue and prepare notifications for processing.
+        Pop the most valuable batch from the queue and prepare notifications for processing.
         
         Returns:
             tuple: (filtered_notifs_from_queue, notif_context)
@@ -43,7 +144,7 @@ class NotificationQueue:
                 - notif_context: List of notification contents only
         """
         print("Queue ready for processing!")
-        filtered_notifs_from_queue = self.get_all()
+        filtered_notifs_from_queue = self.pop_batch(self.batch_size, self.token_budget)
         notif_context = [context[0] for context in filtered_notifs_from_queue]
         
         print("New Notifications:")
@@ -55,7 +156,210 @@ class NotificationQueue:
     def clear(self) -> None:
         """Clear the queue."""
         self.items.clear()
+        self.in_flight.clear()
+        self.delayed.clear()
         self.processed_ids.clear()
+
+    def ack(self, keys: Optional[List[str]] = None) -> None:
+        """Forget the popped batch, the rest of the queue is kept for the next cycle."""
+        for _, _, _, tweet_id in self.in_flight:
+            if keys is None or tweet_id in keys:
+                self.processed_ids.discard(tweet_id)
+        self.in_flight = [entry for entry in self.in_flight if keys is not None and entry[3] not in keys]
+
+    def nack(self, keys: Optional[List[str]] = None, delay: int = 0) -> None:
+        """Put the popped batch back on the heap, it is popped again once delay seconds have passed."""
+        visible_at = time.time() + delay
+        for entry in self.in_flight:
+            if keys is None or entry[3] in keys:
+                if delay > 0:
+                    heapq.heappush(self.delayed, (visible_at, entry))
+                else:
+                    heapq.heappush(self.items, entry)
+        self.in_flight = [entry for entry in self.in_flight if keys is not None and entry[3] not in keys]
     
     def __len__(self) -> int:
-        return len(self.items)
\ No newline at end of file
+        """Number of visible items, nacked ones still waiting out their delay are not counted."""
+        self._release_delayed()
+        return len(self.items)
+
+
+@dataclass
+class DurableNotificationQueue:
+    """
+    Crash-safe notification queue backed by a SQLite table.
+
+    Items are leased in batches: a leased batch is invisible to other readers until it is
+    acked, nacked, or its visibility timeout expires, after which it is delivered again.
+    Tweet IDs act as idempotency keys, so re-adding an item that was already queued or
+    processed is a no-op and delivery is at-least-once.
+    """
+    db: Session
+    min_queue_size: int = 1
+    batch_size: int = 20
+    token_budget: int = 2000
+    half_life_minutes: float = 60
+    priority_fn: Callable[[str, dict], float] = default_priority
+    visibility_timeout: int = 600  # seconds
+    max_attempts: int = 5
+    leased_keys: list = field(default_factory=list)
+
+    def add(self, filtered_notifications: list, metadata: Optional[Dict[str, dict]] = None) -> None:
+        """
+        Add filtered notifications to the queue, ignoring tweet IDs that were seen before.
+
+        Args:
+            filtered_notifications: List of tuples containing (notification_content, tweet_id)
+            metadata: Optional per tweet id details (is_reply, author, followers, teleport) for priority scoring
+        """
+        metadata = metadata or {}
+        now = datetime.utcnow()
+        now_ts = time.time()
+        rows = {
+            str(tweet_id): {
+                "idempotency_key": str(tweet_id),
+                "content": notif,
+                "priority": decayed_priority_key(
+                    self.priority_fn(notif, metadata.get(tweet_id, {})), now_ts, self.half_life_minutes
+                ),
+                "status": "pending",
+                "attempts": 0,
+                "visible_at": now,
+            }
+            for notif, tweet_id in filtered_notifications
+        }
+        if not rows:
+            return
+
+        result = self.db.execute(
+            sqlite_insert(QueuedNotification)
+            .values(list(rows.values()))
+            .on_conflict_do_nothing(index_elements=["idempotency_key"])
+        )
+        self.db.commit()
+        print(f"Added {result.rowcount} of {len(rows)} notifications to durable queue")
+
+    def _visible(self, now: datetime):
+        # An expired lease that used up max_attempts is not delivered again (pop_batch parks it as dead)
+        return (
+            (QueuedNotification.status == "pending")
+            | ((QueuedNotification.status == "leased") & (QueuedNotification.attempts < self.max_attempts))
+        ) & (QueuedNotification.visible_at <= now)
+
+    def _park_exhausted(self, now: datetime) -> None:
+        """Mark expired leases that used up max_attempts as dead, a batch that kept crashing the process is not retried forever."""
+        parked = self.db.query(QueuedNotification).filter(
+            QueuedNotification.status == "leased",
+            QueuedNotification.visible_at <= now,
+            QueuedNotification.attempts >= self.max_attempts
+        ).update({"status": "dead"}, synchronize_session=False)
+        if parked:
+            print(f"Parked {parked} notifications as dead after {self.max_attempts} expired leases")
+
+    def is_ready(self) -> bool:
+        """Check if queue has enough visible items to start processing."""
+        return len(self) >= self.min_queue_size
+
+    def pop_batch(self, k: int, token_budget: int) -> List[Tuple[str, str]]:
+        """
+        Lease up to k of the highest priority visible items whose combined size fits in token_budget.
+
+        An item larger than the whole budget is leased (and returned truncated) when it
+        comes first, otherwise it would stay visible forever without ever fitting. Expired
+        leases that already used up max_attempts are parked as dead first.
+
+        Returns:
+            List of (content, tweet_id) tuples, highest priority first
+        """
+        now = datetime.utcnow()
+        self._park_exhausted(now)
+        # The priority column already encodes age decay, so ORDER BY gives the current ranking
+        candidates = (
+            self.db.query(QueuedNotification)
+            .filter(self._visible(now))
+            .order_by(QueuedNotification.priority.desc(), QueuedNotification.id)
+            .limit(k * 5)
+            .all()
+        )
+
+        rows, contents, used = [], [], 0
+        for row in candidates:
+            if len(rows) >= k:
+                break
+            content = row.content
+            tokens = count_tokens(content)
+            if tokens > token_budget and not rows:
+                content = truncate_to_tokens(content, token_budget)
+                tokens = token_budget
+            elif used + tokens > token_budget:
+                continue
+            used += tokens
+            rows.append(row)
+            contents.append(content)
+
+        lease_until = now + timedelta(seconds=self.visibility_timeout)
+        for row in rows:
+            row.status = "leased"
+            row.visible_at = lease_until
+            row.attempts = (row.attempts or 0) + 1
+        self.db.commit()
+
+        self.leased_keys = [row.idempotency_key for row in rows]
+        print(f"Leased {len(rows)} notifications (~{used} tokens)")
+        return [(content, row.idempotency_key) for content, row in zip(contents, rows)]
+
+    def process_queue(self) -> tuple[List[Tuple[str, str]], List[str]]:
+        """
+        Lease the most valuable batch of visible items.
+
+        Returns:
+            tuple: (filtered_notifs_from_queue, notif_context)
+                - filtered_notifs_from_queue: List of (content, tweet_id) tuples
+                - notif_context: List of notification contents only
+        """
+        print("Queue ready for processing!")
+        filtered_notifs_from_queue = self.pop_batch(self.batch_size, self.token_budget)
+        notif_context = [content for content, _ in filtered_notifs_from_queue]
+
+        print("New Notifications:")
+        for content, tweet_id in filtered_notifs_from_queue:
+            print(f"- {content}, tweet at https://x.com/user/status/{tweet_id}\n")
+
+        return filtered_notifs_from_queue, notif_context
+
+    def ack(self, keys: Optional[List[str]] = None) -> None:
+        """Mark leased items as done. Defaults to the whole current batch."""
+        keys = self.leased_keys if keys is None else keys
+        if keys:
+            self.db.query(QueuedNotification).filter(
+                QueuedNotification.idempotency_key.in_(keys)
+            ).update({"status": "done"}, synchronize_session=False)
+            self.db.commit()
+        done = set(keys)
+        self.leased_keys = [key for key in self.leased_keys if key not in done]
+
+    def nack(self, keys: Optional[List[str]] = None, delay: int = 0) -> None:
+        """
+        Return leased items to the queue so they are retried after delay seconds.
+        Items that have used up max_attempts are parked as dead instead.
+        """
+        keys = self.leased_keys if keys is None else keys
+        if keys:
+            visible_at = datetime.utcnow() + timedelta(seconds=delay)
+            query = self.db.query(QueuedNotification).filter(QueuedNotification.idempotency_key.in_(keys))
+            query.filter(QueuedNotification.attempts >= self.max_attempts).update(
+                {"status": "dead"}, synchronize_session=False
+            )
+            query.filter(QueuedNotification.attempts < self.max_attempts).update(
+                {"status": "pending", "visible_at": visible_at}, synchronize_session=False
+            )
+            self.db.commit()
+        done = set(keys)
+        self.leased_keys = [key for key in self.leased_keys if key not in done]
+
+    def clear(self) -> None:
+        """Acknowledge the current batch once the cycle has handled it."""
+        self.ack()
+
+    def __len__(self) -> int:
+        return self.db.query(QueuedNotification).filter(self._visible(datetime.utcnow())).count()
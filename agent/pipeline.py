@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import json
 import os
 import time
@@ -23,27 +23,113 @@ from engines.twitter.follow_user import FollowManager
 from engines.twitter.reply_manager import ReplyManager
 from engines.twitter.create_user import UserManager
 from engines.twitter.utils import extract_usernames_from_notif_context
-from notification_queue import NotificationQueue
+from engines.twitter.entities import extract_batch
+from notification_queue import NotificationQueue, DurableNotificationQueue
 from config import Config
+from engines.prompts.context_budget import ContextAssembler
+from circuit_breaker import CircuitOpenError, get_breaker
+
+# Dependencies of the per-notification stages, a stage whose dependency is down is deferred on its own
+STAGE_DEPENDENCIES = {
+    "wallet": ("rpc", "llm"),
+    "follow": ("llm", "x"),
+}
+MAX_DEFERRED_NOTIFICATIONS = 200  # per stage, the oldest are dropped beyond this
+
 
 class PostingPipeline:
     def __init__(self, config: Config):
         self.config = config
         self.post_retriever = PostRetriever()
-        # self.dm_retriever = DMRetreiver()
-        self.short_term_mem = ShortTermMemoryManager()
+        # self.dm_retriever = DMRetreiver(
+        #     self.config.dm_history_pages_per_sync,
+        #     self.config.dm_messages_per_user,
+        #     self.config.dm_context_days
+        # )
+        self.short_term_mem = ShortTermMemoryManager(
+            stream=self.config.stream_llm_output,
+            max_chars=self.config.short_term_memory_max_chars
+        )
         self.long_term_mem = LongTermMemoryManager()
-        self.post_maker = PostMaker()
+        self.post_maker = PostMaker(
+            stream=self.config.stream_llm_output,
+            max_post_chars=self.config.max_post_chars,
+            min_candidates=self.config.min_post_candidates,
+            max_candidates=self.config.max_post_candidates,
+            candidate_window=self.config.post_candidate_window,
+            format_mode=self.config.post_format_mode
+        )
         self.significance_scorer = SignificanceScorer()
         self.post_sender = PostSender()
         self.wallet_manager = WalletManager()
         self.follow_manager = FollowManager(self.config)
-        self.notification_queue = NotificationQueue()
+        if self.config.durable_notification_queue:
+            self.notification_queue = DurableNotificationQueue(
+                db=self.config.db,
+                batch_size=self.config.notification_batch_size,
+                token_budget=self.config.notification_token_budget,
+                half_life_minutes=self.config.notification_half_life_minutes,
+                visibility_timeout=self.config.notification_visibility_timeout
+            )
+        else:
+            self.notification_queue = NotificationQueue(
+                batch_size=self.config.notification_batch_size,
+                token_budget=self.config.notification_token_budget,
+                half_life_minutes=self.config.notification_half_life_minutes
+            )
         self.user_manager = UserManager()
         self.ai_user = self.user_manager._get_or_create_ai_user(self.config.db, 
                                                                 self.config.bot_username, 
                                                                 self.config.bot_email)
         self.reply_manager = ReplyManager(self.config, self.ai_user)
+        self.context_assembler = ContextAssembler(budgets=self.config.context_budgets)
+        # Last good results, reused when a dependency's circuit breaker is open
+        self.last_short_term_memory = ""
+        self.last_long_term_memories = "No sufficiently relevant memories found"
+        # Notifications a stage could not handle yet, stage -> (content, tweet_id) tuples
+        self.deferred_notifs: Dict[str, list] = {stage: [] for stage in STAGE_DEPENDENCIES}
+
+    def _available(self, *dependencies: str) -> bool:
+        """Check that none of the given dependencies has an open circuit breaker."""
+        unavailable = [name for name in dependencies if not get_breaker(name).is_available()]
+        if unavailable:
+            print(f"Circuit open for {', '.join(unavailable)}")
+        return not unavailable
+
+    def _mark_teleport_authors(self, notif_metadata: dict) -> None:
+        """Flag notifications whose author holds a teleport NFT, for queue priority."""
+        authors = {meta["author"] for meta in notif_metadata.values() if meta.get("author")}
+        if not authors:
+            return
+        holders = {
+            username for (username,) in self.config.db.query(User.username)
+            .filter(User.username.in_(authors), User.teleport == True)
+        }
+        for meta in notif_metadata.values():
+            meta["teleport"] = meta.get("author") in holders
+
+    def _stage_batch(self, stage: str, filtered_notifs: list) -> Optional[list]:
+        """
+        Notifications a stage should handle now, None when its dependencies are down.
+
+        A deferred stage keeps the batch until its breakers close, then handles it along
+        with that cycle's batch. Other stages and post generation are not held up.
+        """
+        deferred = self.deferred_notifs[stage]
+        if not self._available(*STAGE_DEPENDENCIES[stage]):
+            seen = {tweet_id for _, tweet_id in deferred}
+            deferred.extend(notif for notif in filtered_notifs if notif[1] not in seen)
+            if len(deferred) > MAX_DEFERRED_NOTIFICATIONS:
+                print(f"Dropping {len(deferred) - MAX_DEFERRED_NOTIFICATIONS} oldest deferred {stage} notifications")
+                del deferred[:len(deferred) - MAX_DEFERRED_NOTIFICATIONS]
+            print(f"Deferring {stage} handling of {len(deferred)} notifications")
+            return None
+        if not deferred:
+            return filtered_notifs
+        seen = {tweet_id for _, tweet_id in filtered_notifs}
+        batch = [notif for notif in deferred if notif[1] not in seen] + filtered_notifs
+        deferred.clear()
+        return batch
 
     def run(self) -> None:
         """Execute the main pipeline."""
@@ -53,7 +139,11 @@ class PostingPipeline:
         print(f"Recent posts: {formatted_posts}")
 
         # Process notifications
-        notif_context_tuple = self.post_retriever.fetch_notification_context(self.config.account)
+        try:
+            notif_context_tuple = self.post_retriever.fetch_notification_context(self.config.account)
+        except CircuitOpenError as e:
+            print(f"Skipping notifications: {e}")
+            notif_context_tuple = []
         print(f"Notification context: {notif_context_tuple}")
 
         existing_tweet_ids = self.post_retriever.get_existing_tweet_ids(self.config.db)
@@ -62,81 +152,127 @@ class PostingPipeline:
         filtered_notifs = self.post_retriever.filter_notifications(notif_context_tuple, existing_tweet_ids)
         print(f"Filtered notifications: {filtered_notifs}")
 
-        self.notification_queue.add(filtered_notifications=filtered_notifs)
+        notif_metadata = self.post_retriever.notification_metadata
+        self._mark_teleport_authors(notif_metadata)
+        self.notification_queue.add(filtered_notifications=filtered_notifs, metadata=notif_metadata)
 
          # If queue isn't ready, just store the tweet IDs and exit early
         if not self.notification_queue.is_ready():
             print(f"Queue not ready. Current size: {len(self.notification_queue)}")
             return
 
-        # Process Direct Messages
+        # Sync Direct Messages (new ones are stored as they are fetched)
         # messages = self.dm_retriever.fetch_latest_dms(self.config.db, self.config.account)
-
-        # Store Direct Messages
-        # self.dm_retriever.store_processed_messages(self.config.db, messages)
-        # print(f"Stored messages")
         # Store processed tweet IDs
         self.post_sender.store_processed_tweets(self.config.db, notif_context_tuple)
         
         # Let agent go through tweets now
         filtered_notifs_from_queue, notif_context = self.notification_queue.process_queue()
 
-        # user_ids = extract_usernames_from_notif_context(self.config.account, notif_context)
+        try:
+            self._process_batch(recent_posts, formatted_posts, filtered_notifs_from_queue, notif_context)
+        except Exception:
+            # Hand the batch back so it is redelivered instead of lost
+            self.notification_queue.nack()
+            raise
+
+        # Remove processed tweet IDs from the queue
+        self.notification_queue.ack()
+
+    def _process_batch(self, recent_posts, formatted_posts, filtered_notifs_from_queue, notif_context) -> None:
+        """
+        Act on a batch of queued notifications and generate a new post.
+
+        Wallet and follow handling are deferred on their own while their dependencies are
+        down (see _stage_batch), so the batch is still acked once this returns.
+        """
+        # Parse every notification once, wallet, follow and reply handling all read from these
+        entities = extract_batch(filtered_notifs_from_queue)
+        # user_ids = extract_usernames_from_notif_context(self.config.account, notif_context, entities)
 
         # messages = self.dm_retriever.retrieve_messages_by_users(self.config.db, user_ids)
 
         if notif_context:
             # try:
-            #     self.reply_manager._handle_replies(filtered_notifs_from_queue)
-            #     time.sleep(5)
+            #     self.reply_manager._handle_replies(filtered_notifs_from_queue, entities)
             # except Exception as e:
             #     print(f"Error handling replies: {e}")
             
             print(notif_context)
-            try:
-                self.wallet_manager._handle_wallet_transactions(self.config.db, notif_context, self.config)
-                time.sleep(5)
-            except Exception as e:
-                print(f"Error handling wallet transactions: {e}")
+            wallet_notifs = self._stage_batch("wallet", filtered_notifs_from_queue)
+            if wallet_notifs is not None:
+                wallet_entities = entities if wallet_notifs is filtered_notifs_from_queue else extract_batch(wallet_notifs)
+                try:
+                    self.wallet_manager._handle_wallet_transactions(
+                        self.config.db, [content for content, _ in wallet_notifs], self.config, wallet_entities
+                    )
+                except Exception as e:
+                    print(f"Error handling wallet transactions: {e}")
             
-            try:
-                self.follow_manager._handle_follows(notif_context)
-                time.sleep(5)
-            except Exception as e: 
-                print(f"Error handling follows: {e}")
+            follow_notifs = self._stage_batch("follow", filtered_notifs_from_queue)
+            if follow_notifs is not None:
+                follow_entities = entities if follow_notifs is filtered_notifs_from_queue else extract_batch(follow_notifs)
+                try:
+                    self.follow_manager._handle_follows([content for content, _ in follow_notifs], follow_entities)
+                except Exception as e: 
+                    print(f"Error handling follows: {e}")
     
-        # Generate and process memories
-        short_term_memory = self.short_term_mem.generate_short_term_memory(
-            recent_posts,
-            notif_context,
-            self.config.llm_api_key
-        )
+        # Size-limit what goes into the prompts, wallet and follow handling above still see everything
+        prompt_notifs = self.context_assembler.fit("notifications", notif_context)
+        prompt_posts = self.context_assembler.fit_text("recent_posts", formatted_posts)
+
+        # Generate and process memories, falling back to the last ones if the LLM is down
+        short_term_memory = None
+        if self._available("llm"):
+            short_term_memory = self.short_term_mem.generate_short_term_memory(
+                prompt_posts,
+                prompt_notifs,
+                self.config.llm_api_key
+            )
+        if short_term_memory:
+            self.last_short_term_memory = short_term_memory
+        else:
+            print("Using cached short-term memory")
+            short_term_memory = self.last_short_term_memory
         print(f"Short-term memory: {short_term_memory}")
 
         
         # Get relevant long term memories
-        long_term_memories = self.long_term_mem.retrieve_relevant_memories(
-            db=self.config.db,
-            query=short_term_memory,
-            openai_api_key=self.config.openai_api_key
-        )
+        long_term_memories = self.last_long_term_memories
+        if short_term_memory and self._available("embeddings"):
+            try:
+                long_term_memories = self.long_term_mem.retrieve_relevant_memories(
+                    db=self.config.db,
+                    query=short_term_memory,
+                    openai_api_key=self.config.openai_api_key
+                )
+                self.last_long_term_memories = long_term_memories
+            except Exception as e:
+                print(f"Error retrieving long-term memories, using cached ones: {e}")
+        long_term_memories = self.context_assembler.fit_text("memories", long_term_memories, keep_header=True)
         print(f"Long-term memories: {long_term_memories}")
+        print(f"Prompt context budget: {self.context_assembler.summary()}")
+
+        if not self._available("llm"):
+            print("Skipping post generation")
+            return
 
         # Generate and evaluate new post
         new_post_content, significance_score = self.post_maker.generate_and_evaluate_post(
            short_term_memory,
            long_term_memories,
-           formatted_posts,
-           notif_context,
+           prompt_posts,
+           prompt_notifs,
            self.config.llm_api_key,
            self.config.openai_api_key,
            self.config.db,
-           self.config.min_storing_memory_significance
+           self.config.min_storing_memory_significance,
+           min_posting_significance_score=self.config.min_posting_significance_score
         )
 
         # Post if significant enough
-        if significance_score >= self.config.min_posting_significance_score:
-            tweet_id = self.post_maker._post_content(new_post_content)
+        if significance_score >= self.config.min_posting_significance_score and self._available("x"):
+            tweet_id = self.post_sender._post_content(new_post_content, self.config.auth, self.config.account)
             if tweet_id:
                 new_post = Post(
                     content=new_post_content,
@@ -148,6 +284,3 @@ class PostingPipeline:
                 self.config.db.add(new_post)
                 self.config.db.commit()
                 print(f"Posted with tweet_id: {tweet_id}")
-        
-        # Remove processed tweet IDs from the queue
-        self.notification_queue.clear()
\ No newline at end of file
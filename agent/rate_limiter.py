@@ -0,0 +1,255 @@
+import heapq
+import itertools
+import threading
+import time
+import re
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from circuit_breaker import CircuitOpenError, breaker_for_provider
+
+# Lower value = served first when several calls wait on the same provider
+PRIORITY_REPLY = 0
+PRIORITY_POST = 1
+PRIORITY_DEFAULT = 5
+PRIORITY_FOLLOW = 8
+
+# provider -> (requests per second, burst size)
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    "hyperbolic": (1.0, 5),
+    "openrouter": (1.0, 5),
+    "openai": (5.0, 10),
+    "x": (1 / 15, 3),
+    "getmoni": (2.0, 5),
+}
+
+
+@dataclass
+class TokenBucket:
+    """Token bucket for a single provider, optionally paused by rate-limit headers."""
+    rate: float
+    capacity: float
+    tokens: float = None
+    updated: float = field(default_factory=time.monotonic)
+    blocked_until: float = 0.0
+
+    def __post_init__(self):
+        if self.tokens is None:
+            self.tokens = self.capacity
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_available(self, now: float) -> float:
+        """Seconds until a token can be consumed (0 if one is available now)."""
+        self._refill(now)
+        blocked = max(0.0, self.blocked_until - now)
+        if self.tokens >= 1:
+            return blocked
+        return max(blocked, (1 - self.tokens) / self.rate)
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+@dataclass
+class WaitStats:
+    """How long calls to a provider waited for the scheduler."""
+    calls: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    last_wait: float = 0.0
+    rate_limited: int = 0  # 429 responses seen
+
+    def record(self, waited: float) -> None:
+        self.calls += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.last_wait = waited
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.calls if self.calls else 0.0
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """
+    Parse a rate-limit reset value into seconds from now.
+
+    Handles plain seconds ("30"), epoch seconds / milliseconds (X, OpenRouter),
+    Go-style durations ("1m30s", "250ms", OpenAI) and HTTP dates (Retry-After).
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        number = float(value)
+        now = time.time()
+        if number > 1e12:
+            return max(0.0, number / 1000 - now)
+        if number > 1e9:
+            return max(0.0, number - now)
+        return max(0.0, number)
+    except ValueError:
+        pass
+
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if parts:
+        scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitScheduler:
+    """
+    Central per-provider token-bucket scheduler for outbound API calls.
+
+    Calls wait for a token from their provider's bucket; when several calls are waiting
+    the one with the lowest priority value goes first. Rate-limit headers on responses
+    (x-ratelimit-* and Retry-After) pause the bucket until the provider's window resets.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]] = None, max_retries: int = 2):
+        self.max_retries = max_retries
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.stats: Dict[str, WaitStats] = {}
+        self._waiting: Dict[str, list] = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self.configure(limits or DEFAULT_LIMITS)
+
+    def configure(self, limits: Dict[str, Tuple[float, float]]) -> None:
+        """Set (or replace) the rate and burst size for the given providers."""
+        with self._cond:
+            for provider, (rate, capacity) in limits.items():
+                self.buckets[provider] = TokenBucket(rate=rate, capacity=capacity)
+            self._cond.notify_all()
+
+    def _bucket(self, provider: str) -> TokenBucket:
+        if provider not in self.buckets:
+            rate, capacity = DEFAULT_LIMITS.get(provider, (1.0, 5))
+            self.buckets[provider] = TokenBucket(rate=rate, capacity=capacity)
+        return self.buckets[provider]
+
+    def acquire(self, provider: str, priority: int = PRIORITY_DEFAULT) -> float:
+        """
+        Block until a call to provider may be made.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._cond:
+            bucket = self._bucket(provider)
+            queue = self._waiting.setdefault(provider, [])
+            ticket = (priority, next(self._counter))
+            heapq.heappush(queue, ticket)
+            while True:
+                now = time.monotonic()
+                if queue[0] == ticket:
+                    wait = bucket.time_until_available(now)
+                    if wait <= 0:
+                        bucket.consume(now)
+                        heapq.heappop(queue)
+                        self._cond.notify_all()
+                        break
+                    self._cond.wait(timeout=wait)
+                else:
+                    # Someone with higher priority is ahead, wait for them to go
+                    self._cond.wait(timeout=1.0)
+
+            waited = time.monotonic() - start
+            self.stats.setdefault(provider, WaitStats()).record(waited)
+        if waited >= 1:
+            print(f"Waited {waited:.1f}s for {provider} rate limit")
+        return waited
+
+    def update_from_headers(self, provider: str, headers, status_code: Optional[int] = None) -> None:
+        """Pause or throttle a provider's bucket based on its rate-limit response headers."""
+        if not headers:
+            return
+        headers = {str(k).lower(): v for k, v in headers.items()}
+
+        remaining = headers.get("x-ratelimit-remaining-requests", headers.get("x-ratelimit-remaining"))
+        reset = headers.get("x-ratelimit-reset-requests", headers.get("x-ratelimit-reset"))
+        retry_after = parse_duration(headers.get("retry-after"))
+
+        with self._cond:
+            bucket = self._bucket(provider)
+            now = time.monotonic()
+            if remaining is not None:
+                try:
+                    bucket._refill(now)
+                    bucket.tokens = min(bucket.tokens, float(remaining))
+                except ValueError:
+                    pass
+
+            pause = None
+            if status_code == 429:
+                self.stats.setdefault(provider, WaitStats()).rate_limited += 1
+                pause = retry_after if retry_after is not None else parse_duration(reset)
+                if pause is None:
+                    pause = 1 / bucket.rate
+            elif remaining is not None and str(remaining).strip() in ("0", "0.0"):
+                pause = parse_duration(reset)
+
+            if pause:
+                bucket.blocked_until = max(bucket.blocked_until, now + pause)
+                print(f"{provider} rate limit reached, pausing for {pause:.1f}s")
+            self._cond.notify_all()
+
+    def call(self, provider: str, fn: Callable, *args, priority: int = PRIORITY_DEFAULT, **kwargs) -> Any:
+        """
+        Make a rate-limited call.
+
+        If fn returns an HTTP response its headers feed back into the bucket, and 429
+        responses are retried (after the advertised Retry-After) up to max_retries times.
+        The call also goes through the provider's circuit breaker.
+
+        Raises:
+            CircuitOpenError: If the provider's breaker is open (checked before waiting on the bucket)
+        """
+        breaker = breaker_for_provider(provider)
+        for attempt in range(self.max_retries + 1):
+            if not breaker.is_available():
+                raise CircuitOpenError(breaker.name)
+            self.acquire(provider, priority)
+            result = breaker.call(fn, *args, **kwargs)
+            headers = getattr(result, "headers", None)
+            status_code = getattr(result, "status_code", None)
+            if headers is not None:
+                self.update_from_headers(provider, headers, status_code)
+            if status_code != 429 or attempt == self.max_retries:
+                return result
+            close = getattr(result, "close", None)
+            if close:
+                close()
+        return result
+
+    def wait_summary(self) -> Dict[str, dict]:
+        """Per-provider wait statistics."""
+        with self._cond:
+            return {
+                provider: {
+                    "calls": s.calls,
+                    "avg_wait": round(s.avg_wait, 3),
+                    "max_wait": round(s.max_wait, 3),
+                    "last_wait": round(s.last_wait, 3),
+                    "rate_limited": s.rate_limited,
+                }
+                for provider, s in self.stats.items()
+            }
+
+
+scheduler = RateLimitScheduler()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """Process-wide scheduler shared by all engines."""
+    return scheduler
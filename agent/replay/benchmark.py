@@ -0,0 +1,244 @@
+"""
+Offline replay benchmark for PostingPipeline.
+
+Runs full pipeline cycles against recorded or generated notifications, a fake LLM and
+embeddings endpoint, and an in-memory chain, then reports cycles/sec, per-stage latency
+and memory use.
+
+    python -m replay.benchmark --notifications 10000 --memories 1000000 --cycles 5
+    python -m replay.benchmark --fixture notifications.json --llm-latency-ms 300
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+REPLAY_KEY = "replay-key"
+REPLAY_RPC_URL = "http://replay.invalid/rpc"
+REPLAY_TELEPORT_ADDRESS = "0x" + "7e" * 20
+# Any 32-byte value is a valid key; this one only ever signs replay transactions
+REPLAY_PRIVATE_KEY = "0x" + "11" * 32
+
+STAGES = {
+    "fetch_notifications": ("post_retriever", "fetch_notification_context"),
+    "filter_notifications": ("post_retriever", "filter_notifications"),
+    "queue_add": ("notification_queue", "add"),
+    "store_processed": ("post_sender", "store_processed_tweets"),
+    "queue_pop": ("notification_queue", "process_queue"),
+    "wallet": ("wallet_manager", "_handle_wallet_transactions"),
+    "follows": ("follow_manager", "_handle_follows"),
+    "short_term_memory": ("short_term_mem", "generate_short_term_memory"),
+    "long_term_memory": ("long_term_mem", "retrieve_relevant_memories"),
+    "post_generation": ("post_maker", "generate_and_evaluate_post"),
+    "post_send": ("post_sender", "_post_content"),
+}
+
+
+class StageTimer:
+    """Wraps pipeline component methods and records how long each call takes."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def wrap(self, name: str, obj, method: str) -> None:
+        original = getattr(obj, method)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.samples.setdefault(name, []).append(time.perf_counter() - start)
+
+        setattr(obj, method, timed)
+
+    def instrument(self, pipeline) -> None:
+        for name, (component, method) in STAGES.items():
+            self.wrap(name, getattr(pipeline, component), method)
+
+    def summary(self) -> Dict[str, dict]:
+        report = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            report[name] = {
+                "calls": len(ordered),
+                "mean_ms": round(1000 * sum(ordered) / len(ordered), 3),
+                "p50_ms": round(1000 * ordered[len(ordered) // 2], 3),
+                "p95_ms": round(1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                "max_ms": round(1000 * ordered[-1], 3),
+            }
+        return report
+
+
+def seed_memories(db, count: int, dims: int, seed: int = 0, chunk_size: int = 10_000) -> None:
+    """Bulk insert count long-term memories with random unit embeddings."""
+    import numpy as np
+    from sqlalchemy import insert
+    from models import LongTermMemory
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        vectors = rng.standard_normal((size, dims))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        scores = rng.integers(1, 11, size=size)
+        db.execute(insert(LongTermMemory), [
+            {
+                "content": f"replayed memory {start + i}",
+                "embedding": str(vectors[i].round(4).tolist()),
+                "significance_score": float(scores[i]),
+            }
+            for i in range(size)
+        ])
+        db.commit()
+
+
+def install_fakes(fake_llm, chain) -> None:
+    """Route every outbound call of this process to the fakes."""
+    from http_pool import mount, set_openai_client, set_web3_provider
+    from rate_limiter import DEFAULT_LIMITS, get_scheduler
+    from replay.transport import FakeLLMAdapter, make_openai_client
+
+    adapter = FakeLLMAdapter(fake_llm)
+    for provider in ("hyperbolic", "openrouter", "x", "getmoni"):
+        mount(provider, adapter)
+    set_openai_client(REPLAY_KEY, make_openai_client(fake_llm, REPLAY_KEY))
+    set_web3_provider(REPLAY_RPC_URL, chain)
+    # Measure the pipeline, not the production rate limits
+    get_scheduler().configure({provider: (1e9, 1e9) for provider in DEFAULT_LIMITS})
+
+
+def run_benchmark(args) -> dict:
+    # db_setup binds its engine at import time, so point it at a scratch database first
+    workdir = tempfile.mkdtemp(prefix="replay-")
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "replay.db")
+
+    from config import Config
+    from db.db_setup import create_database, get_db
+    from pipeline import PostingPipeline
+    from replay.fake_chain import InMemoryChain
+    from replay.fake_llm import FakeLLM
+    from replay.fixtures import FakeAccount, generate_notifications, load_fixture
+
+    create_database()
+    db = next(get_db())
+
+    start = time.perf_counter()
+    seed_memories(db, args.memories, args.embedding_dims, seed=args.seed)
+    seed_seconds = time.perf_counter() - start
+
+    fake_llm = FakeLLM(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms, embedding_dims=args.embedding_dims)
+    chain = InMemoryChain(teleport_address=REPLAY_TELEPORT_ADDRESS)
+    install_fakes(fake_llm, chain)
+
+    notifications = load_fixture(args.fixture) if args.fixture else generate_notifications(args.notifications, seed=args.seed)
+    account = FakeAccount(notifications)
+    config = Config(
+        db=db,
+        account=account,
+        auth=None,
+        private_key_hex=REPLAY_PRIVATE_KEY,
+        eth_mainnet_rpc_url=REPLAY_RPC_URL,
+        llm_api_key=REPLAY_KEY,
+        openrouter_api_key=REPLAY_KEY,
+        openai_api_key=REPLAY_KEY,
+        getmoni_api_key=REPLAY_KEY,
+        stream_llm_output=args.stream,
+        durable_notification_queue=args.durable_queue,
+    )
+    pipeline = PostingPipeline(config)
+    timer = StageTimer()
+    timer.instrument(pipeline)
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    errors = 0
+    cycle_times = []
+    output = sys.stdout if args.verbose else io.StringIO()
+    for _ in range(args.cycles):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            try:
+                pipeline.run()
+            except Exception as e:
+                errors += 1
+                print(f"Cycle failed: {e}", file=sys.stderr)
+        cycle_times.append(time.perf_counter() - start)
+        if not args.verbose:
+            output.seek(0)
+            output.truncate()
+
+    peak_traced = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    if args.trace_memory:
+        tracemalloc.stop()
+
+    total = sum(cycle_times)
+    return {
+        "notifications_per_cycle": len(notifications.get("globalObjects", {}).get("tweets", {})),
+        "memories": args.memories,
+        "embedding_dims": args.embedding_dims,
+        "memory_seed_seconds": round(seed_seconds, 2),
+        "cycles": args.cycles,
+        "errors": errors,
+        "cycles_per_sec": round(args.cycles / total, 4) if total else None,
+        "mean_cycle_ms": round(1000 * total / args.cycles, 2) if args.cycles else None,
+        "stages": timer.summary(),
+        "fake_calls": dict(fake_llm.calls),
+        "rpc_requests": chain.requests,
+        "peak_traced_mb": round(peak_traced / 2 ** 20, 1) if peak_traced is not None else None,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "db_path": os.environ["SQLITE_DB_PATH"],
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"Notifications/cycle: {report['notifications_per_cycle']}, memories: {report['memories']} "
+          f"({report['embedding_dims']} dims, seeded in {report['memory_seed_seconds']}s)")
+    print(f"Cycles: {report['cycles']} ({report['errors']} failed), "
+          f"{report['cycles_per_sec']} cycles/sec, {report['mean_cycle_ms']} ms/cycle")
+    print(f"{'stage':<22}{'calls':>7}{'mean ms':>12}{'p50 ms':>12}{'p95 ms':>12}{'max ms':>12}")
+    for name, s in report["stages"].items():
+        print(f"{name:<22}{s['calls']:>7}{s['mean_ms']:>12}{s['p50_ms']:>12}{s['p95_ms']:>12}{s['max_ms']:>12}")
+    print(f"Fake endpoint calls: {report['fake_calls']}, RPC requests: {report['rpc_requests']}")
+    print(f"Peak traced memory: {report['peak_traced_mb']} MB, max RSS: {report['max_rss_mb']} MB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay PostingPipeline offline and measure throughput")
+    parser.add_argument("--notifications", type=int, default=10_000, help="generated notifications per cycle")
+    parser.add_argument("--fixture", help="recorded Account.notifications() JSON to replay instead")
+    parser.add_argument("--memories", type=int, default=1_000_000, help="long-term memories to seed")
+    parser.add_argument("--embedding-dims", type=int, default=64, help="embedding size for seeded memories and the fake endpoint")
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--stream", action="store_true", help="stream LLM output (stream_llm_output)")
+    parser.add_argument("--durable-queue", action="store_true", help="use the SQLite notification queue")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="skip tracemalloc, which slows allocation-heavy stages down")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
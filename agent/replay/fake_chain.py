@@ -0,0 +1,203 @@
+import base64
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from eth_abi import encode
+from eth_utils import keccak, to_checksum_address
+from web3.providers.base import BaseProvider
+
+NEW_TOKEN_DATA_TOPIC = "0x" + keccak(text="NewTokenData(uint256,uint256,address,string,string,string,string)").hex()
+TOKEN_URI_SELECTOR = "0x" + keccak(text="tokenURI(uint256)")[:4].hex()
+ZERO_HASH = "0x" + "00" * 32
+
+
+def _hex(value: int) -> str:
+    return hex(value)
+
+
+def _block_hash(number: int) -> str:
+    return "0x" + keccak(text=f"replay-block-{number}").hex()
+
+
+class InMemoryChain(BaseProvider):
+    """
+    Web3 provider backed by an in-memory chain, for replaying the wallet and teleport paths.
+
+    Supports the JSON-RPC methods the engines use: balances, nonces, gas price, blocks,
+    raw transaction submission with immediate receipts, tokenURI calls and NewTokenData logs.
+    Every block number or "latest" block lookup mines a new (empty) block, like polling a live chain.
+    """
+
+    def __init__(self, chain_id: int = 15107, balance_wei: int = 10 ** 18, gas_price: int = 10 ** 9,
+                 start_block: int = 1_000_000, teleport_address: Optional[str] = None):
+        super().__init__()
+        self.chain_id = chain_id
+        self.default_balance = balance_wei
+        self.gas_price = gas_price
+        self.block_number = start_block
+        self.teleport_address = to_checksum_address(teleport_address) if teleport_address else None
+        self.balances: Dict[str, int] = {}
+        self.nonces: Dict[str, int] = {}
+        self.receipts: Dict[str, dict] = {}
+        self.logs: List[dict] = []
+        self.token_uris: Dict[int, str] = {}
+        self.requests = 0
+        self.log_listeners: List[Callable[[dict], None]] = []  # called with every new log (eth_subscribe)
+        self._lock = threading.Lock()
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return True
+
+    def add_teleport_mint(self, token_id: int, x_id: int, to: str, username: str,
+                          name: str = "", pfp: str = "", policy: str = "") -> None:
+        """Mint a teleport NFT in a new block (emits NewTokenData and sets its tokenURI)."""
+        with self._lock:
+            self.block_number += 1
+            block = self.block_number
+            log = {
+                "address": self.teleport_address,
+                "topics": [
+                    NEW_TOKEN_DATA_TOPIC,
+                    "0x" + token_id.to_bytes(32, "big").hex(),
+                    "0x" + x_id.to_bytes(32, "big").hex(),
+                ],
+                "data": "0x" + encode(
+                    ["address", "string", "string", "string", "string"],
+                    [to_checksum_address(to), policy, name, username, pfp],
+                ).hex(),
+                "blockNumber": _hex(block),
+                "blockHash": _block_hash(block),
+                "transactionHash": "0x" + keccak(text=f"replay-mint-{token_id}").hex(),
+                "transactionIndex": "0x0",
+                "logIndex": _hex(len(self.logs)),
+                "removed": False,
+            }
+            self.logs.append(log)
+            metadata = {"name": name, "attributes": [{"trait_type": "X Username", "value": username}]}
+            self.token_uris[token_id] = "data:application/json;base64," + base64.b64encode(json.dumps(metadata).encode()).decode()
+        for listener in list(self.log_listeners):
+            listener(log)
+
+    def _block(self, number: int) -> dict:
+        return {
+            "number": _hex(number),
+            "hash": _block_hash(number),
+            "parentHash": _block_hash(number - 1),
+            "timestamp": _hex(1_700_000_000 + number * 12),
+            "transactions": [],
+            "uncles": [],
+            "gasLimit": _hex(30_000_000),
+            "gasUsed": "0x0",
+            "baseFeePerGas": _hex(self.gas_price),
+            "miner": "0x" + "00" * 20,
+            "difficulty": "0x0",
+            "totalDifficulty": "0x0",
+            "extraData": "0x",
+            "size": "0x0",
+            "nonce": "0x0000000000000000",
+            "mixHash": ZERO_HASH,
+            "sha3Uncles": ZERO_HASH,
+            "logsBloom": "0x" + "00" * 256,
+            "transactionsRoot": ZERO_HASH,
+            "stateRoot": ZERO_HASH,
+            "receiptsRoot": ZERO_HASH,
+        }
+
+    def _send_raw_transaction(self, raw_hex: str) -> str:
+        import rlp
+        from eth_account import Account
+
+        raw = bytes.fromhex(raw_hex[2:] if raw_hex.startswith("0x") else raw_hex)
+        tx_hash = "0x" + keccak(raw).hex()
+        sender = Account.recover_transaction(raw)
+        fields = rlp.decode(raw)  # legacy [nonce, gasPrice, gas, to, value, data, v, r, s]
+        to = to_checksum_address(fields[3]) if fields[3] else None
+        value = int.from_bytes(fields[4], "big")
+
+        self.block_number += 1
+        self.balances[sender] = self.balances.get(sender, self.default_balance) - value - 21000 * self.gas_price
+        if to:
+            self.balances[to] = self.balances.get(to, 0) + value
+        self.nonces[sender] = self.nonces.get(sender, 0) + 1
+        self.receipts[tx_hash] = {
+            "transactionHash": tx_hash,
+            "transactionIndex": "0x0",
+            "blockNumber": _hex(self.block_number),
+            "blockHash": _block_hash(self.block_number),
+            "from": sender,
+            "to": to,
+            "status": "0x1",
+            "gasUsed": _hex(21000),
+            "cumulativeGasUsed": _hex(21000),
+            "effectiveGasPrice": _hex(self.gas_price),
+            "contractAddress": None,
+            "logs": [],
+            "logsBloom": "0x" + "00" * 256,
+            "type": "0x0",
+        }
+        return tx_hash
+
+    def _get_logs(self, params: dict) -> List[dict]:
+        from_block = int(params.get("fromBlock", "0x0"), 16) if str(params.get("fromBlock", "0x0")).startswith("0x") else 0
+        to_block = params.get("toBlock", "latest")
+        to_block = int(to_block, 16) if str(to_block).startswith("0x") else self.block_number
+        topics = params.get("topics") or []
+        matched = []
+        for log in self.logs:
+            if not from_block <= int(log["blockNumber"], 16) <= to_block:
+                continue
+            if topics and topics[0] and topics[0] not in (log["topics"][0], [log["topics"][0]]):
+                continue
+            matched.append(log)
+        return matched
+
+    def _call(self, params: dict) -> str:
+        data = params.get("data") or params.get("input") or "0x"
+        if data.startswith(TOKEN_URI_SELECTOR):
+            token_id = int(data[10:74], 16)
+            return "0x" + encode(["string"], [self.token_uris.get(token_id, "")]).hex()
+        return "0x"
+
+    def _result(self, method: str, params: list) -> Any:
+        if method == "eth_chainId":
+            return _hex(self.chain_id)
+        if method == "net_version":
+            return str(self.chain_id)
+        if method == "web3_clientVersion":
+            return "replay/in-memory"
+        if method == "eth_blockNumber":
+            self.block_number += 1
+            return _hex(self.block_number)
+        if method == "eth_getBlockByNumber":
+            if params[0] == "latest":
+                self.block_number += 1
+                return self._block(self.block_number)
+            return self._block(int(params[0], 16) if str(params[0]).startswith("0x") else self.block_number)
+        if method == "eth_getBalance":
+            return _hex(self.balances.get(to_checksum_address(params[0]), self.default_balance))
+        if method == "eth_getTransactionCount":
+            return _hex(self.nonces.get(to_checksum_address(params[0]), 0))
+        if method == "eth_gasPrice":
+            return _hex(self.gas_price)
+        if method == "eth_maxPriorityFeePerGas":
+            return _hex(self.gas_price // 10)
+        if method == "eth_estimateGas":
+            return _hex(21000)
+        if method == "eth_sendRawTransaction":
+            return self._send_raw_transaction(params[0])
+        if method == "eth_getTransactionReceipt":
+            return self.receipts.get(params[0])
+        if method == "eth_getLogs":
+            return self._get_logs(params[0])
+        if method == "eth_call":
+            return self._call(params[0])
+        raise NotImplementedError(f"InMemoryChain does not implement {method}")
+
+    def make_request(self, method, params) -> dict:
+        with self._lock:
+            self.requests += 1
+            try:
+                return {"jsonrpc": "2.0", "id": self.requests, "result": self._result(method, list(params or []))}
+            except NotImplementedError as e:
+                return {"jsonrpc": "2.0", "id": self.requests, "error": {"code": -32601, "message": str(e)}}
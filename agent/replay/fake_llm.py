@@ -0,0 +1,195 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+WORDS = (
+    "the agent woke up thinking about memory markets again and decided attention is the only real yield "
+    "every timeline is a casino and every reply is a tiny bet on someone else's future self "
+    "onchain vibes are just consensus with better lighting so keep building weird little machines "
+    "nobody asked for this but the mempool never sleeps and neither do the bots"
+).split()
+
+SSE_CHUNK_CHARS = 8
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def fake_text(prompt: str, max_chars: int = 220) -> str:
+    """Deterministic tweet-sized text derived from a hash of the prompt."""
+    rng = random.Random(_digest(prompt))
+    sentences = []
+    length = 0
+    while length < max_chars * 0.6:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 12)))
+        sentences.append(sentence + rng.choice([".", ".", "!", "?"]))
+        length += len(sentence) + 2
+    return " ".join(sentences)[:max_chars].rsplit(" ", 1)[0]
+
+
+def fake_embedding(text: str, dims: int = 1536) -> List[float]:
+    """Deterministic unit-length embedding derived from a hash of the text."""
+    rng = random.Random(_digest(text))
+    vector = [rng.gauss(0, 1) for _ in range(dims)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [round(v / norm, 6) for v in vector]
+
+
+class FakeLLM:
+    """
+    Offline stand-in for the Hyperbolic / OpenRouter / OpenAI endpoints the engines call.
+
+    Responses are derived from a hash of the request, so a replay is reproducible. The
+    kind of answer is picked from the prompt the same way the engines ask for it: scores
+    for significance prompts, JSON lists for wallet and follow decisions, text otherwise.
+    Canned responses can replace any kind, and a share of requests can be failed with
+    500s or rate limited with 429s to exercise the circuit breakers and rate limiter.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        embedding_dims: int = 1536,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        chunk_delay_ms: float = 0.0,
+        canned: Optional[Dict[str, str]] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            latency_ms (float): Delay before each response
+            jitter_ms (float): Random +/- variation of the delay
+            embedding_dims (int): Size of the returned embeddings
+            error_rate (float): Share of requests answered with a 500
+            rate_limit_rate (float): Share of requests answered with a 429 and Retry-After
+            chunk_delay_ms (float): Delay between streamed chunks (HTTP server only)
+            canned (Optional[Dict[str, str]]): Fixed response text per kind ("score", "wallet",
+                "follow", "chat", "completion")
+            seed (Optional[int]): Seed for latency jitter and injected failures
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.embedding_dims = embedding_dims
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chunk_delay_ms = chunk_delay_ms
+        self.canned = canned or {}
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def sleep(self) -> None:
+        if self.latency_ms or self.jitter_ms:
+            with self._lock:
+                jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+    def record(self, kind: str) -> None:
+        with self._lock:
+            self.calls[kind] += 1
+
+    def completion_text(self, payload: dict) -> Tuple[str, str]:
+        """
+        Returns:
+            Tuple[str, str]: (kind of request, generated text)
+        """
+        if "messages" in payload:
+            prompt = "\n".join(str(m.get("content", "")) for m in payload["messages"])
+        else:
+            prompt = str(payload.get("prompt", ""))
+        lowered = prompt.lower()
+        max_chars = min(int(payload.get("max_tokens") or 512), 280)
+
+        if "respond only with the score" in lowered:
+            kind, text = "score", str(3 + _digest(prompt)[0] % 7)
+        elif "wallet address" in lowered:
+            kind, text = "wallet", "[]"
+        elif "decide if you want to follow" in lowered:
+            kind, text = "follow", "[]"
+        else:
+            kind = "chat" if "messages" in payload else "completion"
+            text = fake_text(prompt, max_chars)
+        return kind, self.canned.get(kind, text)
+
+    def chat_body(self, payload: dict) -> dict:
+        kind, text = self.completion_text(payload)
+        self.record(kind)
+        if "messages" in payload:
+            choice = {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+        else:
+            choice = {"index": 0, "text": text, "finish_reason": "stop"}
+        return {
+            "id": "replay-" + hashlib.sha1(text.encode()).hexdigest()[:12],
+            "object": "chat.completion" if "messages" in payload else "text_completion",
+            "model": payload.get("model", "replay"),
+            "choices": [choice],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(text.split()), "total_tokens": len(text.split())},
+        }
+
+    def sse_events(self, payload: dict) -> Iterator[bytes]:
+        """Server-sent events for a streamed completion, in the provider's chunk format."""
+        kind, text = self.completion_text(payload)
+        self.record(kind + "_stream")
+        chat = "messages" in payload
+        for start in range(0, len(text), SSE_CHUNK_CHARS):
+            piece = text[start:start + SSE_CHUNK_CHARS]
+            choice = {"index": 0, "delta": {"content": piece}} if chat else {"index": 0, "text": piece}
+            yield f"data: {json.dumps({'choices': [choice]})}\n\n".encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+    def embeddings_body(self, payload: dict) -> dict:
+        self.record("embedding")
+        inputs = payload.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        return {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(str(text), self.embedding_dims)}
+                for i, text in enumerate(inputs)
+            ],
+            "model": payload.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    def handle(self, method: str, url: str, payload: Optional[dict]) -> Tuple[int, dict, Optional[bytes]]:
+        """
+        Route a request to a fake response.
+
+        Returns:
+            Tuple[int, dict, Optional[bytes]]: (status code, headers, body); a None body means
+            "stream the SSE events for this payload"
+        """
+        self.sleep()
+        payload = payload or {}
+        with self._lock:
+            roll = self.rng.random()
+        if roll < self.error_rate:
+            self.record("injected_error")
+            return 500, {"Content-Type": "application/json"}, json.dumps({"error": "injected failure"}).encode()
+        if roll < self.error_rate + self.rate_limit_rate:
+            self.record("injected_rate_limit")
+            headers = {"Content-Type": "application/json", "Retry-After": "1", "x-ratelimit-remaining-requests": "0"}
+            return 429, headers, json.dumps({"error": "injected rate limit"}).encode()
+        if re.search(r"/(chat/)?completions$", url):
+            if payload.get("stream"):
+                return 200, {"Content-Type": "text/event-stream"}, None
+            return 200, {"Content-Type": "application/json"}, json.dumps(self.chat_body(payload)).encode()
+        if url.endswith("/embeddings"):
+            return 200, {"Content-Type": "application/json"}, json.dumps(self.embeddings_body(payload)).encode()
+        if url.endswith("/2/tweets"):
+            self.record("x_post")
+            tweet_id = str(int.from_bytes(_digest(json.dumps(payload))[:6], "big"))
+            return 201, {"Content-Type": "application/json"}, json.dumps({"data": {"id": tweet_id, "text": payload.get("text")}}).encode()
+        if "getmoni" in url:
+            self.record("getmoni")
+            return 200, {"Content-Type": "application/json"}, json.dumps({"followersScore": _digest(url)[0] * 10}).encode()
+        self.record("unknown")
+        return 404, {"Content-Type": "application/json"}, json.dumps({"error": f"no replay route for {method} {url}"}).encode()
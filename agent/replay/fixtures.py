@@ -0,0 +1,132 @@
+import copy
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from replay.fake_llm import WORDS
+
+X_DATE_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+
+
+def generate_notifications(count: int, seed: int = 0, users: int = 500, reply_ratio: float = 0.3) -> Dict:
+    """
+    Synthetic notifications payload shaped like Account.notifications().
+
+    Args:
+        count (int): Number of tweets in the payload
+        seed (int): Random seed, the same seed gives the same payload
+        users (int): Number of distinct authors
+        reply_ratio (float): Share of tweets that reply to an earlier tweet in the payload
+
+    Returns:
+        Dict: {"globalObjects": {"tweets": {...}, "users": {...}}}
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 11, 1)
+    user_objects = {
+        str(1000 + i): {
+            "id_str": str(1000 + i),
+            "screen_name": f"replay_user_{i}",
+            "name": f"Replay User {i}",
+            "followers_count": rng.randint(0, 50000),
+        }
+        for i in range(users)
+    }
+
+    tweets = {}
+    tweet_ids = []
+    for i in range(count):
+        tweet_id = str(1_800_000_000_000_000_000 + i)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30)))
+        if rng.random() < 0.2:
+            text += f" @replay_user_{rng.randrange(users)}"
+        if rng.random() < 0.05:
+            text += " 0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+        tweet = {
+            "id_str": tweet_id,
+            "user_id": 1000 + rng.randrange(users),
+            "full_text": text,
+            "created_at": (start + timedelta(seconds=i)).strftime(X_DATE_FORMAT),
+        }
+        if tweet_ids and rng.random() < reply_ratio:
+            tweet["in_reply_to_status_id_str"] = rng.choice(tweet_ids[-50:])
+        tweets[tweet_id] = tweet
+        tweet_ids.append(tweet_id)
+
+    return {"globalObjects": {"tweets": tweets, "users": user_objects}}
+
+
+def reissue_ids(payload: Dict, page: int) -> Dict:
+    """
+    Copy a notifications payload with fresh tweet ids, so replaying it again isn't
+    filtered out as already processed.
+    """
+    offset = page * 10_000_000
+    tweets = payload["globalObjects"]["tweets"]
+    mapping = {tweet_id: str(int(tweet_id) + offset) for tweet_id in tweets}
+    new_tweets = {}
+    for tweet_id, tweet in tweets.items():
+        tweet = copy.copy(tweet)
+        tweet["id_str"] = mapping[tweet_id]
+        parent = tweet.get("in_reply_to_status_id_str")
+        if parent in mapping:
+            tweet["in_reply_to_status_id_str"] = mapping[parent]
+        new_tweets[mapping[tweet_id]] = tweet
+    return {"globalObjects": {"tweets": new_tweets, "users": payload["globalObjects"].get("users", {})}}
+
+
+def load_fixture(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_fixture(account, path: str) -> Dict:
+    """Save a real Account.notifications() response so it can be replayed offline later."""
+    payload = account.notifications()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    print(f"Recorded {len(payload.get('globalObjects', {}).get('tweets', {}))} notifications to {path}")
+    return payload
+
+
+class FakeAccount:
+    """
+    Stand-in for twitter.account.Account that serves recorded or generated notifications.
+
+    Every notifications() call returns the fixture with fresh tweet ids (a new "page"), and
+    writes (tweets, replies, follows) are recorded instead of sent.
+    """
+
+    def __init__(self, notifications: Dict, timeline: Optional[list] = None):
+        self.fixture = notifications
+        self.timeline = timeline or []
+        self.page = 0
+        self.sent = []
+        self.follows = []
+        self.session = type("FakeSession", (), {"cookies": {}})()
+
+    def notifications(self, *args, **kwargs) -> Dict:
+        self.page += 1
+        return reissue_ids(self.fixture, self.page)
+
+    def home_latest_timeline(self, limit: int = 20) -> list:
+        return self.timeline[:limit]
+
+    def dm_inbox(self) -> Dict:
+        return {"inbox_initial_state": {"entries": [], "conversations": {}, "users": {}}}
+
+    def _created(self, text: str) -> Dict:
+        rest_id = str(1_900_000_000_000_000_000 + len(self.sent))
+        self.sent.append(text)
+        return {"data": {"create_tweet": {"tweet_results": {"result": {"rest_id": rest_id, "legacy": {"full_text": text}}}}}}
+
+    def tweet(self, text: str, *args, **kwargs) -> Dict:
+        return self._created(text)
+
+    def reply(self, text: str, tweet_id=None, *args, **kwargs) -> Dict:
+        return self._created(text)
+
+    def follow(self, user_id) -> Dict:
+        self.follows.append(user_id)
+        return {"id_str": str(user_id)}
@@ -0,0 +1,148 @@
+"""
+Local OpenAI-compatible stand-in for the Hyperbolic, OpenRouter and OpenAI endpoints.
+
+    python -m replay.llm_server --port 8089 --latency-ms 300 --error-rate 0.05
+
+    export HYPERBOLIC_BASE_URL=http://127.0.0.1:8089/v1
+    export OPENROUTER_BASE_URL=http://127.0.0.1:8089/v1
+    export OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+
+Serves POST {base}/chat/completions, {base}/completions (both with "stream": true as SSE)
+and {base}/embeddings with hash-derived or canned outputs from FakeLLM.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+from replay.fake_llm import FakeLLM
+
+
+class FakeLLMRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients' connection pools behave like in production
+    fake_llm: FakeLLM = None
+    quiet = True
+
+    def _send(self, status: int, headers: dict, body: bytes) -> None:
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, headers: dict, payload: dict) -> None:
+        self.send_response(200)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        delay = self.fake_llm.chunk_delay_ms / 1000
+        try:
+            for event in self.fake_llm.sse_events(payload):
+                self.wfile.write(event)
+                self.wfile.flush()
+                if delay:
+                    time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client hung up early (streaming early stop), stop generating
+            self.fake_llm.record("stream_cancelled")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError:
+            self._send(400, {"Content-Type": "application/json"}, b'{"error": "invalid JSON"}')
+            return
+
+        status, headers, body = self.fake_llm.handle("POST", self.path.split("?", 1)[0], payload)
+        if body is None:
+            self._stream(headers, payload)
+        else:
+            self._send(status, headers, body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            body = json.dumps({"object": "list", "data": [{"id": "replay", "object": "model"}]}).encode()
+            self._send(200, {"Content-Type": "application/json"}, body)
+        else:
+            self._send(404, {"Content-Type": "application/json"}, b'{"error": "not found"}')
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def start_server(fake_llm: FakeLLM, host: str = "127.0.0.1", port: int = 0,
+                 quiet: bool = True) -> Tuple[ThreadingHTTPServer, threading.Thread]:
+    """
+    Start the stand-in server on a background thread.
+
+    Args:
+        port (int): Port to listen on, 0 picks a free one (see server.server_address)
+
+    Returns:
+        Tuple[ThreadingHTTPServer, threading.Thread]: Call server.shutdown() to stop it
+    """
+    handler = type("BoundFakeLLMRequestHandler", (FakeLLMRequestHandler,), {"fake_llm": fake_llm, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def load_canned(path: Optional[str]) -> Optional[dict]:
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in for LLM and embedding endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--chunk-delay-ms", type=float, default=0.0, help="delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--embedding-dims", type=int, default=1536)
+    parser.add_argument("--canned", help='JSON file of fixed responses per kind, e.g. {"score": "7"}')
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    fake_llm = FakeLLM(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        embedding_dims=args.embedding_dims,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        chunk_delay_ms=args.chunk_delay_ms,
+        canned=load_canned(args.canned),
+        seed=args.seed,
+    )
+    server, thread = start_server(fake_llm, args.host, args.port, quiet=not args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Fake LLM server listening on http://{host}:{port}/v1")
+    try:
+        while thread.is_alive():
+            thread.join(timeout=60)
+            print(f"Calls so far: {dict(fake_llm.calls)}")
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import io
+import json
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from replay.fake_llm import FakeLLM
+
+
+class FakeLLMAdapter(BaseAdapter):
+    """requests transport adapter that answers from a FakeLLM instead of the network."""
+
+    def __init__(self, fake_llm: FakeLLM):
+        super().__init__()
+        self.fake_llm = fake_llm
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        payload = None
+        if request.body:
+            body = request.body.decode("utf-8") if isinstance(request.body, bytes) else request.body
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                payload = None
+
+        status, headers, body = self.fake_llm.handle(request.method, request.url, payload)
+        if body is None:
+            body = b"".join(self.fake_llm.sse_events(payload))
+
+        response = Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = "OK" if status < 400 else "Error"
+        response.raw = io.BytesIO(body)
+        if not stream:
+            response._content = body
+        return response
+
+    def close(self):
+        pass
+
+
+def make_openai_client(fake_llm: FakeLLM, api_key: str = "replay"):
+    """OpenAI client whose HTTP transport is answered by fake_llm."""
+    import httpx
+    from openai import OpenAI
+
+    def handler(request: "httpx.Request") -> "httpx.Response":
+        payload = json.loads(request.content) if request.content else None
+        status, headers, body = fake_llm.handle(request.method, str(request.url), payload)
+        return httpx.Response(status, headers=headers, content=body)
+
+    return OpenAI(api_key=api_key, http_client=httpx.Client(transport=httpx.MockTransport(handler)))
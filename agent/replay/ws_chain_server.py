@@ -0,0 +1,219 @@
+"""
+Local JSON-RPC over WebSocket server backed by InMemoryChain, with eth_subscribe("logs").
+
+    python -m replay.ws_chain_server --check
+
+--check runs TeleportSubscription against it: a live mint, a dropped connection with a
+mint during the outage, and the backfill after reconnecting. Without --check the server
+keeps running and mints a teleport every --mint-every seconds.
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from replay.fake_chain import InMemoryChain
+
+REPLAY_TELEPORT_ADDRESS = "0x" + "7e" * 20
+REPLAY_AGENT_ADDRESS = "0x" + "a9" * 20
+REPLAY_RPC_URL = "http://replay.invalid/ws-chain"
+
+
+def _matches(log: dict, criteria: dict) -> bool:
+    address = criteria.get("address")
+    if address and str(log.get("address") or "").lower() != str(address).lower():
+        return False
+    topics = criteria.get("topics") or []
+    for position, wanted in enumerate(topics):
+        if wanted is None:
+            continue
+        wanted = wanted if isinstance(wanted, list) else [wanted]
+        if position >= len(log["topics"]) or log["topics"][position] not in wanted:
+            return False
+    return True
+
+
+class WebSocketChainServer:
+    """Serves an InMemoryChain over WebSocket JSON-RPC and pushes its new logs to subscribers."""
+
+    def __init__(self, chain: InMemoryChain, host: str = "127.0.0.1", port: int = 0):
+        self.chain = chain
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread: Optional[threading.Thread] = None
+        self.connections = set()
+        self.subscriptions: Dict[str, Tuple[object, dict]] = {}  # id -> (connection, criteria)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        chain.log_listeners.append(self.publish)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self) -> str:
+        from websockets.sync.server import serve
+
+        self.server = serve(self.handle, self.host, self.port)
+        self.port = self.server.socket.getsockname()[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="ws-chain-server", daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+        self.chain.log_listeners.remove(self.publish)
+
+    def drop_connections(self) -> None:
+        """Close every client connection (subscriptions are lost, like a node restart)."""
+        with self._lock:
+            connections = list(self.connections)
+            self.subscriptions.clear()
+        for connection in connections:
+            connection.close()
+
+    def publish(self, log: dict) -> None:
+        with self._lock:
+            targets = [(sid, conn) for sid, (conn, criteria) in self.subscriptions.items() if _matches(log, criteria)]
+        for subscription_id, connection in targets:
+            message = {"jsonrpc": "2.0", "method": "eth_subscription",
+                       "params": {"subscription": subscription_id, "result": log}}
+            try:
+                connection.send(json.dumps(message))
+            except Exception:
+                pass
+
+    def _reply(self, request: dict, connection) -> dict:
+        method, params = request.get("method"), request.get("params") or []
+        if method == "eth_subscribe":
+            if not params or params[0] != "logs":
+                return {"error": {"code": -32602, "message": "only logs subscriptions are supported"}}
+            subscription_id = hex(next(self._ids))
+            with self._lock:
+                self.subscriptions[subscription_id] = (connection, params[1] if len(params) > 1 else {})
+            return {"result": subscription_id}
+        if method == "eth_unsubscribe":
+            with self._lock:
+                return {"result": self.subscriptions.pop(params[0], None) is not None}
+        response = self.chain.make_request(method, params)
+        return {key: response[key] for key in ("result", "error") if key in response}
+
+    def handle(self, connection) -> None:
+        with self._lock:
+            self.connections.add(connection)
+        try:
+            for raw in connection:
+                request = json.loads(raw)
+                connection.send(json.dumps({"jsonrpc": "2.0", "id": request.get("id"), **self._reply(request, connection)}))
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self.connections.discard(connection)
+                for subscription_id in [sid for sid, (conn, _) in self.subscriptions.items() if conn is connection]:
+                    del self.subscriptions[subscription_id]
+
+
+def wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def run_check() -> bool:
+    """Live delivery, reconnect and gap backfill of TeleportSubscription against this server."""
+    from http_pool import set_web3_provider
+    from engines.wallet.find_teleport import TeleportManager
+    from engines.wallet.teleport_events import filter_and_decode
+    from engines.wallet.teleport_subscription import TeleportSubscription
+
+    chain = InMemoryChain(teleport_address=REPLAY_TELEPORT_ADDRESS)
+    server = WebSocketChainServer(chain)
+    url = server.start()
+    set_web3_provider(REPLAY_RPC_URL, chain)
+    manager = TeleportManager(REPLAY_TELEPORT_ADDRESS, REPLAY_RPC_URL)
+
+    seen: Dict[int, str] = {}  # token id -> "live" or "backfill"
+    statuses: List[bool] = []
+    state = {"next_block": manager.get_last_block()}
+    lock = threading.Lock()
+
+    def on_logs(logs):
+        with lock:
+            # Like the runner, live logs don't move next_block, only a completed backfill does
+            for event in filter_and_decode(logs, REPLAY_AGENT_ADDRESS):
+                seen.setdefault(event.token_id, "live")
+
+    def on_status(connected):
+        statuses.append(connected)
+        if connected:
+            # What the runner does on (re)connect: fill the gap since the last handled block
+            with lock:
+                to_block = manager.get_last_block()
+                for event in manager.fetch_events(state["next_block"], to_block, REPLAY_AGENT_ADDRESS):
+                    seen.setdefault(event.token_id, "backfill")
+                state["next_block"] = to_block + 1
+
+    subscription = TeleportSubscription(url, REPLAY_TELEPORT_ADDRESS, on_logs, on_status, reconnect_delay=0.5)
+    subscription.start()
+    ok = True
+    try:
+        ok &= wait_for(lambda: subscription.connected)
+        chain.add_teleport_mint(1, 1001, REPLAY_AGENT_ADDRESS, "live_minter")
+        chain.add_teleport_mint(2, 1002, "0x" + "01" * 20, "someone_else")  # other recipient, ignored
+        ok &= wait_for(lambda: 1 in seen)
+
+        server.drop_connections()
+        ok &= wait_for(lambda: not subscription.connected)
+        chain.add_teleport_mint(3, 1003, REPLAY_AGENT_ADDRESS, "offline_minter")
+        ok &= wait_for(lambda: subscription.connected and 3 in seen)
+
+        chain.add_teleport_mint(4, 1004, REPLAY_AGENT_ADDRESS, "after_reconnect")
+        ok &= wait_for(lambda: 4 in seen)
+    finally:
+        subscription.stop()
+        server.stop()
+
+    expected = {1: "live", 3: "backfill", 4: "live"}
+    ok &= seen == expected and subscription.reconnects >= 1
+    print(f"Events: {seen}, expected {expected}")
+    print(f"Status changes: {statuses}, reconnects: {subscription.reconnects}")
+    print("OK" if ok else "FAILED")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local WebSocket JSON-RPC chain with eth_subscribe logs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8546)
+    parser.add_argument("--mint-every", type=float, default=30.0, help="seconds between replayed teleport mints")
+    parser.add_argument("--check", action="store_true", help="run the subscription self-check and exit")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        raise SystemExit(0 if run_check() else 1)
+
+    chain = InMemoryChain(teleport_address=REPLAY_TELEPORT_ADDRESS)
+    server = WebSocketChainServer(chain, args.host, args.port)
+    print(f"WebSocket chain listening on {server.start()}, teleport contract {REPLAY_TELEPORT_ADDRESS}")
+    try:
+        for token_id in itertools.count(1):
+            time.sleep(args.mint_every)
+            chain.add_teleport_mint(token_id, 10_000 + token_id, REPLAY_AGENT_ADDRESS, f"replay_minter_{token_id}")
+            print(f"Minted teleport {token_id}")
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,15 @@ import random
 import json
 import secrets
 import hashlib
+import queue
+import signal
+import threading
 from datetime import datetime, timedelta, time as dt_time
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
 from pathlib import Path
 from requests_oauthlib import OAuth1
 from behavior import HumanBehaviorSimulator
+from event_scheduler import EventScheduler
 from eth_keys import keys
 from dotenv import load_dotenv
 from twitter.account import Account
@@ -18,9 +22,14 @@ from config import Config, ConfigMaker
 from db.db_setup import create_database, get_db
 from engines.wallet.wallet_send import WalletManager
 from engines.wallet.find_teleport import TeleportManager
+from engines.wallet.teleport_subscription import TeleportSubscription
+
+TELEPORT_LOGS_RETRY_SECONDS = 30
 
 class PipelineRunner:
-    def __init__(self):
+    def __init__(self, bot_username: Optional[str] = None, bot_email: Optional[str] = None):
+        self.bot_username = bot_username
+        self.bot_email = bot_email
         self.config_maker = ConfigMaker()
         self.config_maker.setup_environment()
         self.db = next(get_db())
@@ -30,7 +39,31 @@ class PipelineRunner:
         self.teleport_manager = TeleportManager(os.getenv("TELEPORT_CONTRACT_ADDRESS"), self.config.eth_mainnet_rpc_url)
         self.post_sender = PostSender()
         self.pipeline = PostingPipeline(self.config)
-        self.behavior_simulator = HumanBehaviorSimulator()  # Initialize the simulator
+        self.behavior_simulator = HumanBehaviorSimulator(
+            plan_mode=self.config.behavior_plan_mode, seed=self.config.behavior_seed
+        )  # Initialize the simulator
+        self.scheduler = EventScheduler()
+        self.deactivation_time = datetime.now()
+        self.last_block = None
+        # With TELEPORT_WS_URL set, teleport events are pushed over eth_subscribe and polling only fills gaps
+        self.teleport_subscription = None
+        self.teleport_logs = queue.SimpleQueue()
+        if os.getenv("TELEPORT_WS_URL"):
+            self.teleport_subscription = TeleportSubscription(
+                os.getenv("TELEPORT_WS_URL"),
+                self.teleport_manager.teleport_address,
+                on_logs=self.on_teleport_logs,
+                on_status=self.on_teleport_subscription_status
+            )
+        for name, handler in (
+            ("activate", self.activate),
+            ("deactivate", self.deactivate),
+            ("pipeline_run", self.pipeline_run),
+            ("teleport_poll", self.teleport_poll),
+            ("teleport_logs", self.teleport_logs_received),
+            ("daily_reset", self.daily_reset),
+        ):
+            self.scheduler.register(name, handler)
                 
     def create_config(self) -> Config:
         """Create pipeline configuration."""
@@ -44,6 +77,13 @@ class PipelineRunner:
             print(f"Wallet announcement tweet: https://x.com/user/status/{tweet_id}")
         else:
             private_key_hex, eth_address = self.wallet_manager.get_wallet_information()
+
+        # Per-agent identity when running under the supervisor, Config defaults otherwise
+        identity = {}
+        if self.bot_username:
+            identity["bot_username"] = self.bot_username
+        if self.bot_email:
+            identity["bot_email"] = self.bot_email
     
         return Config(
             db=self.db,
@@ -51,71 +91,150 @@ class PipelineRunner:
             auth=twitter_auth,
             private_key_hex=private_key_hex,
             eth_mainnet_rpc_url=os.getenv("ETH_MAINNET_RPC_URL"),
-            **api_keys
+            **api_keys,
+            **identity
         )
 
-    def run_pipeline_cycle(self) -> None:
-        """Run a single pipeline cycle."""
+    def schedule_activation(self) -> None:
+        """Schedule the next active window from the behavior simulator."""
         activation_time, active_duration = self.behavior_simulator.get_timing_parameters()
-        deactivation_time = activation_time + active_duration
+        self.deactivation_time = activation_time + active_duration
 
         print(f"\nNext cycle:")
         print(f"Activation time: {activation_time.strftime('%I:%M:%S %p')}")
-        print(f"Deactivation time: {deactivation_time.strftime('%I:%M:%S %p')}")
+        print(f"Deactivation time: {self.deactivation_time.strftime('%I:%M:%S %p')}")
         print(f"Duration: {active_duration.total_seconds() / 60:.1f} minutes")
         print(f"Daily post cycles so far: {self.behavior_simulator.daily_post_count}")
         print(f"Burst mode: {'Yes' if self.behavior_simulator.burst_mode else 'No'}")
 
-        # Wait for activation time
-        while datetime.now() < activation_time:
-            time.sleep(60)
+        self.scheduler.schedule("activate", activation_time)
 
+    def activate(self) -> None:
+        """Start an active window: pipeline runs and teleport polls until deactivation."""
         print(f"\nPipeline activated at: {datetime.now().strftime('%H:%M:%S')}")
-        next_run = self.get_next_run_time()
-
-        lastBlock = self.teleport_manager.get_last_block()
-
-        while datetime.now() < deactivation_time:
-            if datetime.now() >= next_run:
-                if self.behavior_simulator.should_post():
-                    print(f"Running pipeline at: {datetime.now().strftime('%H:%M:%S')}")
-                    try:
-                        self.pipeline.run()
-                    except Exception as e:
-                        print(f"Error running pipeline: {e}")
-                else:
-                    print("Skipping post based on behavior pattern...")
-
-                next_run = self.behavior_simulator.get_next_run_time()
+        # Scheduled before anything that can fail, deactivate is what schedules the next window
+        self.scheduler.schedule("deactivate", self.deactivation_time)
+        self.scheduler.schedule("pipeline_run", self.behavior_simulator.get_next_run_time())
+        self.scheduler.trigger("teleport_poll")
+        if self.teleport_subscription is not None:
+            self.teleport_subscription.start()
+
+    def deactivate(self) -> None:
+        print(f"Pipeline deactivated at: {datetime.now().strftime('%H:%M:%S')}")
+        self.scheduler.cancel("pipeline_run")
+        self.scheduler.cancel("teleport_poll")
+        if self.teleport_subscription is not None:
+            self.teleport_subscription.stop()
+        self.schedule_activation()
+
+    def is_active(self) -> bool:
+        return self.scheduler.pending.get("deactivate") is not None
+
+    def pipeline_run(self) -> None:
+        """Scheduled (or triggered) pipeline run."""
+        try:
+            if self.behavior_simulator.should_post():
+                print(f"Running pipeline at: {datetime.now().strftime('%H:%M:%S')}")
+                try:
+                    self.pipeline.run()
+                except Exception as e:
+                    print(f"Error running pipeline: {e}")
+            else:
+                print("Skipping post based on behavior pattern...")
+        finally:
+            next_run = self.behavior_simulator.get_next_run_time()
+            if self.is_active() and next_run < self.deactivation_time:
+                self.scheduler.schedule("pipeline_run", next_run)
                 print(
                     f"Next run scheduled for: {next_run.strftime('%H:%M:%S')} "
                     f"({(next_run - datetime.now()).total_seconds():.1f} seconds from now)"
                 )
 
-            # Poll for events
-            print(f"Checking for teleport events at: {datetime.now().strftime('%H:%M:%S')}")
-            lastBlock = self.teleport_manager.query_events(self.config.db, self.config.account, lastBlock, os.getenv("AGENT_WALLET_ADDRESS"))
-            time.sleep(5)
+    def teleport_poll(self) -> None:
+        """Poll for teleport events, or backfill once when the subscription has just (re)connected."""
+        print(f"Checking for teleport events at: {datetime.now().strftime('%H:%M:%S')}")
+        try:
+            if self.last_block is None:
+                self.last_block = self.teleport_manager.get_last_block()
+            self.last_block = self.teleport_manager.query_events(self.config.db, self.config.account, self.last_block, os.getenv("AGENT_WALLET_ADDRESS"))
+        finally:
+            # A failed poll is retried at the next poll time (or by polling while the subscription is down)
+            subscribed = self.teleport_subscription is not None and self.teleport_subscription.connected
+            if self.is_active() and not subscribed:
+                self.scheduler.schedule("teleport_poll", self.behavior_simulator.get_next_teleport_poll_time())
 
-        print(f"Pipeline deactivated at: {datetime.now().strftime('%H:%M:%S')}")
+    def on_teleport_subscription_status(self, connected: bool) -> None:
+        """Called from the subscription thread: backfill on connect, fall back to polling on disconnect."""
+        print(f"Teleport subscription {'connected' if connected else 'disconnected, polling'}")
+        if self.is_active():
+            self.scheduler.trigger("teleport_poll")
+
+    def on_teleport_logs(self, logs) -> None:
+        """Called from the subscription thread, the logs are handled on the scheduler thread."""
+        for log in logs:
+            self.teleport_logs.put(log)
+        self.scheduler.trigger("teleport_logs")
+
+    def teleport_logs_received(self) -> None:
+        """
+        Handle pushed teleport logs.
+
+        last_block is left alone: only a completed backfill (teleport_poll) moves it, so
+        a gap from before a reconnect is still scanned even after newer logs arrived.
+        """
+        logs = []
+        while not self.teleport_logs.empty():
+            logs.append(self.teleport_logs.get())
+        if not logs:
+            return
+        try:
+            self.teleport_manager.handle_logs(self.config.db, self.config.account, logs, os.getenv("AGENT_WALLET_ADDRESS"))
+        except Exception:
+            # Put them back for a retry, handling is idempotent (known token ids are skipped)
+            for log in logs:
+                self.teleport_logs.put(log)
+            self.scheduler.schedule_in("teleport_logs", TELEPORT_LOGS_RETRY_SECONDS)
+            raise
+
+    def daily_reset(self) -> None:
+        print(f"Resetting daily post budget at: {datetime.now().strftime('%H:%M:%S')}")
+        try:
+            self.behavior_simulator.reset_daily()
+        finally:
+            self.scheduler.schedule("daily_reset", self.behavior_simulator.get_next_daily_reset())
+
+    def trigger_pipeline_run(self, *_) -> None:
+        """
+        Run the pipeline now instead of waiting for the next scheduled run.
+
+        Wired to SIGUSR1 (kill -USR1 <pid>), e.g. from a notification webhook. Only
+        honored inside an active window; a scheduled run is moved up, not duplicated.
+        """
+        if not self.is_active():
+            print("Pipeline run requested outside the active window, ignoring")
+            return
+        self.scheduler.trigger("pipeline_run")
+
+    def _handle_wake_signal(self, signum, frame) -> None:
+        # The scheduler lock may be held by the interrupted main thread, trigger from another thread
+        threading.Thread(target=self.trigger_pipeline_run, name="wake-signal", daemon=True).start()
 
     def run(self) -> None:
         """Main execution loop."""
         print("\nPerforming initial pipeline run...")
         try:
             self.pipeline.run()
-            self.teleport_manager.query_events(self.config.db, self.config.account, self.teleport_manager.get_last_block(), os.getenv("AGENT_WALLET_ADDRESS"))
+            self.last_block = self.teleport_manager.query_events(self.config.db, self.config.account, self.teleport_manager.get_last_block(), os.getenv("AGENT_WALLET_ADDRESS"))
             print("Initial run completed successfully.")
         except Exception as e:
             print(f"Error during initial run: {e}")
 
         print("Starting continuous pipeline process...")
-        while True:
-            try:
-                self.run_pipeline_cycle()
-            except Exception as e:
-                print(f"Error in pipeline cycle: {e}")
-                continue
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self._handle_wake_signal)
+        self.schedule_activation()
+        self.scheduler.schedule("daily_reset", self.behavior_simulator.get_next_daily_reset())
+        self.scheduler.run()
 
 def main():
     try:
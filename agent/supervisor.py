@@ -0,0 +1,142 @@
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+RESTART_BACKOFF_BASE = 5  # seconds, doubled per consecutive crash
+RESTART_BACKOFF_MAX = 300
+STABLE_AFTER = 600  # a worker that ran this long has its crash counter reset
+
+
+@dataclass
+class AgentConfig:
+    """One agent run by the supervisor, read from the agents JSON file."""
+    name: str
+    bot_username: str
+    bot_email: Optional[str] = None
+    db_path: Optional[str] = None
+    env: Dict[str, str] = field(default_factory=dict)  # X_AUTH_TOKENS, AGENT_WALLET_*, API keys, ...
+    rate_limits: Dict[str, List[float]] = field(default_factory=dict)  # provider -> [requests/sec, burst]
+
+
+@dataclass
+class Worker:
+    agent: AgentConfig
+    process: Optional[multiprocessing.Process] = None
+    started_at: float = 0.0
+    crashes: int = 0
+    restart_at: float = 0.0
+
+
+def load_agent_configs(path: str) -> List[AgentConfig]:
+    """
+    Load agent configs from a JSON file shaped like agents.sample.json.
+
+    Each agent gets its own SQLite file (./data/<name>.db unless db_path is set).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    agents = []
+    for entry in data["agents"]:
+        agent = AgentConfig(**entry)
+        agent.db_path = agent.db_path or f"./data/{agent.name}.db"
+        agents.append(agent)
+    return agents
+
+
+def run_agent(agent: AgentConfig) -> None:
+    """
+    Worker process entry point.
+
+    The agent's environment is applied before anything from the pipeline is imported,
+    because db_setup binds the SQLite engine to SQLITE_DB_PATH at import time.
+    """
+    os.environ.update(agent.env)
+    os.environ["SQLITE_DB_PATH"] = agent.db_path
+
+    from rate_limiter import get_scheduler
+    from run_pipeline import PipelineRunner
+
+    if agent.rate_limits:
+        get_scheduler().configure({provider: tuple(limit) for provider, limit in agent.rate_limits.items()})
+
+    print(f"[{agent.name}] starting worker (pid {os.getpid()}, db {agent.db_path})")
+    runner = PipelineRunner(bot_username=agent.bot_username, bot_email=agent.bot_email)
+    runner.run()
+
+
+class AgentSupervisor:
+    """Runs one PostingPipeline process per agent and restarts workers that crash."""
+
+    def __init__(self, agents: List[AgentConfig], check_interval: float = 5):
+        # spawn gives every worker a fresh interpreter, so per-agent env and DB paths never leak between agents
+        self.ctx = multiprocessing.get_context("spawn")
+        self.workers = {agent.name: Worker(agent=agent) for agent in agents}
+        self.check_interval = check_interval
+
+    def start_worker(self, worker: Worker) -> None:
+        worker.process = self.ctx.Process(target=run_agent, args=(worker.agent,), name=f"agent-{worker.agent.name}")
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        print(f"Started {worker.agent.name} (pid {worker.process.pid})")
+
+    def check_workers(self) -> None:
+        """Schedule restarts for dead workers and start the ones whose backoff has passed."""
+        now = time.monotonic()
+        for worker in self.workers.values():
+            process = worker.process
+            if process is not None and process.is_alive():
+                if worker.crashes and now - worker.started_at > STABLE_AFTER:
+                    worker.crashes = 0
+                continue
+
+            if process is not None:
+                # Worker exited: back off exponentially before restarting it
+                worker.crashes += 1
+                delay = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** (worker.crashes - 1))
+                worker.restart_at = now + delay
+                worker.process = None
+                print(f"{worker.agent.name} exited with code {process.exitcode}, restarting in {delay}s")
+
+            if now >= worker.restart_at:
+                self.start_worker(worker)
+
+    def stop(self) -> None:
+        for worker in self.workers.values():
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(timeout=10)
+
+    def run(self) -> None:
+        print(f"Supervising {len(self.workers)} agent(s)")
+        try:
+            while True:
+                self.check_workers()
+                time.sleep(self.check_interval)
+        finally:
+            self.stop()
+
+
+def _handle_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "agents.json"
+    # Treat SIGTERM (docker stop) like Ctrl+C so the workers get terminated too
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    supervisor = AgentSupervisor(load_agent_configs(path))
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        print("\nSupervisor terminated by user")
+
+
+if __name__ == "__main__":
+    main()